@@ -1,14 +1,50 @@
 db = db.getSiblingDB('logs');
 
+// logs 컬렉션 저장 모드 (standard | timeseries | compact)
+const storageMode = process.env.LOGS_STORAGE_MODE || 'standard';
+
 // 컬렉션 생성
-db.createCollection('logs');
+if (storageMode === 'timeseries') {
+    // time-series 컬렉션: timestamp 기준 버킷 저장, service/level은 metaField 하위
+    db.createCollection('logs', {
+        timeseries: { timeField: 'timestamp', metaField: 'meta', granularity: 'seconds' }
+    });
+} else {
+    db.createCollection('logs');
+}
 db.createCollection('logs_hourly_stats');
 
 // 인덱스 생성 (성능 최적화)
-db.logs.createIndex({ "timestamp": -1 });
-db.logs.createIndex({ "service": 1, "timestamp": -1 });
-db.logs.createIndex({ "level": 1, "timestamp": -1 });
-db.logs.createIndex({ "service": 1, "level": 1 });
+if (storageMode === 'timeseries') {
+    db.logs.createIndex({ "meta.service": 1, "timestamp": -1 });
+    db.logs.createIndex({ "meta.level": 1, "timestamp": -1 });
+    db.logs.createIndex({ "created_at": 1 });
+} else if (storageMode === 'compact') {
+    // compact 스키마: t=timestamp, s=service 코드, l=level 코드
+    db.logs.createIndex({ "t": -1 });
+    db.logs.createIndex({ "s": 1, "t": -1 });
+    db.logs.createIndex({ "l": 1, "t": -1 });
+    db.logs.createIndex({ "s": 1, "l": 1 });
+} else {
+    db.logs.createIndex({ "timestamp": -1 });
+    db.logs.createIndex({ "service": 1, "timestamp": -1 });
+    db.logs.createIndex({ "level": 1, "timestamp": -1 });
+    db.logs.createIndex({ "service": 1, "level": 1 });
+    // Aggregator 증분 메트릭 집계 (created_at 워터마크)
+    db.logs.createIndex({ "created_at": 1 });
+}
 
 db.logs_hourly_stats.createIndex({ "hour": -1 });
 db.logs_hourly_stats.createIndex({ "service": 1, "hour": -1 });
+
+// Consumer가 유지하는 분 단위 롤업
+db.createCollection('logs_rollup_minute');
+db.logs_rollup_minute.createIndex({ "kind": 1, "minute": -1 });
+db.logs_rollup_minute.createIndex({ "kind": 1, "service": 1, "minute": -1 });
+
+// compact 모드 사전 (service/level 코드, 메시지 템플릿)
+if (storageMode === 'compact') {
+    db.createCollection('log_dictionary');
+    db.log_dictionary.createIndex({ "kind": 1 });
+    db.createCollection('log_templates');
+}
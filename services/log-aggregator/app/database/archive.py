@@ -0,0 +1,250 @@
+"""
+Parquet 로그 아카이브 (cold tier)
+
+보존 기간이 지난 로그는 MongoDB에서 삭제되기 전에 일자/서비스 단위 Parquet 파일로 내보낸다.
+
+    {ARCHIVE_DIR}/date=YYYY-MM-DD/service={service}/logs.parquet
+
+- zstd 압축, hive 파티셔닝 (date, service)
+- 일자 단위로 _staging 아래에 먼저 쓰고 완료되면 교체 (재실행해도 같은 결과)
+- 조회는 파티션 필터(date, service)로 필요한 파일만 로컬에서 스캔
+"""
+import json
+import logging
+import os
+import shutil
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from app.database.mongodb import ERROR_LEVELS, TIME_BIN_ORIGIN
+
+logger = logging.getLogger(__name__)
+
+STAGING_DIR = "_staging"  # "_" 접두사 경로는 dataset 스캔에서 제외된다
+
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("timestamp", pa.timestamp("ms")),
+    ("level", pa.string()),
+    ("message", pa.string()),
+    ("metadata", pa.string()),  # JSON 문자열
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("date", pa.string()), ("service", pa.string())]),
+    flavor="hive",
+)
+
+
+class ParquetArchive:
+    """일자/서비스 파티션 Parquet 아카이브"""
+
+    def __init__(
+        self,
+        base_dir: str,
+        compression: str = "zstd",
+        compression_level: int = 6,
+        chunk_size: int = 50000
+    ):
+        """
+        Args:
+            base_dir: 아카이브 루트 디렉터리 (여러 Aggregator가 공유하는 볼륨)
+            compression: Parquet 압축 코덱
+            compression_level: 압축 레벨
+            chunk_size: 서비스별 버퍼 크기 (이 건수마다 row group 기록)
+        """
+        self.base_dir = base_dir
+        self.compression = compression
+        self.compression_level = compression_level
+        self.chunk_size = chunk_size
+
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    @staticmethod
+    def _date_partition(day: date) -> str:
+        return f"date={day.isoformat()}"
+
+    def has_day(self, day: date) -> bool:
+        """해당 일자 파티션 존재 여부"""
+        return os.path.isdir(os.path.join(self.base_dir, self._date_partition(day)))
+
+    def write_day(self, day: date, logs: Iterable[Dict]) -> Dict[str, int]:
+        """
+        하루치 로그를 서비스별 Parquet 파일로 기록
+
+        Args:
+            day: 대상 일자 (UTC)
+            logs: 표준 필드(_id, timestamp, service, level, message, metadata) 문서
+
+        Returns:
+            서비스별 기록 건수
+        """
+        partition = self._date_partition(day)
+        staging = os.path.join(self.base_dir, STAGING_DIR, f"{partition}-{os.getpid()}")
+        shutil.rmtree(staging, ignore_errors=True)
+
+        writers: Dict[str, pq.ParquetWriter] = {}
+        buffers: Dict[str, List[Dict]] = {}
+        counts: Dict[str, int] = {}
+
+        def flush(service: str):
+            rows = buffers.pop(service, [])
+            if not rows:
+                return
+
+            writer = writers.get(service)
+            if writer is None:
+                directory = os.path.join(staging, f"service={service}")
+                os.makedirs(directory, exist_ok=True)
+                writer = pq.ParquetWriter(
+                    os.path.join(directory, "logs.parquet"),
+                    ARCHIVE_SCHEMA,
+                    compression=self.compression,
+                    compression_level=self.compression_level,
+                )
+                writers[service] = writer
+
+            writer.write_table(pa.Table.from_pylist(rows, schema=ARCHIVE_SCHEMA))
+
+        try:
+            for log in logs:
+                service = log.get("service") or "unknown"
+                buffers.setdefault(service, []).append({
+                    "id": str(log.get("_id", "")),
+                    "timestamp": log["timestamp"],
+                    "level": log.get("level", "INFO"),
+                    "message": log.get("message", ""),
+                    "metadata": json.dumps(log.get("metadata") or {}, default=str),
+                })
+                counts[service] = counts.get(service, 0) + 1
+
+                if len(buffers[service]) >= self.chunk_size:
+                    flush(service)
+
+            for service in list(buffers):
+                flush(service)
+
+        except Exception:
+            for writer in writers.values():
+                writer.close()
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        for writer in writers.values():
+            writer.close()
+
+        # 기존 파티션 교체
+        target = os.path.join(self.base_dir, partition)
+        shutil.rmtree(target, ignore_errors=True)
+        if counts:
+            os.replace(staging, target)
+        else:
+            os.makedirs(target, exist_ok=True)
+            shutil.rmtree(staging, ignore_errors=True)
+
+        logger.info(f"Archived {sum(counts.values())} logs for {day.isoformat()}: {counts}")
+        return counts
+
+    def _scan(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        service: Optional[str],
+        columns: List[str]
+    ) -> pa.Table:
+        """기간/서비스 조건으로 파티션을 골라 필요한 컬럼만 읽는다"""
+        if not any(name.startswith("date=") for name in os.listdir(self.base_dir)):
+            return pa.table({name: [] for name in columns})
+
+        dataset = ds.dataset(
+            self.base_dir,
+            format="parquet",
+            partitioning=PARTITIONING,
+        )
+
+        start_date = start_time.date().isoformat()
+        end_date = (end_time - timedelta(microseconds=1)).date().isoformat()
+        condition = (
+            (ds.field("date") >= start_date)
+            & (ds.field("date") <= end_date)
+            & (ds.field("timestamp") >= pa.scalar(start_time, pa.timestamp("ms")))
+            & (ds.field("timestamp") < pa.scalar(end_time, pa.timestamp("ms")))
+        )
+        if service:
+            condition = condition & (ds.field("service") == service)
+
+        return dataset.to_table(columns=columns, filter=condition)
+
+    def get_hourly_stats(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        service: Optional[str] = None
+    ) -> List[Dict]:
+        """시간대별 로그 건수 (MongoDBClient.get_hourly_stats 와 같은 형태)"""
+        table = self._scan(start_time, end_time, service, ["timestamp"])
+        if table.num_rows == 0:
+            return []
+
+        hours = pc.strftime(table["timestamp"], format="%Y-%m-%d-%H")
+        grouped = pa.table({"hour": hours}).group_by("hour").aggregate([("hour", "count")])
+
+        return sorted(
+            (
+                {"hour": hour, "count": count}
+                for hour, count in zip(
+                    grouped["hour"].to_pylist(), grouped["hour_count"].to_pylist()
+                )
+            ),
+            key=lambda row: row["hour"]
+        )
+
+    def get_step_counts(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        step: timedelta,
+        split: Optional[str] = None,
+        service: Optional[str] = None
+    ) -> List[Dict]:
+        """step 단위 구간별 로그 수 (MongoDBClient.get_step_counts 와 같은 형태)"""
+        table = self._scan(start_time, end_time, service, ["timestamp"] + ([split] if split else []))
+        if table.num_rows == 0:
+            return []
+
+        step_ms = int(step.total_seconds() * 1000)
+        origin_ms = int((TIME_BIN_ORIGIN - datetime(1970, 1, 1)).total_seconds() * 1000)
+        offsets = pc.subtract(table["timestamp"].cast(pa.int64()), origin_ms)
+        buckets = pc.add(pc.multiply(pc.divide(offsets, step_ms), step_ms), origin_ms)
+
+        columns = {"bucket": buckets.cast(pa.timestamp("ms"))}
+        if split:
+            columns["key"] = table[split]
+        grouped = pa.table(columns).group_by(list(columns)).aggregate([("bucket", "count")])
+
+        keys = grouped["key"].to_pylist() if split else [None] * grouped.num_rows
+        return [
+            {"bucket": bucket, "key": key, "count": count}
+            for bucket, key, count in zip(
+                grouped["bucket"].to_pylist(), keys, grouped["bucket_count"].to_pylist()
+            )
+        ]
+
+    def get_error_counts(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        service: Optional[str] = None
+    ) -> Tuple[int, int]:
+        """(전체 건수, 에러 건수)"""
+        table = self._scan(start_time, end_time, service, ["level"])
+        if table.num_rows == 0:
+            return 0, 0
+
+        errors = pc.sum(pc.is_in(table["level"], value_set=pa.array(ERROR_LEVELS))).as_py()
+        return table.num_rows, errors or 0
@@ -1,30 +1,80 @@
 """
 MongoDB 연결 및 쿼리
 """
+import contextlib
+import hashlib
 import logging
-from typing import Optional, List, Dict
+import math
+from typing import Optional, List, Dict, Iterable, Iterator
 from datetime import datetime, timedelta
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+import pymongo
+from pymongo import ASCENDING, MongoClient, ReplaceOne
+from pymongo.errors import ConnectionFailure, DuplicateKeyError, ExecutionTimeout, NetworkTimeout
+from app.database.routing import CollectionRouter, parse_partition, partition_bounds
+from app.database.schema import STORAGE_COMPACT, STORAGE_STANDARD, get_log_schema
+from app.database.sketch import ZERO_INDEX, HyperLogLog, LatencySketch, sketches_from_rows
 
 logger = logging.getLogger(__name__)
 
+# Aggregator 가 원본 logs 에서 재계산해 유지하는 롤업 (logs_agg_<단위>)
+ROLLUP_GRANULARITIES = ("minute", "hour", "day")
+ERROR_LEVELS = ["ERROR", "CRITICAL"]
+# HyperLogLog 로 고유 값 수를 세는 metadata 필드
+DISTINCT_FIELDS = ("user_id", "ip", "session_id")
+# 조회 타임아웃 (조회 메서드는 다른 오류와 달리 삼키지 않고 호출자에게 전달한다)
+QUERY_TIMEOUT_ERRORS = (ExecutionTimeout, NetworkTimeout)
+
+# $dateTrunc 가 binSize 구간을 정렬하는 기준 시각
+TIME_BIN_ORIGIN = datetime(2000, 1, 1)
+
+
+def date_trunc(field: str, step: timedelta) -> Dict:
+    """field 를 step 단위 구간 시작으로 내리는 $dateTrunc 식 (step 은 분의 정수배)"""
+    seconds = int(step.total_seconds())
+    for unit, size in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds % size == 0:
+            return {"$dateTrunc": {"date": f"${field}", "unit": unit, "binSize": seconds // size}}
+    raise ValueError(f"Time series step must be a whole number of minutes: {step}")
+
+
+def message_key(message) -> str:
+    """에러 메시지 키 (롤업 문서 _id 용 짧은 해시)"""
+    return hashlib.sha1(str(message).encode("utf-8")).hexdigest()[:16]
+
 
 class MongoDBClient:
     """MongoDB 클라이언트"""
     
-    def __init__(self, connection_string: str, database_name: str = "logs"):
+    def __init__(
+        self,
+        connection_string: str,
+        database_name: str = "logs",
+        storage_mode: str = STORAGE_STANDARD,
+        router: Optional[CollectionRouter] = None,
+        query_timeout_ms: int = 0
+    ):
         """
         Args:
             connection_string: MongoDB 연결 문자열
             database_name: 데이터베이스 이름
+            storage_mode: logs 컬렉션 저장 모드 (standard | timeseries | compact)
+            router: 서비스별 컬렉션 라우팅 (Consumer 와 같은 설정)
+            query_timeout_ms: API 조회 1건의 제한 시간 (ms, 0이면 제한 없음)
         """
         self.connection_string = connection_string
         self.database_name = database_name
+        self.storage_mode = storage_mode
+        self.router = router or CollectionRouter()
+        self.query_timeout_ms = query_timeout_ms
+        self.schema = None
         self.client: Optional[MongoClient] = None
         self.db = None
         self.logs_collection = None
         self.hourly_stats_collection = None
+        self.rollup_collection = None
+        self.archive_state_collection = None
+        self.blobs_collection = None
+        self.materialized_collections: Dict[str, object] = {}
         
         self._connect()
     
@@ -42,6 +92,14 @@ class MongoDBClient:
             self.db = self.client[self.database_name]
             self.logs_collection = self.db["logs"]
             self.hourly_stats_collection = self.db["logs_hourly_stats"]
+            self.rollup_collection = self.db["logs_rollup_minute"]
+            self.archive_state_collection = self.db["archive_state"]
+            self.blobs_collection = self.db["blobs"]
+            self.materialized_collections = {
+                granularity: self.db[f"logs_agg_{granularity}"]
+                for granularity in ROLLUP_GRANULARITIES
+            }
+            self.schema = get_log_schema(self.storage_mode, self.db)
             
             logger.info(f"MongoDB connected: {self.database_name}")
             
@@ -49,45 +107,163 @@ class MongoDBClient:
             logger.error(f"Failed to connect to MongoDB: {e}")
             raise
     
-    def get_total_count(self) -> int:
+    def query_timeout(self):
+        """
+        API 조회 타임아웃 블록
+        
+        pymongo.timeout 안의 모든 명령(aggregate, cursor getMore, find)에 남은 시간이
+        maxTimeMS 로 붙는다. 초과하면 QUERY_TIMEOUT_ERRORS 가 발생한다.
+        백그라운드 작업(보존 기간, 롤업 재계산)은 이 블록 밖에서 실행한다.
+        """
+        if not self.query_timeout_ms:
+            return contextlib.nullcontext()
+        return pymongo.timeout(self.query_timeout_ms / 1000)
+    
+    def _source(self, from_rollup: bool):
+        """
+        조회 대상 선택
+        
+        Returns:
+            (건수 표현식, 시간 필드) - 실행은 _aggregate
+            - 원본 logs: 문서 1건 = 로그 1건
+            - logs_rollup_minute: 문서의 count 필드 = 로그 건수
+        """
+        if from_rollup:
+            return "$count", "minute"
+        return 1, "timestamp"
+    
+    def _prepare(self, pipeline: List[Dict], from_rollup: bool, kind: str = "level") -> List[Dict]:
+        """
+        표준 필드 이름으로 작성된 파이프라인을 조회 대상에 맞게 변환
+        
+        첫 스테이지는 $match 여야 한다. 원본 logs는 저장 모드 스키마로 필드를 매핑하고,
+        롤업은 문서 종류(kind) 조건을 추가한다.
+        """
+        match, stages = pipeline[0]["$match"], pipeline[1:]
+        
+        if from_rollup:
+            return [{"$match": {"kind": kind, **match}}, *stages]
+        
+        return [
+            {"$match": self.schema.translate_match(match)},
+            *self.schema.normalize_stages(),
+            *stages
+        ]
+    
+    def _log_collections(
+        self,
+        service: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None
+    ) -> List:
+        """조회할 원본 로그 컬렉션 (라우팅은 service, 일자 파티션은 기간으로 가지치기)"""
+        return [
+            self.db[name]
+            for name in self.router.collections(self.db, service, start_time, end_time)
+        ]
+    
+    @staticmethod
+    def _match_time_range(match: Dict):
+        """$match 의 timestamp 조건 -> (시작, 끝), 조건이 없으면 None"""
+        condition = match.get("timestamp")
+        if not isinstance(condition, dict):
+            return None, None
+        start_time = condition.get("$gte", condition.get("$gt"))
+        end_time = condition.get("$lt", condition.get("$lte"))
+        if isinstance(end_time, datetime) and "$lte" in condition:
+            end_time += timedelta(microseconds=1)
+        return (
+            start_time if isinstance(start_time, datetime) else None,
+            end_time if isinstance(end_time, datetime) else None,
+        )
+    
+    def _aggregate(
+        self,
+        pipeline: List[Dict],
+        from_rollup: bool,
+        kind: str = "level",
+        service: Optional[str] = None,
+        **kwargs
+    ):
+        """
+        표준 필드 파이프라인 실행
+        
+        원본 logs 가 여러 컬렉션으로 라우팅되어 있으면 컬렉션마다 $match(+스키마 변환)를 적용해
+        $unionWith 로 합친 뒤 나머지 스테이지를 한 번에 실행한다 (각 컬렉션의 인덱스 사용).
+        일자 파티션은 첫 $match 의 timestamp 기간과 겹치는 것만 포함한다.
+        """
+        if from_rollup:
+            return self.rollup_collection.aggregate(
+                self._prepare(pipeline, from_rollup, kind), **kwargs
+            )
+        
+        start_time, end_time = self._match_time_range(pipeline[0]["$match"])
+        prepared = self._prepare(pipeline, from_rollup=False)
+        collections = self._log_collections(service, start_time, end_time)
+        if len(collections) == 1:
+            return collections[0].aggregate(prepared, **kwargs)
+        
+        head = 1 + len(self.schema.normalize_stages())
+        branch, stages = prepared[:head], prepared[head:]
+        unions = [
+            {"$unionWith": {"coll": collection.name, "pipeline": branch}}
+            for collection in collections[1:]
+        ]
+        return collections[0].aggregate([*branch, *unions, *stages], **kwargs)
+    
+    def get_total_count(self, from_rollup: bool = False) -> int:
         """총 로그 개수"""
         try:
-            return self.logs_collection.count_documents({})
+            if not from_rollup:
+                return sum(
+                    collection.count_documents({}) for collection in self._log_collections()
+                )
+            
+            result = list(self.rollup_collection.aggregate([
+                {"$match": {"kind": "level"}},
+                {"$group": {"_id": None, "total": {"$sum": "$count"}}}
+            ]))
+            return result[0]["total"] if result else 0
+        except QUERY_TIMEOUT_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Error getting total count: {e}")
             return 0
     
-    def get_service_stats(self) -> List[Dict]:
+    def get_service_stats(self, from_rollup: bool = False) -> List[Dict]:
         """서비스별 통계"""
         try:
+            count, _ = self._source(from_rollup)
+            
             pipeline = [
+                {"$match": {}},
                 {
                     "$group": {
                         "_id": "$service",
-                        "total": {"$sum": 1},
+                        "total": {"$sum": count},
                         "info": {
                             "$sum": {
-                                "$cond": [{"$eq": ["$level", "INFO"]}, 1, 0]
+                                "$cond": [{"$eq": ["$level", "INFO"]}, count, 0]
                             }
                         },
                         "warning": {
                             "$sum": {
-                                "$cond": [{"$eq": ["$level", "WARNING"]}, 1, 0]
+                                "$cond": [{"$eq": ["$level", "WARNING"]}, count, 0]
                             }
                         },
                         "error": {
                             "$sum": {
-                                "$cond": [{"$eq": ["$level", "ERROR"]}, 1, 0]
+                                "$cond": [{"$eq": ["$level", "ERROR"]}, count, 0]
                             }
                         },
                         "critical": {
                             "$sum": {
-                                "$cond": [{"$eq": ["$level", "CRITICAL"]}, 1, 0]
+                                "$cond": [{"$eq": ["$level", "CRITICAL"]}, count, 0]
                             }
                         },
                         "debug": {
                             "$sum": {
-                                "$cond": [{"$eq": ["$level", "DEBUG"]}, 1, 0]
+                                "$cond": [{"$eq": ["$level", "DEBUG"]}, count, 0]
                             }
                         }
                     }
@@ -115,26 +291,31 @@ class MongoDBClient:
                 {"$sort": {"total_logs": -1}}
             ]
             
-            return list(self.logs_collection.aggregate(pipeline))
+            return list(self._aggregate(pipeline, from_rollup))
             
+        except QUERY_TIMEOUT_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Error getting service stats: {e}")
             return []
     
-    def get_log_level_distribution(self) -> List[Dict]:
+    def get_log_level_distribution(self, from_rollup: bool = False) -> List[Dict]:
         """로그 레벨별 분포"""
         try:
+            count, _ = self._source(from_rollup)
+            
             pipeline = [
+                {"$match": {}},
                 {
                     "$group": {
                         "_id": "$level",
-                        "count": {"$sum": 1}
+                        "count": {"$sum": count}
                     }
                 },
                 {"$sort": {"count": -1}}
             ]
             
-            results = list(self.logs_collection.aggregate(pipeline))
+            results = list(self._aggregate(pipeline, from_rollup))
             
             # 전체 로그 수
             total = sum(r["count"] for r in results)
@@ -146,14 +327,231 @@ class MongoDBClient:
             
             return results
             
+        except QUERY_TIMEOUT_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Error getting log level distribution: {e}")
             return []
     
+    @staticmethod
+    def _service_level_stages(prefix: str = "") -> List[Dict]:
+        """(service, level) 별 count 행 -> 서비스별 레벨 건수/에러율 (get_service_stats 와 같은 모양)"""
+        service, level = f"${prefix}service", f"${prefix}level"
+        
+        def level_sum(name: str) -> Dict:
+            return {"$sum": {"$cond": [{"$eq": [level, name]}, "$count", 0]}}
+        
+        return [
+            {
+                "$group": {
+                    "_id": service,
+                    "total": {"$sum": "$count"},
+                    "info": level_sum("INFO"),
+                    "warning": level_sum("WARNING"),
+                    "error": level_sum("ERROR"),
+                    "critical": level_sum("CRITICAL"),
+                    "debug": level_sum("DEBUG")
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "service": "$_id",
+                    "total_logs": "$total",
+                    "info_count": "$info",
+                    "warning_count": "$warning",
+                    "error_count": "$error",
+                    "critical_count": "$critical",
+                    "debug_count": "$debug",
+                    "error_rate": {
+                        "$multiply": [
+                            {"$divide": [{"$add": ["$error", "$critical"]}, "$total"]},
+                            100
+                        ]
+                    }
+                }
+            },
+            {"$sort": {"total_logs": -1}}
+        ]
+    
+    @staticmethod
+    def _level_distribution(rows: List[Dict]) -> List[Dict]:
+        """{level, count} 행에 퍼센티지 추가"""
+        total = sum(row["count"] for row in rows)
+        for row in rows:
+            row["percentage"] = (row["count"] / total * 100) if total > 0 else 0
+        return rows
+    
+    def get_overall_facets(self, from_rollup: bool = False) -> Dict:
+        """
+        총 로그 수 / 서비스별 통계 / 레벨 분포를 한 번의 스캔으로 조회
+        
+        (service, level) 로 먼저 줄인 뒤 $facet 으로 세 결과를 만든다.
+        
+        Returns:
+            {"total_logs": int, "services": [...], "levels": [...]}
+        """
+        count, _ = self._source(from_rollup)
+        pipeline = [
+            {"$match": {}},
+            {
+                "$group": {
+                    "_id": {"service": "$service", "level": "$level"},
+                    "count": {"$sum": count}
+                }
+            },
+            {
+                "$facet": {
+                    "total": [{"$group": {"_id": None, "total": {"$sum": "$count"}}}],
+                    "services": self._service_level_stages(prefix="_id."),
+                    "levels": [
+                        {"$group": {"_id": "$_id.level", "count": {"$sum": "$count"}}},
+                        {"$sort": {"count": -1}},
+                        {"$project": {"_id": 0, "level": "$_id", "count": 1}}
+                    ]
+                }
+            }
+        ]
+        
+        result = next(iter(self._aggregate(pipeline, from_rollup)), None) or {}
+        total = result.get("total") or [{"total": 0}]
+        return {
+            "total_logs": total[0]["total"],
+            "services": result.get("services", []),
+            "levels": self._level_distribution(result.get("levels", [])),
+        }
+    
+    def get_batch_stats(
+        self,
+        queries: List[str],
+        start_time: datetime,
+        service: Optional[str] = None,
+        from_rollup: bool = False,
+        top_errors_limit: int = 10
+    ) -> Dict:
+        """
+        같은 기간의 여러 통계를 한 번의 스캔으로 조회
+        
+        기간의 문서를 (service, level, 시간[, 에러 메시지]) 로 먼저 줄인 뒤
+        요청한 통계만 $facet 으로 계산한다. 롤업에서는 level 문서로 건수를,
+        error 문서로 Top 에러를 계산한다.
+        
+        Args:
+            queries: services | levels | timeseries | error_rate | top_errors 중 필요한 것
+            start_time: 조회 시작 시각
+            service: 특정 서비스 필터
+            from_rollup: 분 단위 롤업 컬렉션에서 조회
+            top_errors_limit: Top 에러 수
+        
+        Returns:
+            {query: 결과} (error_rate 는 {"total_logs", "error_logs"})
+        """
+        count, time_field = self._source(from_rollup)
+        last_occurred = "$last_occurred" if from_rollup else "$timestamp"
+        
+        match_stage = {time_field: {"$gte": start_time}}
+        if service:
+            match_stage["service"] = service
+        
+        # 롤업의 error 문서는 level 문서와 같은 로그를 다시 센 것이므로 건수에서 뺀다
+        counted = {"$match": {"_id.kind": {"$ne": "error"}}}
+        facets = {
+            "services": [
+                counted,
+                *self._service_level_stages(prefix="_id.")
+            ],
+            "levels": [
+                counted,
+                {"$group": {"_id": "$_id.level", "count": {"$sum": "$count"}}},
+                {"$sort": {"count": -1}},
+                {"$project": {"_id": 0, "level": "$_id", "count": 1}}
+            ],
+            "timeseries": [
+                counted,
+                {"$group": {"_id": "$_id.hour", "count": {"$sum": "$count"}}},
+                {"$sort": {"_id": 1}},
+                {"$project": {"_id": 0, "hour": "$_id", "count": 1}}
+            ],
+            "error_rate": [
+                counted,
+                {
+                    "$group": {
+                        "_id": None,
+                        "total_logs": {"$sum": "$count"},
+                        "error_logs": {
+                            "$sum": {
+                                "$cond": [{"$in": ["$_id.level", ERROR_LEVELS]}, "$count", 0]
+                            }
+                        }
+                    }
+                }
+            ],
+            "top_errors": [
+                {"$match": {"_id.message": {"$ne": None}}},
+                {
+                    "$group": {
+                        "_id": {"message": "$_id.message", "service": "$_id.service"},
+                        "count": {"$sum": "$count"},
+                        "last_occurred": {"$max": "$last_occurred"}
+                    }
+                },
+                {"$sort": {"count": -1}},
+                {"$limit": top_errors_limit},
+                {
+                    "$project": {
+                        "_id": 0,
+                        "message": "$_id.message",
+                        "service": "$_id.service",
+                        "count": 1,
+                        "last_occurred": 1
+                    }
+                }
+            ],
+        }
+        
+        pipeline = [
+            {"$match": match_stage},
+            {
+                "$group": {
+                    "_id": {
+                        "kind": "$kind" if from_rollup else "level",
+                        "service": "$service",
+                        "level": "$level",
+                        "hour": {"$dateToString": {"format": "%Y-%m-%d-%H", "date": f"${time_field}"}},
+                        # Top 에러용 메시지는 에러 레벨만 (롤업은 error 문서에만 있다)
+                        "message": {
+                            "$cond": [{"$in": ["$level", ERROR_LEVELS]}, "$message", None]
+                        }
+                    },
+                    "count": {"$sum": count},
+                    "last_occurred": {"$max": last_occurred}
+                }
+            },
+            {"$facet": {query: facets[query] for query in queries}}
+        ]
+        
+        kind = {"$in": ["level", "error"]} if "top_errors" in queries else "level"
+        result = next(iter(self._aggregate(pipeline, from_rollup, kind=kind, service=service)), None) or {}
+        
+        stats = {}
+        for query in queries:
+            rows = result.get(query, [])
+            if query == "levels":
+                rows = self._level_distribution(rows)
+            elif query == "error_rate":
+                rows = rows[0] if rows else {"total_logs": 0, "error_logs": 0}
+                rows.pop("_id", None)
+            elif query == "top_errors" and not from_rollup:
+                rows = self.schema.decode_rows(rows)
+            stats[query] = rows
+        return stats
+    
     def get_hourly_stats(
         self,
         hours: int = 24,
-        service: Optional[str] = None
+        service: Optional[str] = None,
+        from_rollup: bool = False,
+        start_time: Optional[datetime] = None
     ) -> List[Dict]:
         """
         시간대별 통계
@@ -161,11 +559,14 @@ class MongoDBClient:
         Args:
             hours: 과거 N시간
             service: 특정 서비스 필터
+            from_rollup: 분 단위 롤업 컬렉션에서 조회
+            start_time: 조회 시작 시각 (지정하면 hours 대신 사용)
         """
         try:
-            start_time = datetime.utcnow() - timedelta(hours=hours)
+            count, time_field = self._source(from_rollup)
+            start_time = start_time or datetime.utcnow() - timedelta(hours=hours)
             
-            match_stage = {"timestamp": {"$gte": start_time}}
+            match_stage = {time_field: {"$gte": start_time}}
             if service:
                 match_stage["service"] = service
             
@@ -176,10 +577,10 @@ class MongoDBClient:
                         "_id": {
                             "$dateToString": {
                                 "format": "%Y-%m-%d-%H",
-                                "date": "$timestamp"
+                                "date": f"${time_field}"
                             }
                         },
-                        "count": {"$sum": 1}
+                        "count": {"$sum": count}
                     }
                 },
                 {"$sort": {"_id": 1}},
@@ -192,22 +593,70 @@ class MongoDBClient:
                 }
             ]
             
-            return list(self.logs_collection.aggregate(pipeline))
+            return list(self._aggregate(pipeline, from_rollup, service=service))
             
+        except QUERY_TIMEOUT_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Error getting hourly stats: {e}")
             return []
     
+    def get_step_counts(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        step: timedelta,
+        split: Optional[str] = None,
+        service: Optional[str] = None,
+        from_rollup: bool = False,
+        granularity: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        [start_time, end_time) 의 step 단위 구간별 로그 수 {bucket, key, count}
+        
+        key 는 split 필드(level / service) 값, split 이 없으면 None.
+        granularity 가 있으면 logs_agg_<granularity> 에서 조회하며, 그 단위가 step 을 나누어야 한다.
+        """
+        if granularity:
+            count, time_field = "$count", "bucket"
+        else:
+            count, time_field = self._source(from_rollup)
+        match = {time_field: {"$gte": start_time, "$lt": end_time}}
+        if service:
+            match["service"] = service
+        
+        stages = [
+            {
+                "$group": {
+                    "_id": {
+                        "bucket": date_trunc(time_field, step),
+                        "key": f"${split}" if split else None
+                    },
+                    "count": {"$sum": count}
+                }
+            }
+        ]
+        if granularity:
+            rows = self.materialized_collections[granularity].aggregate(
+                [{"$match": {"kind": "level", **match}}, *stages]
+            )
+        else:
+            rows = self._aggregate([{"$match": match}, *stages], from_rollup, service=service)
+        return [{**row["_id"], "count": row["count"]} for row in rows]
+    
     def get_error_rate(
         self,
         service: Optional[str] = None,
-        hours: int = 24
+        hours: int = 24,
+        from_rollup: bool = False,
+        start_time: Optional[datetime] = None
     ) -> Dict:
-        """에러율 계산"""
+        """에러율 계산 (start_time 을 지정하면 hours 대신 사용)"""
         try:
-            start_time = datetime.utcnow() - timedelta(hours=hours)
+            count, time_field = self._source(from_rollup)
+            start_time = start_time or datetime.utcnow() - timedelta(hours=hours)
             
-            match_stage = {"timestamp": {"$gte": start_time}}
+            match_stage = {time_field: {"$gte": start_time}}
             if service:
                 match_stage["service"] = service
             
@@ -216,12 +665,12 @@ class MongoDBClient:
                 {
                     "$group": {
                         "_id": None,
-                        "total": {"$sum": 1},
+                        "total": {"$sum": count},
                         "errors": {
                             "$sum": {
                                 "$cond": [
                                     {"$in": ["$level", ["ERROR", "CRITICAL"]]},
-                                    1,
+                                    count,
                                     0
                                 ]
                             }
@@ -242,7 +691,7 @@ class MongoDBClient:
                 }
             ]
             
-            result = list(self.logs_collection.aggregate(pipeline))
+            result = list(self._aggregate(pipeline, from_rollup, service=service))
             
             if result:
                 data = result[0]
@@ -262,27 +711,138 @@ class MongoDBClient:
                 "period": f"last_{hours}_hours"
             }
             
+        except QUERY_TIMEOUT_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Error calculating error rate: {e}")
             return {}
     
-    def get_top_errors(self, limit: int = 10) -> List[Dict]:
-        """빈도가 높은 에러 메시지"""
+    def watermark_field(self) -> str:
+        """증분 집계 기준 필드 (저장 시각 created_at, compact 는 저장하지 않으므로 timestamp)"""
+        return "timestamp" if self.storage_mode == STORAGE_COMPACT else "created_at"
+    
+    def get_level_counts(
+        self,
+        field: str,
+        after: Optional[datetime] = None,
+        upto: Optional[datetime] = None
+    ) -> List[Dict]:
+        """
+        (service, level) 별 원본 로그 수 (field 가 (after, upto] 인 문서)
+        
+        증분 집계 워터마크가 조회 실패로 건너뛰지 않도록 예외는 호출자에게 그대로 전달한다.
+        """
+        condition = {}
+        if after is not None:
+            condition["$gt"] = after
+        if upto is not None:
+            condition["$lte"] = upto
+        
+        pipeline = [
+            {"$match": {field: condition} if condition else {}},
+            {
+                "$group": {
+                    "_id": {"service": "$service", "level": "$level"},
+                    "count": {"$sum": 1}
+                }
+            }
+        ]
+        return [
+            {"service": row["_id"]["service"], "level": row["_id"]["level"], "count": row["count"]}
+            for row in self._aggregate(pipeline, from_rollup=False)
+        ]
+    
+    def get_minute_level_counts(
+        self,
+        field: str,
+        after: Optional[datetime] = None,
+        upto: Optional[datetime] = None,
+        since: Optional[datetime] = None
+    ) -> List[Dict]:
+        """
+        (service, level, 분) 별 원본 로그 수 (field 가 (after, upto] 이고 timestamp >= since 인 문서)
+        
+        예외는 호출자에게 그대로 전달한다.
+        """
+        match: Dict[str, Dict] = {}
+        if after is not None:
+            match.setdefault(field, {})["$gt"] = after
+        if upto is not None:
+            match.setdefault(field, {})["$lte"] = upto
+        if since is not None:
+            match.setdefault("timestamp", {})["$gte"] = since
+        
+        pipeline = [
+            {"$match": match},
+            {
+                "$group": {
+                    "_id": {
+                        "service": "$service",
+                        "level": "$level",
+                        "minute": {"$dateTrunc": {"date": "$timestamp", "unit": "minute"}}
+                    },
+                    "count": {"$sum": 1}
+                }
+            }
+        ]
+        return [
+            {**row["_id"], "count": row["count"]}
+            for row in self._aggregate(pipeline, from_rollup=False)
+        ]
+    
+    def watch_log_inserts(self, resume_token: Optional[Dict] = None, max_await_time_ms: int = 1000):
+        """
+        로그 컬렉션(라우팅/파티션 포함) insert change stream
+        
+        데이터베이스 단위로 열고 컬렉션 이름으로 거른다. 집계에 필요한 필드만 받는다.
+        replica set 이 아니면 OperationFailure 가 발생한다.
+        """
+        pipeline = [
+            {
+                "$match": {
+                    "operationType": "insert",
+                    "ns.coll": {"$regex": self.router.collection_pattern()}
+                }
+            },
+            {
+                "$project": {
+                    "ns": 1,
+                    **{
+                        f"fullDocument.{name}": 1
+                        for name in ("timestamp", "service", "level", "created_at", "meta", "t", "s", "l")
+                    }
+                }
+            }
+        ]
+        return self.db.watch(
+            pipeline, resume_after=resume_token, max_await_time_ms=max_await_time_ms
+        )
+    
+    def get_top_errors(
+        self,
+        limit: int = 10,
+        from_rollup: bool = False,
+        start_time: Optional[datetime] = None
+    ) -> List[Dict]:
+        """빈도가 높은 에러 메시지 (start_time 을 지정하면 그 이후만)"""
         try:
+            count, time_field = self._source(from_rollup)
+            last_occurred = "$last_occurred" if from_rollup else "$timestamp"
+            
+            match_stage = {"level": {"$in": ["ERROR", "CRITICAL"]}}
+            if start_time is not None:
+                match_stage[time_field] = {"$gte": start_time}
+            
             pipeline = [
-                {
-                    "$match": {
-                        "level": {"$in": ["ERROR", "CRITICAL"]}
-                    }
-                },
+                {"$match": match_stage},
                 {
                     "$group": {
                         "_id": {
                             "message": "$message",
                             "service": "$service"
                         },
-                        "count": {"$sum": 1},
-                        "last_occurred": {"$max": "$timestamp"}
+                        "count": {"$sum": count},
+                        "last_occurred": {"$max": last_occurred}
                     }
                 },
                 {"$sort": {"count": -1}},
@@ -298,20 +858,650 @@ class MongoDBClient:
                 }
             ]
             
-            return list(self.logs_collection.aggregate(pipeline))
+            results = list(self._aggregate(pipeline, from_rollup, kind="error"))
             
+            return results if from_rollup else self.schema.decode_rows(results)
+            
+        except QUERY_TIMEOUT_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Error getting top errors: {e}")
             return []
     
+    def get_error_minute_counts(
+        self,
+        since: datetime,
+        field: str,
+        upto: datetime,
+        after: Optional[datetime] = None
+    ) -> List[Dict]:
+        """
+        (service, message, 분) 별 에러 로그 수 (Top 에러 sketch 갱신용)
+        
+        Args:
+            since: 이 timestamp 이후 로그만
+            field: 증분 기준 필드 (watermark_field)
+            upto: field 가 upto 이하인 문서만
+            after: field 가 after 보다 큰 문서만 (None 이면 처음부터)
+        
+        Returns:
+            [{service, message, minute, count, last_occurred}]
+        """
+        match = {"level": {"$in": ERROR_LEVELS}, "timestamp": {"$gte": since}}
+        field_range = match.setdefault(field, {})
+        field_range["$lte"] = upto
+        if after is not None:
+            field_range["$gt"] = after
+        
+        pipeline = [
+            {"$match": match},
+            {
+                "$group": {
+                    "_id": {
+                        "service": "$service",
+                        "message": "$message",
+                        "minute": {"$dateTrunc": {"date": "$timestamp", "unit": "minute"}}
+                    },
+                    "count": {"$sum": 1},
+                    "last_occurred": {"$max": "$timestamp"}
+                }
+            },
+            {"$replaceRoot": {"newRoot": {"$mergeObjects": ["$_id", {
+                "count": "$count", "last_occurred": "$last_occurred"
+            }]}}}
+        ]
+        return self.schema.decode_rows(list(self._aggregate(pipeline, from_rollup=False, allowDiskUse=True)))
+    
+    def _time_range(self, start_time: datetime, end_time: datetime) -> Dict:
+        """원본 logs 기간 조건 (저장 모드 필드 이름)"""
+        return self.schema.translate_match(
+            {"timestamp": {"$gte": start_time, "$lt": end_time}}
+        )
+    
+    def get_oldest_log_time(self) -> Optional[datetime]:
+        """가장 오래된 원본 로그의 timestamp"""
+        time_field = self.schema.field("timestamp")
+        oldest = [
+            doc[time_field]
+            for collection in self._log_collections()
+            for doc in [collection.find_one({}, projection={time_field: 1}, sort=[(time_field, 1)])]
+            if doc
+        ]
+        return min(oldest) if oldest else None
+    
+    def count_logs(self, start_time: datetime, end_time: datetime) -> int:
+        """기간 내 원본 로그 수"""
+        time_range = self._time_range(start_time, end_time)
+        return sum(
+            collection.count_documents(time_range)
+            for collection in self._log_collections(start_time=start_time, end_time=end_time)
+        )
+    
+    def iter_logs(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        batch_size: int = 5000
+    ) -> Iterator[Dict]:
+        """기간 내 원본 로그를 표준 필드 문서로 순회 (아카이브 내보내기용)"""
+        pipeline = [
+            {"$match": {"timestamp": {"$gte": start_time, "$lt": end_time}}},
+            {
+                "$project": {
+                    "timestamp": 1,
+                    "service": 1,
+                    "level": 1,
+                    "message": 1,
+                    "metadata": 1
+                }
+            }
+        ]
+        cursor = self._aggregate(
+            pipeline,
+            from_rollup=False,
+            allowDiskUse=True,
+            batchSize=batch_size
+        )
+        
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield from self.schema.decode_rows(batch)
+                batch = []
+        yield from self.schema.decode_rows(batch)
+    
+    def delete_logs(self, start_time: datetime, end_time: datetime) -> int:
+        """
+        기간 내 원본 로그 삭제
+        
+        기간에 통째로 들어가는 일자 파티션은 문서 단위 삭제 대신 컬렉션을 drop 한다
+        (인덱스 갱신/oplog 없이 메타데이터만 변경).
+        """
+        time_range = self._time_range(start_time, end_time)
+        deleted = 0
+        dropped = []
+        for collection in self._log_collections(start_time=start_time, end_time=end_time):
+            parsed = parse_partition(collection.name) if self.router.partitioned else None
+            if parsed:
+                day_start, day_end = partition_bounds(parsed[1])
+                if start_time <= day_start and day_end <= end_time:
+                    deleted += collection.count_documents({})
+                    collection.drop()
+                    dropped.append(collection.name)
+                    continue
+            deleted += collection.delete_many(time_range).deleted_count
+        
+        if dropped:
+            self.router.invalidate()
+            logger.info(f"Dropped log partitions: {', '.join(dropped)}")
+        return deleted
+    
+    def get_archive_state(self, key: str) -> Optional[Dict]:
+        """아카이브 상태 문서 조회"""
+        return self.archive_state_collection.find_one({"_id": key})
+    
+    def set_archive_state(self, key: str, fields: Dict):
+        """아카이브 상태 문서 갱신"""
+        self.archive_state_collection.update_one(
+            {"_id": key}, {"$set": fields}, upsert=True
+        )
+    
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: int) -> bool:
+        """
+        작업 리스 획득 (여러 Aggregator 인스턴스 중 하나만 실행)
+        
+        만료되었거나 자신이 가진 리스만 갱신할 수 있다.
+        """
+        now = datetime.utcnow()
+        try:
+            self.archive_state_collection.find_one_and_update(
+                {
+                    "_id": f"lease:{name}",
+                    "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]
+                },
+                {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # 다른 인스턴스가 유효한 리스를 보유
+            return False
+    
+    def get_blobs(self, digests: List[str]) -> Dict[str, str]:
+        """blob 해시 -> 원문 (Consumer가 중복 제거한 stack trace 등)"""
+        try:
+            return {
+                doc["_id"]: doc["value"]
+                for doc in self.blobs_collection.find({"_id": {"$in": list(digests)}})
+            }
+        except QUERY_TIMEOUT_ERRORS:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting blobs: {e}")
+            return {}
+    
+    def get_distinct_blob_stats(
+        self,
+        field: str = "stack_trace",
+        hours: int = 24,
+        service: Optional[str] = None,
+        limit: int = 10
+    ) -> Dict:
+        """
+        blob 참조(metadata._blobs.<field>)별 발생 건수
+        
+        Returns:
+            {"distinct_count", "total_occurrences", "traces": [{fingerprint, count, services, last_occurred}]}
+        """
+        try:
+            ref_field = f"metadata._blobs.{field}"
+            match_stage = {
+                "timestamp": {"$gte": datetime.utcnow() - timedelta(hours=hours)},
+                ref_field: {"$exists": True}
+            }
+            if service:
+                match_stage["service"] = service
+            
+            pipeline = [
+                {"$match": match_stage},
+                {
+                    "$group": {
+                        "_id": f"${ref_field}",
+                        "count": {"$sum": 1},
+                        "services": {"$addToSet": "$service"},
+                        "last_occurred": {"$max": "$timestamp"}
+                    }
+                },
+                {
+                    "$facet": {
+                        "summary": [
+                            {
+                                "$group": {
+                                    "_id": None,
+                                    "distinct_count": {"$sum": 1},
+                                    "total_occurrences": {"$sum": "$count"}
+                                }
+                            }
+                        ],
+                        "traces": [
+                            {"$sort": {"count": -1}},
+                            {"$limit": limit},
+                            {
+                                "$project": {
+                                    "fingerprint": "$_id",
+                                    "count": 1,
+                                    "services": 1,
+                                    "last_occurred": 1,
+                                    "_id": 0
+                                }
+                            }
+                        ]
+                    }
+                }
+            ]
+            
+            result = list(self._aggregate(pipeline, from_rollup=False, service=service))
+            facet = result[0] if result else {"summary": [], "traces": []}
+            summary = facet["summary"][0] if facet["summary"] else {}
+            
+            return {
+                "distinct_count": summary.get("distinct_count", 0),
+                "total_occurrences": summary.get("total_occurrences", 0),
+                "traces": facet["traces"]
+            }
+            
+        except QUERY_TIMEOUT_ERRORS:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting distinct blob stats: {e}")
+            return {"distinct_count": 0, "total_occurrences": 0, "traces": []}
+    
     def save_hourly_stats(self, stats: Dict):
-        """시간대별 통계 저장"""
+        """시간대별 통계 저장 (같은 hour 는 덮어쓴다)"""
         try:
-            self.hourly_stats_collection.insert_one(stats)
+            self.hourly_stats_collection.update_one(
+                {"hour": stats["hour"]}, {"$set": stats}, upsert=True
+            )
             logger.debug(f"Hourly stats saved: {stats}")
         except Exception as e:
             logger.error(f"Error saving hourly stats: {e}")
     
+    # ------------------------------------------------------------------
+    # 재계산 롤업 (logs_agg_minute / hour / day)
+    # ------------------------------------------------------------------
+    def ensure_rollup_indexes(self):
+        """재계산 롤업 인덱스 생성"""
+        for collection in self.materialized_collections.values():
+            collection.create_index([("kind", ASCENDING), ("bucket", ASCENDING)])
+            collection.create_index(
+                [("kind", ASCENDING), ("service", ASCENDING), ("bucket", ASCENDING)]
+            )
+            collection.create_index([("bucket", ASCENDING), ("materialized_at", ASCENDING)])
+    
+    def get_touched_minutes(self, field: str, after: datetime, upto: datetime) -> List[datetime]:
+        """field 가 (after, upto] 인 (새로 저장된) 문서가 속한 분 (timestamp 기준)"""
+        pipeline = [
+            {"$match": {field: {"$gt": after, "$lte": upto}}},
+            {"$group": {"_id": {"$dateTrunc": {"date": "$timestamp", "unit": "minute"}}}},
+            {"$sort": {"_id": 1}}
+        ]
+        return [row["_id"] for row in self._aggregate(pipeline, from_rollup=False)]
+    
+    def compute_minute_rollups(self, start_time: datetime, end_time: datetime) -> List[Dict]:
+        """원본 logs [start_time, end_time) -> 분 단위 롤업 문서 (level / error)"""
+        bucket = {"$dateTrunc": {"date": "$timestamp", "unit": "minute"}}
+        time_range = {"timestamp": {"$gte": start_time, "$lt": end_time}}
+        
+        level_rows = self._aggregate([
+            {"$match": time_range},
+            {
+                "$group": {
+                    "_id": {"bucket": bucket, "service": "$service", "level": "$level"},
+                    "count": {"$sum": 1}
+                }
+            }
+        ], from_rollup=False, allowDiskUse=True)
+        docs = [
+            self._rollup_doc("level", row["_id"], row["count"])
+            for row in level_rows
+        ]
+        
+        error_rows = list(self._aggregate([
+            {"$match": {**time_range, "level": {"$in": ERROR_LEVELS}}},
+            {
+                "$group": {
+                    "_id": {
+                        "bucket": bucket,
+                        "service": "$service",
+                        "level": "$level",
+                        "message": "$message"
+                    },
+                    "count": {"$sum": 1},
+                    "last_occurred": {"$max": "$timestamp"}
+                }
+            },
+            {"$replaceRoot": {"newRoot": {"$mergeObjects": ["$_id", {
+                "count": "$count", "last_occurred": "$last_occurred"
+            }]}}}
+        ], from_rollup=False, allowDiskUse=True))
+        for row in self.schema.decode_rows(error_rows):
+            docs.append(self._rollup_doc("error", row, row["count"], row["last_occurred"]))
+        
+        sketch = LatencySketch()
+        rows = self.get_latency_buckets(start_time, end_time, math.log(sketch.gamma), by_minute=True)
+        for (bucket, service, endpoint), latency in sketches_from_rows(
+            rows, sketch.gamma, ("minute", "service", "endpoint")
+        ).items():
+            docs.append(self._latency_doc(bucket, service, endpoint, latency))
+        
+        distinct: Dict[tuple, HyperLogLog] = {}
+        for row in self.iter_distinct_values(start_time, end_time, DISTINCT_FIELDS, by_minute=True):
+            key = (row["minute"], row["service"], row["level"], row["field"])
+            sketch = distinct.get(key)
+            if sketch is None:
+                sketch = distinct[key] = HyperLogLog()
+            sketch.add(row["value"])
+        docs.extend(self._distinct_doc(*key, sketch) for key, sketch in distinct.items())
+        return docs
+    
+    def compute_coarser_rollups(
+        self,
+        granularity: str,
+        start_time: datetime,
+        end_time: datetime
+    ) -> List[Dict]:
+        """한 단계 작은 롤업 [start_time, end_time) -> granularity(hour / day) 롤업 문서"""
+        source = self.materialized_collections[
+            ROLLUP_GRANULARITIES[ROLLUP_GRANULARITIES.index(granularity) - 1]
+        ]
+        time_range = {"$gte": start_time, "$lt": end_time}
+        rows = source.aggregate([
+            {"$match": {"kind": {"$in": ["level", "error"]}, "bucket": time_range}},
+            {
+                "$group": {
+                    "_id": {
+                        "kind": "$kind",
+                        "bucket": {"$dateTrunc": {"date": "$bucket", "unit": granularity}},
+                        "service": "$service",
+                        "level": "$level",
+                        "message": "$message"
+                    },
+                    "count": {"$sum": "$count"},
+                    "last_occurred": {"$max": "$last_occurred"}
+                }
+            }
+        ], allowDiskUse=True)
+        docs = [
+            self._rollup_doc(row["_id"]["kind"], row["_id"], row["count"], row.get("last_occurred"))
+            for row in rows
+        ]
+        
+        # sketch 문서는 MongoDB 에서 합칠 수 없으므로 읽어서 합친다
+        sketch_kinds = {
+            "latency": (LatencySketch, ("service", "endpoint"), self._latency_doc),
+            "distinct": (HyperLogLog, ("service", "level", "field"), self._distinct_doc),
+        }
+        merged: Dict[tuple, object] = {}
+        for doc in source.find({"kind": {"$in": list(sketch_kinds)}, "bucket": time_range}):
+            sketch_class, key_fields, _ = sketch_kinds[doc["kind"]]
+            bucket = self._truncate(doc["bucket"], granularity)
+            key = (doc["kind"], bucket, *(doc[field] for field in key_fields))
+            sketch = sketch_class.from_binary(doc["sketch"])
+            if key in merged:
+                merged[key].merge(sketch)
+            else:
+                merged[key] = sketch
+        docs.extend(
+            sketch_kinds[kind][2](*key, sketch) for (kind, *key), sketch in merged.items()
+        )
+        return docs
+    
+    @staticmethod
+    def _truncate(ts: datetime, granularity: str) -> datetime:
+        if granularity == "day":
+            return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+        return ts.replace(minute=0, second=0, microsecond=0)
+    
+    @staticmethod
+    def _rollup_doc(kind: str, key: Dict, count: int, last_occurred: Optional[datetime] = None) -> Dict:
+        """결정적 _id 롤업 문서 (같은 버킷을 다시 계산해도 같은 문서를 덮어쓴다)"""
+        doc_id = f"{kind}|{key['bucket'].isoformat()}|{key['service']}|{key['level']}"
+        doc = {
+            "kind": kind,
+            "bucket": key["bucket"],
+            "service": key["service"],
+            "level": key["level"],
+            "count": count,
+        }
+        if kind == "error":
+            doc_id += f"|{message_key(key.get('message'))}"
+            doc["message"] = key.get("message")
+            doc["last_occurred"] = last_occurred
+        doc["_id"] = doc_id
+        return doc
+    
+    @staticmethod
+    def _latency_doc(bucket: datetime, service: str, endpoint: str, sketch: LatencySketch) -> Dict:
+        """latency sketch 롤업 문서 (결정적 _id, sketch 는 압축 바이너리)"""
+        return {
+            "_id": f"latency|{bucket.isoformat()}|{service}|{endpoint}",
+            "kind": "latency",
+            "bucket": bucket,
+            "service": service,
+            "endpoint": endpoint,
+            "count": sketch.count,
+            "sketch": sketch.to_binary(),
+        }
+    
+    @staticmethod
+    def _distinct_doc(bucket: datetime, service: str, level: str, field: str, sketch: HyperLogLog) -> Dict:
+        """metadata 필드 고유 값 HyperLogLog 롤업 문서 (결정적 _id)"""
+        return {
+            "_id": f"distinct|{bucket.isoformat()}|{service}|{level}|{field}",
+            "kind": "distinct",
+            "bucket": bucket,
+            "service": service,
+            "level": level,
+            "field": field,
+            "sketch": sketch.to_binary(),
+        }
+    
+    def iter_distinct_values(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        fields: Iterable[str],
+        service: Optional[str] = None,
+        levels: Optional[List[str]] = None,
+        by_minute: bool = False
+    ) -> Iterator[Dict]:
+        """
+        원본 logs 의 (service, level, metadata 필드, 값) 고유 조합 (HyperLogLog 갱신용, 스트리밍)
+        
+        Yields:
+            {service, level, field, value[, minute]}
+        """
+        match = {"timestamp": {"$gte": start_time, "$lt": end_time}}
+        if service:
+            match["service"] = service
+        if levels:
+            match["level"] = {"$in": levels}
+        
+        project = {
+            "service": 1,
+            "level": 1,
+            "values": [{"field": field, "value": f"$metadata.{field}"} for field in fields]
+        }
+        group_id = {
+            "service": "$service",
+            "level": "$level",
+            "field": "$values.field",
+            "value": "$values.value"
+        }
+        if by_minute:
+            project["minute"] = {"$dateTrunc": {"date": "$timestamp", "unit": "minute"}}
+            group_id["minute"] = "$minute"
+        
+        pipeline = [
+            {"$match": match},
+            {"$project": project},
+            {"$unwind": "$values"},
+            {"$match": {"values.value": {"$ne": None}}},
+            {"$group": {"_id": group_id}}
+        ]
+        for row in self._aggregate(pipeline, from_rollup=False, service=service, allowDiskUse=True):
+            yield row["_id"]
+    
+    def get_distinct_rollups(
+        self,
+        granularity: str,
+        start_time: datetime,
+        end_time: datetime,
+        field: str,
+        service: Optional[str] = None,
+        levels: Optional[List[str]] = None
+    ) -> Iterator[Dict]:
+        """재계산 롤업의 HyperLogLog 문서"""
+        query = {"kind": "distinct", "field": field, "bucket": {"$gte": start_time, "$lt": end_time}}
+        if service:
+            query["service"] = service
+        if levels:
+            query["level"] = {"$in": levels}
+        return self.materialized_collections[granularity].find(
+            query, projection={"service": 1, "level": 1, "sketch": 1}
+        )
+    
+    def get_latency_buckets(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        ln_gamma: float,
+        service: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        by_minute: bool = False
+    ) -> List[Dict]:
+        """
+        원본 logs 의 metadata.response_time_ms 로그 버킷별 건수 (값 자체는 가져오지 않는다)
+        
+        Returns:
+            [{service, endpoint, index, count[, minute]}]
+        """
+        match = {
+            "timestamp": {"$gte": start_time, "$lt": end_time},
+            "metadata.response_time_ms": {"$type": "number"}
+        }
+        if service:
+            match["service"] = service
+        if endpoint:
+            match["metadata.endpoint"] = endpoint
+        
+        value = "$metadata.response_time_ms"
+        group_id = {
+            "service": "$service",
+            "endpoint": {"$ifNull": ["$metadata.endpoint", "unknown"]},
+            "index": {
+                "$cond": [
+                    {"$gt": [value, 0]},
+                    {"$toInt": {"$ceil": {"$divide": [{"$ln": value}, ln_gamma]}}},
+                    ZERO_INDEX
+                ]
+            }
+        }
+        if by_minute:
+            group_id["minute"] = {"$dateTrunc": {"date": "$timestamp", "unit": "minute"}}
+        
+        pipeline = [
+            {"$match": match},
+            {"$group": {"_id": group_id, "count": {"$sum": 1}}}
+        ]
+        rows = self._aggregate(pipeline, from_rollup=False, service=service, allowDiskUse=True)
+        return [{**row["_id"], "count": row["count"]} for row in rows]
+    
+    def get_latency_rollups(
+        self,
+        granularity: str,
+        start_time: datetime,
+        end_time: datetime,
+        service: Optional[str] = None,
+        endpoint: Optional[str] = None
+    ) -> List[Dict]:
+        """재계산 롤업의 latency sketch 문서"""
+        query = {"kind": "latency", "bucket": {"$gte": start_time, "$lt": end_time}}
+        if service:
+            query["service"] = service
+        if endpoint:
+            query["endpoint"] = endpoint
+        return list(self.materialized_collections[granularity].find(
+            query, projection={"service": 1, "endpoint": 1, "sketch": 1}
+        ))
+    
+    def replace_rollups(
+        self,
+        granularity: str,
+        start_time: datetime,
+        end_time: datetime,
+        docs: List[Dict],
+        generation: datetime
+    ) -> int:
+        """
+        [start_time, end_time) 버킷을 docs 로 교체 (멱등)
+        
+        _id 로 덮어쓴 뒤, 이번 계산에 없는 (이전 세대) 문서는 지운다.
+        """
+        collection = self.materialized_collections[granularity]
+        operations = [
+            ReplaceOne({"_id": doc["_id"]}, {**doc, "materialized_at": generation}, upsert=True)
+            for doc in docs
+        ]
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+        collection.delete_many({
+            "bucket": {"$gte": start_time, "$lt": end_time},
+            "materialized_at": {"$lt": generation}
+        })
+        return len(operations)
+    
+    def get_level_hour_counts(
+        self,
+        start_time: Optional[datetime],
+        end_time: datetime,
+        service: Optional[str] = None,
+        granularity: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        (service, level, 시간) 별 로그 수 {service, level, hour, count}
+        
+        granularity 가 없으면 원본 logs, 있으면 logs_agg_<granularity> 에서 조회한다.
+        """
+        time_field = "bucket" if granularity else "timestamp"
+        time_range = {"$lt": end_time}
+        if start_time is not None:
+            time_range["$gte"] = start_time
+        match = {time_field: time_range}
+        if service:
+            match["service"] = service
+        
+        stages = [
+            {
+                "$group": {
+                    "_id": {
+                        "service": "$service",
+                        "level": "$level",
+                        "hour": {"$dateToString": {"format": "%Y-%m-%d-%H", "date": f"${time_field}"}}
+                    },
+                    "count": {"$sum": "$count" if granularity else 1}
+                }
+            }
+        ]
+        if granularity:
+            rows = self.materialized_collections[granularity].aggregate(
+                [{"$match": {"kind": "level", **match}}, *stages]
+            )
+        else:
+            rows = self._aggregate([{"$match": match}, *stages], from_rollup=False, service=service)
+        return [{**row["_id"], "count": row["count"]} for row in rows]
+    
     def close(self):
         """연결 종료"""
         if self.client:
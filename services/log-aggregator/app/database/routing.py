@@ -0,0 +1,212 @@
+"""
+서비스별 logs 컬렉션 라우팅 (조회 측)
+
+Consumer 의 routing.py 와 같은 규칙으로 서비스 -> 컬렉션을 계산하고,
+조회할 컬렉션 목록을 돌려준다. 라우팅 전에 쌓인 데이터가 있으므로 logs 는 항상 포함한다.
+
+LOGS_ROUTING:
+    ""/"none"   logs 하나
+    "service"   서비스마다 logs_svc_<서비스> (존재하는 컬렉션을 주기적으로 조회)
+    "a=X,b=X"   서비스 -> 컬렉션 매핑 (나열하지 않은 서비스는 logs)
+
+LOGS_PARTITIONING:
+    ""/"none"   위 컬렉션 그대로
+    "daily"     컬렉션마다 일자 파티션 <컬렉션>_YYYYMMDD. 조회 기간과 겹치는 파티션만 조회하고,
+                파티션을 켜기 전에 쌓인 <컬렉션> 은 첫 파티션 이전 구간을 조회할 때만 포함한다
+"""
+
+import re
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+DEFAULT_COLLECTION = "logs"
+SERVICE_COLLECTION_PREFIX = "logs_svc_"
+
+ROUTING_NONE = "none"
+ROUTING_SERVICE = "service"
+ROUTING_GROUPS = "groups"
+
+PARTITION_NONE = "none"
+PARTITION_DAILY = "daily"
+PARTITION_MODES = (PARTITION_NONE, PARTITION_DAILY)
+
+_PARTITION_PATTERN = re.compile(r"^(.+)_(\d{8})$")
+
+
+def service_collection(service: str) -> str:
+    """서비스 전용 컬렉션 이름 (영숫자 외 문자는 _)"""
+    return SERVICE_COLLECTION_PREFIX + re.sub(r"[^A-Za-z0-9]+", "_", service).strip("_").lower()
+
+
+def partition_collection(collection: str, day: date) -> str:
+    """일자 파티션 컬렉션 이름 (예: logs_20240101)"""
+    return f"{collection}_{day:%Y%m%d}"
+
+
+def parse_partition(name: str) -> Optional[Tuple[str, date]]:
+    """파티션 컬렉션 이름 -> (기준 컬렉션, 일자), 파티션이 아니면 None"""
+    match = _PARTITION_PATTERN.match(name)
+    if not match:
+        return None
+    try:
+        return match.group(1), datetime.strptime(match.group(2), "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def partition_bounds(day: date) -> Tuple[datetime, datetime]:
+    """파티션이 담는 기간 [00:00, 다음날 00:00) (naive UTC)"""
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+
+class CollectionRouter:
+    """조회 대상 logs 컬렉션 계산"""
+
+    def __init__(self, spec: str = "", discovery_ttl: float = 60.0, partitioning: str = PARTITION_NONE):
+        """
+        Args:
+            spec: LOGS_ROUTING 값
+            discovery_ttl: 컬렉션 목록 캐시 시간 (초, service 모드 / daily 파티션)
+            partitioning: LOGS_PARTITIONING 값 (none | daily)
+        """
+        spec = (spec or "").strip()
+        partitioning = (partitioning or PARTITION_NONE).strip().lower()
+        if partitioning not in PARTITION_MODES:
+            raise ValueError(f"Invalid LOGS_PARTITIONING: {partitioning!r}")
+
+        self.mode = ROUTING_NONE
+        self.groups: Dict[str, str] = {}
+        self.partitioning = partitioning
+        self.discovery_ttl = discovery_ttl
+        self._names: Set[str] = set()
+        self._partitions: Dict[str, List[date]] = {}
+        self._discovered_at = float("-inf")
+
+        if spec.lower() == ROUTING_SERVICE:
+            self.mode = ROUTING_SERVICE
+        elif spec and spec.lower() != ROUTING_NONE:
+            for entry in spec.split(","):
+                service, _, collection = entry.partition("=")
+                if not service.strip() or not collection.strip():
+                    raise ValueError(f"Invalid LOGS_ROUTING entry: {entry!r}")
+                self.groups[service.strip()] = collection.strip()
+            self.mode = ROUTING_GROUPS
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != ROUTING_NONE
+
+    @property
+    def partitioned(self) -> bool:
+        return self.partitioning == PARTITION_DAILY
+
+    def invalidate(self):
+        """컬렉션 목록 캐시 무효화 (파티션 drop 후)"""
+        self._discovered_at = float("-inf")
+
+    def _discover(self, db):
+        """존재하는 logs* 컬렉션과 일자 파티션 목록 (캐시)"""
+        now = time.monotonic()
+        if now - self._discovered_at < self.discovery_ttl:
+            return
+
+        names: Set[str] = set()
+        partitions: Dict[str, List[date]] = {}
+        for name in db.list_collection_names(filter={"name": {"$regex": f"^{DEFAULT_COLLECTION}"}}):
+            parsed = parse_partition(name) if self.partitioned else None
+            if parsed:
+                partitions.setdefault(parsed[0], []).append(parsed[1])
+            else:
+                names.add(name)
+
+        self._names = names
+        self._partitions = {base: sorted(days) for base, days in partitions.items()}
+        self._discovered_at = now
+
+    def _service_collections(self, db) -> List[str]:
+        """존재하는 서비스 전용 컬렉션 (파티션만 있는 컬렉션 포함)"""
+        self._discover(db)
+        return sorted(
+            name for name in self._names | self._partitions.keys()
+            if name.startswith(SERVICE_COLLECTION_PREFIX)
+        )
+
+    def _base_collections(self, db, service: Optional[str]) -> List[str]:
+        """라우팅 기준 컬렉션 목록 (파티션 적용 전)"""
+        if self.mode == ROUTING_NONE:
+            return [DEFAULT_COLLECTION]
+
+        if self.mode == ROUTING_GROUPS:
+            if service:
+                names = [self.groups.get(service, DEFAULT_COLLECTION)]
+            else:
+                names = sorted(set(self.groups.values()))
+        else:
+            existing = self._service_collections(db)
+            if service:
+                names = [name for name in existing if name == service_collection(service)]
+            else:
+                names = list(existing)
+
+        return names + [DEFAULT_COLLECTION] if DEFAULT_COLLECTION not in names else names
+
+    def _partitioned_collections(
+        self,
+        base: str,
+        start_time: Optional[datetime],
+        end_time: Optional[datetime]
+    ) -> List[str]:
+        """기간 [start_time, end_time) 과 겹치는 파티션 (+ 파티션 이전 데이터가 있는 기준 컬렉션)"""
+        days = self._partitions.get(base, [])
+        names = [
+            partition_collection(base, day)
+            for day in days
+            if (start_time is None or partition_bounds(day)[1] > start_time)
+            and (end_time is None or partition_bounds(day)[0] < end_time)
+        ]
+
+        # 파티션을 켜기 전에 쌓인 데이터는 첫 파티션 이전 구간에만 있다
+        if base in self._names and (
+            not days or start_time is None or start_time < partition_bounds(days[0])[0]
+        ):
+            names.append(base)
+        return names
+
+    def collection_pattern(self) -> str:
+        """로그 컬렉션 이름 정규식 (change stream 필터용, 라우팅/파티션 포함)"""
+        names = [re.escape(DEFAULT_COLLECTION)]
+        names += [re.escape(name) for name in sorted(set(self.groups.values()))]
+        if self.mode == ROUTING_SERVICE:
+            names.append(re.escape(SERVICE_COLLECTION_PREFIX) + r"\w+")
+        suffix = r"(_\d{8})?" if self.partitioned else ""
+        return f"^({'|'.join(names)}){suffix}$"
+
+    def collections(
+        self,
+        db,
+        service: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None
+    ) -> List[str]:
+        """
+        조회할 컬렉션 목록 (첫 번째가 파이프라인 기준 컬렉션)
+
+        service 를 지정하면 해당 서비스가 저장된 컬렉션만 (+ logs) 조회한다.
+        daily 파티션이면 기간 [start_time, end_time) 과 겹치는 일자 파티션만 조회한다.
+        """
+        bases = self._base_collections(db, service)
+        if not self.partitioned:
+            return bases
+
+        self._discover(db)
+        # 끝이 없으면 현재까지 (미리 만들어 둔 내일 파티션은 비어 있다)
+        end_time = end_time or datetime.utcnow()
+        names = [
+            name
+            for base in bases
+            for name in self._partitioned_collections(base, start_time, end_time)
+        ]
+        # 조회할 컬렉션이 없어도 빈 결과를 돌려주는 파이프라인 기준 컬렉션은 필요하다
+        return names or [DEFAULT_COLLECTION]
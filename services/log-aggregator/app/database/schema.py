@@ -0,0 +1,213 @@
+"""
+logs 컬렉션 저장 모드별 스키마 매핑
+
+집계 쿼리는 표준 필드 이름(timestamp, service, level, message)으로 작성하고,
+스키마가 $match 조건과 파이프라인 앞단을 실제 저장 형태에 맞게 변환한다.
+"""
+import time
+from typing import Any, Dict, List
+
+STORAGE_STANDARD = "standard"
+STORAGE_TIMESERIES = "timeseries"
+STORAGE_COMPACT = "compact"
+
+
+class LogSchema:
+    """표준 스키마 (필드 이름 그대로 저장)"""
+
+    name = STORAGE_STANDARD
+
+    def field(self, name: str) -> str:
+        """표준 필드 이름 -> 저장된 필드 경로"""
+        return name
+
+    def translate_match(self, match: Dict) -> Dict:
+        """표준 필드 이름으로 작성된 $match 조건을 저장 필드로 변환"""
+        return {self.field(key): value for key, value in match.items()}
+
+    def normalize_stages(self) -> List[Dict]:
+        """$match 이후 문서를 표준 필드 이름으로 맞추는 스테이지"""
+        return []
+
+    def decode_rows(self, rows: List[Dict]) -> List[Dict]:
+        """집계 결과의 message 값을 원문으로 복원 (compact 스키마용)"""
+        return rows
+
+    def decode_document(self, doc: Dict) -> Dict:
+        """저장된 문서 1건 -> 표준 필드 (timestamp, service, level, created_at), change stream 용"""
+        return {
+            "timestamp": doc.get("timestamp"),
+            "service": doc.get("service", "unknown"),
+            "level": doc.get("level", "UNKNOWN"),
+            "created_at": doc.get("created_at"),
+        }
+
+
+class TimeSeriesLogSchema(LogSchema):
+    """time-series 컬렉션 스키마 (service/level은 metaField 하위)"""
+
+    name = STORAGE_TIMESERIES
+    META_FIELDS = ("service", "level")
+
+    def field(self, name: str) -> str:
+        if name in self.META_FIELDS:
+            return f"meta.{name}"
+        return name
+
+    def normalize_stages(self) -> List[Dict]:
+        return [
+            {"$addFields": {name: f"$meta.{name}" for name in self.META_FIELDS}}
+        ]
+
+    def decode_document(self, doc: Dict) -> Dict:
+        meta = doc.get("meta") or {}
+        return {
+            "timestamp": doc.get("timestamp"),
+            "service": meta.get("service", "unknown"),
+            "level": meta.get("level", "UNKNOWN"),
+            "created_at": doc.get("created_at"),
+        }
+
+
+class CompactLogSchema(LogSchema):
+    """
+    compact 스키마 (짧은 필드 이름 + 사전 코드)
+
+    {"t": timestamp, "s": service 코드, "l": level 코드, "m": 템플릿 ID, "md": metadata}
+    service/level 코드는 log_dictionary, 메시지 원문은 log_templates 에서 복원한다.
+    """
+
+    name = STORAGE_COMPACT
+    FIELDS = {
+        "timestamp": "t",
+        "service": "s",
+        "level": "l",
+        "message": "m",
+        "metadata": "md",
+    }
+    CODED_FIELDS = ("service", "level")
+    DICTIONARY_TTL = 60  # 사전 재로드 주기 (초)
+
+    def __init__(self, db):
+        self.dictionary = db["log_dictionary"]
+        self.templates = db["log_templates"]
+        self.codes: Dict[str, Dict[str, int]] = {}
+        self.values: Dict[str, Dict[int, str]] = {}
+        self.template_messages: Dict[int, str] = {}
+        self._loaded_at = 0.0
+
+    def _load_dictionary(self):
+        """service/level 코드 사전 로드 (DICTIONARY_TTL 동안 캐시)"""
+        if time.monotonic() - self._loaded_at < self.DICTIONARY_TTL:
+            return
+
+        codes: Dict[str, Dict[str, int]] = {kind: {} for kind in self.CODED_FIELDS}
+        for doc in self.dictionary.find({"kind": {"$in": list(self.CODED_FIELDS)}}):
+            codes[doc["kind"]][doc["value"]] = doc["code"]
+
+        self.codes = codes
+        self.values = {
+            kind: {code: value for value, code in kind_codes.items()}
+            for kind, kind_codes in codes.items()
+        }
+        self._loaded_at = time.monotonic()
+
+    def field(self, name: str) -> str:
+        # metadata.x 같은 하위 경로도 첫 segment 만 변환
+        head, dot, rest = name.partition(".")
+        return f"{self.FIELDS.get(head, head)}{dot}{rest}"
+
+    def _encode_value(self, name: str, value: Any) -> Any:
+        """조건 값(문자열, {$in: [...]} 등)을 사전 코드로 변환 (없는 값은 -1)"""
+        if name not in self.CODED_FIELDS:
+            return value
+
+        codes = self.codes.get(name, {})
+        if isinstance(value, str):
+            return codes.get(value, -1)
+        if isinstance(value, dict):
+            return {
+                op: (
+                    [codes.get(v, -1) for v in operand]
+                    if isinstance(operand, list)
+                    else codes.get(operand, -1)
+                )
+                for op, operand in value.items()
+            }
+        return value
+
+    def translate_match(self, match: Dict) -> Dict:
+        self._load_dictionary()
+        return {
+            self.field(key): self._encode_value(key, value)
+            for key, value in match.items()
+        }
+
+    def normalize_stages(self) -> List[Dict]:
+        self._load_dictionary()
+
+        decoded = {}
+        for name in self.CODED_FIELDS:
+            codes = self.codes.get(name, {})
+            # 코드 -> 값 배열 (비어 있는 코드는 unknown)
+            values = ["unknown"] * (max(codes.values(), default=-1) + 1)
+            for value, code in codes.items():
+                values[code] = value
+            decoded[name] = {
+                "$ifNull": [
+                    {"$arrayElemAt": [{"$literal": values}, f"${self.field(name)}"]},
+                    "unknown"
+                ]
+            }
+
+        return [{
+            "$addFields": {
+                "timestamp": "$t",
+                "message": "$m",
+                "metadata": "$md",
+                **decoded
+            }
+        }]
+
+    def decode_document(self, doc: Dict) -> Dict:
+        decoded = {"timestamp": doc.get("t"), "created_at": None}
+        for name in self.CODED_FIELDS:
+            code = doc.get(self.FIELDS[name])
+            if code not in self.values.get(name, {}) and time.monotonic() - self._loaded_at > 1:
+                # 새로 등록된 코드면 사전을 다시 읽는다 (초당 최대 1회)
+                self._loaded_at = 0.0
+                self._load_dictionary()
+            decoded[name] = self.values.get(name, {}).get(
+                code, "unknown" if name == "service" else "UNKNOWN"
+            )
+        return decoded
+
+    def decode_rows(self, rows: List[Dict]) -> List[Dict]:
+        missing = {
+            row["message"] for row in rows
+            if "message" in row and row["message"] not in self.template_messages
+        }
+        if missing:
+            for doc in self.templates.find({"_id": {"$in": list(missing)}}):
+                self.template_messages[doc["_id"]] = doc["message"]
+
+        for row in rows:
+            if "message" in row:
+                row["message"] = self.template_messages.get(row["message"], str(row["message"]))
+        return rows
+
+
+def get_log_schema(storage_mode: str, db=None) -> LogSchema:
+    """저장 모드 이름으로 스키마 생성 (compact 모드는 사전 조회용 db 필요)"""
+    if storage_mode == STORAGE_COMPACT:
+        return CompactLogSchema(db)
+
+    schemas = {
+        STORAGE_STANDARD: LogSchema,
+        STORAGE_TIMESERIES: TimeSeriesLogSchema,
+    }
+
+    if storage_mode not in schemas:
+        raise ValueError(f"Invalid storage mode: {storage_mode}")
+
+    return schemas[storage_mode]()
@@ -0,0 +1,172 @@
+"""
+재계산 롤업에 저장하는 병합 가능한 sketch (압축 바이너리, to_binary / from_binary)
+
+LatencySketch - 응답 시간 분위수 (로그 버킷, DDSketch - Masson et al. 2019)
+    값 v 는 버킷 ceil(ln(v) / ln(gamma)) 에 세고, gamma = (1 + a) / (1 - a) 이면
+    버킷 대표값의 상대 오차가 a 이하이다. 버킷 번호는 MongoDB 집계($ln, $ceil)에서 계산하고,
+    두 sketch 는 버킷별 건수를 더해 합친다.
+
+HyperLogLog - 고유 값 수 (Flajolet et al. 2007, 작은 값은 linear counting 보정)
+    2^p 개 레지스터, 상대 표준 오차 1.04 / sqrt(2^p) (p=12 이면 약 1.6%).
+    두 sketch 는 레지스터별 최댓값으로 합친다. 값이 적으면 0 이 아닌 레지스터만 저장한다.
+"""
+
+import hashlib
+import math
+import struct
+from typing import Dict, Iterable, Optional, Tuple
+
+from bson import Binary
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+# 0 이하 값을 세는 버킷 번호
+ZERO_INDEX = -(2 ** 31)
+
+# 인코딩: 버전(1B) + gamma(float64) + (버킷 번호 int32, 건수 uint32) 반복
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<Bd")
+_BUCKET = struct.Struct("<iI")
+
+
+def gamma_for(relative_accuracy: float) -> float:
+    return (1 + relative_accuracy) / (1 - relative_accuracy)
+
+
+class LatencySketch:
+    """로그 버킷 분위수 sketch (버킷 번호 -> 건수)"""
+
+    def __init__(self, gamma: float = gamma_for(DEFAULT_RELATIVE_ACCURACY)):
+        self.gamma = gamma
+        self.buckets: Dict[int, int] = {}
+
+    @property
+    def count(self) -> int:
+        return sum(self.buckets.values())
+
+    def add_bucket(self, index: int, count: int):
+        self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def merge(self, other: "LatencySketch"):
+        if not math.isclose(other.gamma, self.gamma):
+            raise ValueError(f"Cannot merge latency sketches with gamma {other.gamma} and {self.gamma}")
+        for index, count in other.buckets.items():
+            self.add_bucket(index, count)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """q 분위수 추정값 (ms, 비어 있으면 None)"""
+        total = self.count
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                if index == ZERO_INDEX:
+                    return 0.0
+                # 버킷 (gamma^(i-1), gamma^i] 의 상대 오차 최소 대표값
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return None
+
+    def to_binary(self) -> Binary:
+        payload = _HEADER.pack(_FORMAT_VERSION, self.gamma) + b"".join(
+            _BUCKET.pack(index, count) for index, count in sorted(self.buckets.items())
+        )
+        return Binary(payload)
+
+    @classmethod
+    def from_binary(cls, data: bytes) -> "LatencySketch":
+        version, gamma = _HEADER.unpack_from(data)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported latency sketch version: {version}")
+        sketch = cls(gamma)
+        for index, count in _BUCKET.iter_unpack(data[_HEADER.size:]):
+            sketch.buckets[index] = count
+        return sketch
+
+
+def sketches_from_rows(rows: Iterable[Dict], gamma: float, key_fields: Tuple[str, ...]) -> Dict[tuple, LatencySketch]:
+    """get_latency_buckets 행 -> key_fields 별 sketch"""
+    sketches: Dict[tuple, LatencySketch] = {}
+    for row in rows:
+        key = tuple(row[field] for field in key_fields)
+        sketch = sketches.get(key)
+        if sketch is None:
+            sketch = sketches[key] = LatencySketch(gamma)
+        sketch.add_bucket(row["index"], row["count"])
+    return sketches
+
+
+DEFAULT_HLL_PRECISION = 12
+
+# 인코딩: 버전(1B) + precision(1B) + 형식(1B) + 레지스터
+#   dense  - 레지스터 2^p 바이트
+#   sparse - (레지스터 번호 uint16, 값 uint8) 반복
+_HLL_HEADER = struct.Struct("<BBB")
+_HLL_SPARSE_ENTRY = struct.Struct("<HB")
+_HLL_DENSE = 0
+_HLL_SPARSE = 1
+
+
+class HyperLogLog:
+    """고유 값 수 추정 sketch (메모리 2^precision 바이트 고정)"""
+
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION):
+        if not 4 <= precision <= 16:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 16: {precision}")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @property
+    def relative_error(self) -> float:
+        """추정값의 상대 표준 오차"""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, value):
+        digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest()
+        hashed = int.from_bytes(digest, "big")
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError(
+                f"Cannot merge HyperLogLog with precision {other.precision} and {self.precision}"
+            )
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+    def to_binary(self) -> Binary:
+        used = [(index, rank) for index, rank in enumerate(self.registers) if rank]
+        if len(used) * _HLL_SPARSE_ENTRY.size < len(self.registers):
+            payload = _HLL_HEADER.pack(_FORMAT_VERSION, self.precision, _HLL_SPARSE) + b"".join(
+                _HLL_SPARSE_ENTRY.pack(index, rank) for index, rank in used
+            )
+        else:
+            payload = _HLL_HEADER.pack(_FORMAT_VERSION, self.precision, _HLL_DENSE) + bytes(self.registers)
+        return Binary(payload)
+
+    @classmethod
+    def from_binary(cls, data: bytes) -> "HyperLogLog":
+        version, precision, layout = _HLL_HEADER.unpack_from(data)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported HyperLogLog version: {version}")
+        sketch = cls(precision)
+        body = data[_HLL_HEADER.size:]
+        if layout == _HLL_DENSE:
+            sketch.registers = bytearray(body)
+        else:
+            for index, rank in _HLL_SPARSE_ENTRY.iter_unpack(body):
+                sketch.registers[index] = rank
+        return sketch
@@ -2,7 +2,7 @@
 통계 데이터 모델
 """
 from datetime import datetime
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Literal
 from pydantic import BaseModel, Field, ConfigDict
 
 
@@ -38,6 +38,17 @@ class TimeSeriesData(BaseModel):
     """시계열 데이터"""
     timestamp: str
     count: int
+    series: Optional[str] = None  # split 기준 값 (level / service)
+
+
+class TimeSeriesResponse(BaseModel):
+    """시계열 응답 (bin_seconds: downsampling 후 실제 구간 크기)"""
+    hours: int
+    service: str
+    step: str
+    split: Optional[str] = None
+    bin_seconds: int
+    data: List[TimeSeriesData]
 
 
 class AggregatedStats(BaseModel):
@@ -63,4 +74,89 @@ class TopErrorsResponse(BaseModel):
     message: str
     count: int
     service: str
-    last_occurred: datetime
\ No newline at end of file
+    last_occurred: datetime
+    max_overcount: int = 0  # sketch 추정치의 최대 초과분 (정확한 집계는 0)
+
+
+class TraceStats(BaseModel):
+    """중복 제거된 blob (stack trace 등) 별 발생 통계"""
+    fingerprint: str
+    count: int
+    services: List[str]
+    last_occurred: datetime
+    value: Optional[str] = None  # rehydrate 요청 시 원문
+
+
+class DistinctTracesResponse(BaseModel):
+    """distinct trace 통계 응답"""
+    field: str
+    distinct_count: int
+    total_occurrences: int
+    period: str
+    traces: List[TraceStats]
+
+
+BatchQuery = Literal["services", "levels", "timeseries", "error_rate", "top_errors"]
+
+
+class BatchStatsRequest(BaseModel):
+    """같은 기간 통계 일괄 조회 요청"""
+    queries: List[BatchQuery] = Field(min_length=1)
+    hours: int = Field(24, ge=1)
+    service: Optional[str] = None
+    top_errors_limit: int = Field(10, ge=1, le=100)
+
+
+class BatchStatsResponse(BaseModel):
+    """통계 일괄 조회 결과 (요청한 항목만 채워진다)"""
+    hours: int
+    service: str
+    services: Optional[List[ServiceStats]] = None
+    levels: Optional[List[LogLevelDistribution]] = None
+    timeseries: Optional[List[TimeSeriesData]] = None
+    error_rate: Optional[ErrorRateResponse] = None
+    top_errors: Optional[List[TopErrorsResponse]] = None
+    generated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class LatencyQuantiles(BaseModel):
+    """응답 시간 분위수 추정값 (ms, 상대 오차 1% 이내)"""
+    count: int
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+
+
+class EndpointLatency(LatencyQuantiles):
+    """(service, endpoint) 별 응답 시간 분위수"""
+    service: str
+    endpoint: str
+
+
+class LatencyResponse(BaseModel):
+    """응답 시간 분위수 조회 결과"""
+    minutes: int
+    service: str
+    endpoint: str
+    overall: LatencyQuantiles
+    endpoints: List[EndpointLatency]
+    generated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ServiceCardinality(BaseModel):
+    """서비스별 고유 값 수 추정"""
+    service: str
+    estimate: int
+
+
+class CardinalityResponse(BaseModel):
+    """metadata 필드 고유 값 수 추정 (HyperLogLog)"""
+    field: str
+    minutes: int
+    service: str
+    levels: List[str]
+    estimate: int
+    relative_error: float  # 상대 표준 오차
+    services: List[ServiceCardinality]
+    generated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -2,39 +2,207 @@
 로그 집계 서비스
 """
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 from typing import Optional, List, Dict
-from app.database.mongodb import MongoDBClient
+from app.database.archive import ParquetArchive
+from app.database.mongodb import QUERY_TIMEOUT_ERRORS, MongoDBClient
+from app.services.cache import QueryCache
+from app.services.cardinality import CardinalityAnalytics
+from app.services.heavy_hitters import WINDOWS, TopErrorTracker
+from app.services.latency import LatencyAnalytics
+from app.services.live import LiveCounters
+from app.services.materializer import RollupMaterializer
+from app.services.retention import HOT_BOUNDARY_KEY
+from app.services.timeseries import add_rows, build_series, floor_bin, resolve_step
 from app.models.stats import (
     ServiceStats,
     LogLevelDistribution,
     AggregatedStats,
     TimeSeriesData,
+    TimeSeriesResponse,
     ErrorRateResponse,
-    TopErrorsResponse
+    TopErrorsResponse,
+    TraceStats,
+    DistinctTracesResponse,
+    BatchStatsRequest,
+    BatchStatsResponse,
+    LatencyResponse,
+    CardinalityResponse
 )
 
 logger = logging.getLogger(__name__)
 
+HOT_BOUNDARY_CACHE_SECONDS = 60
+
+# 엔드포인트별 캐시 TTL (초), CACHE_TTLS 로 덮어쓴다
+DEFAULT_CACHE_TTLS = {
+    "overall": 10.0,
+    "timeseries": 30.0,
+    "error_rate": 15.0,
+    "top_errors": 30.0,
+    "traces": 60.0,
+    "batch": 15.0,
+    "latency": 15.0,
+    "cardinality": 30.0,
+}
+# 조회 기간이 길수록 TTL 을 늘린다 (24시간 기준, 최대 배수)
+MAX_CACHE_TTL_SCALE = 10
+
 
 class LogAggregatorService:
     """로그 집계 서비스"""
     
-    def __init__(self, mongodb_client: MongoDBClient):
+    def __init__(
+        self,
+        mongodb_client: MongoDBClient,
+        use_rollups: bool = False,
+        archive: Optional[ParquetArchive] = None,
+        cache: Optional[QueryCache] = None,
+        cache_ttls: Optional[Dict[str, float]] = None,
+        live: Optional[LiveCounters] = None,
+        materializer: Optional[RollupMaterializer] = None,
+        top_errors: Optional[TopErrorTracker] = None,
+        latency: Optional[LatencyAnalytics] = None,
+        cardinality: Optional[CardinalityAnalytics] = None
+    ):
         """
         Args:
             mongodb_client: MongoDB 클라이언트
+            use_rollups: Consumer가 유지하는 logs_rollup_minute 에서 통계 조회
+            archive: 만료된 구간을 조회할 Parquet 아카이브 (없으면 MongoDB만 조회)
+            cache: 집계 결과 TTL 캐시 (None이면 매번 조회)
+            cache_ttls: 엔드포인트별 TTL (초, DEFAULT_CACHE_TTLS 를 덮어씀, 0이면 캐시 안 함)
+            live: change stream 으로 유지하는 메모리 카운터 (준비되면 overall / 최근 구간 조회에 사용)
+            materializer: 분/시간/일 롤업 (계산된 구간은 원본 logs 대신 가장 큰 단위 롤업에서 조회)
+            top_errors: 기간별 Top 에러 sketch (준비되면 window 조회에 사용)
+            latency: 응답 시간 분위수 sketch 조회
+            cardinality: metadata 필드 고유 값 수 (HyperLogLog) 조회
         """
         self.db = mongodb_client
+        self.use_rollups = use_rollups
+        self.archive = archive
+        self.cache = cache
+        self.cache_ttls = {**DEFAULT_CACHE_TTLS, **(cache_ttls or {})}
+        self.live = live
+        self.materializer = materializer
+        self.top_errors = top_errors
+        self.latency = latency or LatencyAnalytics(mongodb_client, materializer)
+        self.cardinality = cardinality or CardinalityAnalytics(mongodb_client, materializer)
+        self._hot_boundary: Optional[datetime] = None
+        self._hot_boundary_checked = 0.0
+    
+    def _split_range(self, hours: int):
+        """
+        조회 구간을 아카이브 / MongoDB 구간으로 분리
+        
+        Returns:
+            (시작 시각, hot 구간 시작 시각, 아카이브 조회 여부)
+        """
+        start_time = datetime.utcnow() - timedelta(hours=hours)
+        if self.archive is None:
+            return start_time, start_time, False
+        
+        if time.monotonic() - self._hot_boundary_checked > HOT_BOUNDARY_CACHE_SECONDS:
+            state = self.db.get_archive_state(HOT_BOUNDARY_KEY)
+            self._hot_boundary = state["expired_before"] if state else None
+            self._hot_boundary_checked = time.monotonic()
+        
+        if self._hot_boundary is None or start_time >= self._hot_boundary:
+            return start_time, start_time, False
+        return start_time, self._hot_boundary, True
+    
+    def _cached(self, endpoint: str, params: tuple, loader, hours: Optional[int] = None):
+        """
+        캐시를 거쳐 조회 (기간이 있으면 24시간 대비 길이만큼 TTL 을 늘린다)
+        
+        loader 는 조회 타임아웃 블록 안에서 실행한다 (캐시 백그라운드 갱신 스레드 포함).
+        """
+        def timed_loader():
+            with self.db.query_timeout():
+                return loader()
+        
+        if self.cache is None:
+            return timed_loader()
+        
+        ttl = self.cache_ttls.get(endpoint, 0.0)
+        if hours is not None:
+            ttl *= min(max(hours / 24, 1), MAX_CACHE_TTL_SCALE)
+        return self.cache.get(endpoint, params, timed_loader, ttl)
+    
+    def _live_covers(self, hours: Optional[int] = None) -> bool:
+        """메모리 카운터로 조회할 수 있는지 (hours 가 있으면 분 카운터 기간 안인지)"""
+        if self.live is None or not self.live.ready:
+            return False
+        return hours is None or self.live.covers(datetime.utcnow() - timedelta(hours=hours))
+    
+    def _materialized_covers(self, start_time: Optional[datetime]) -> bool:
+        """start_time(None 이면 처음) 이후를 재계산 롤업 + 끝 구간 원본으로 조회할 수 있는지"""
+        return self.materializer is not None and self.materializer.covers(start_time)
     
     def get_overall_stats(self) -> AggregatedStats:
         """전체 통계 조회"""
+        if self._live_covers():
+            return self._build_overall_stats(self.live.get_totals())
+        return self._cached("overall", (), self._load_overall_stats)
+    
+    def _build_overall_stats(self, totals: Dict[tuple, int]) -> AggregatedStats:
+        """{(service, level): 로그 수} 로 전체 통계 구성"""
+        by_service: Dict[str, Dict[str, int]] = {}
+        by_level: Dict[str, int] = {}
+        for (service, level), count in totals.items():
+            levels = by_service.setdefault(service, {})
+            levels[level] = levels.get(level, 0) + count
+            by_level[level] = by_level.get(level, 0) + count
+        
+        services = []
+        for service, levels in by_service.items():
+            total = sum(levels.values())
+            errors = levels.get("ERROR", 0) + levels.get("CRITICAL", 0)
+            services.append(ServiceStats(
+                service=service,
+                total_logs=total,
+                info_count=levels.get("INFO", 0),
+                warning_count=levels.get("WARNING", 0),
+                error_count=levels.get("ERROR", 0),
+                critical_count=levels.get("CRITICAL", 0),
+                debug_count=levels.get("DEBUG", 0),
+                error_rate=round(errors / total * 100, 2) if total else 0.0
+            ))
+        services.sort(key=lambda s: s.total_logs, reverse=True)
+        
+        total_logs = sum(by_level.values())
+        log_level_distribution = [
+            LogLevelDistribution(
+                level=level,
+                count=count,
+                percentage=round(count / total_logs * 100, 2) if total_logs else 0
+            )
+            for level, count in sorted(by_level.items(), key=lambda item: item[1], reverse=True)
+        ]
+        
+        return AggregatedStats(
+            total_logs=total_logs,
+            services=services,
+            log_level_distribution=log_level_distribution,
+            time_range={
+                "start": "all",
+                "end": datetime.utcnow().isoformat()
+            }
+        )
+    
+    def _load_overall_stats(self) -> AggregatedStats:
         try:
-            # 총 로그 수
-            total_logs = self.db.get_total_count()
+            if self._materialized_covers(None):
+                totals: Dict[tuple, int] = {}
+                for row in self.materializer.get_level_hour_counts(None, datetime.utcnow()):
+                    key = (row["service"], row["level"])
+                    totals[key] = totals.get(key, 0) + row["count"]
+                return self._build_overall_stats(totals)
             
-            # 서비스별 통계
-            service_stats_data = self.db.get_service_stats()
+            # 총 로그 수 / 서비스별 통계 / 로그 레벨 분포 (한 번의 스캔)
+            data = self.db.get_overall_facets(from_rollup=self.use_rollups)
+            total_logs = data["total_logs"]
             services = [
                 ServiceStats(
                     service=s["service"],
@@ -46,18 +214,15 @@ class LogAggregatorService:
                     debug_count=s.get("debug_count", 0),
                     error_rate=round(s.get("error_rate", 0), 2)
                 )
-                for s in service_stats_data
+                for s in data["services"]
             ]
-            
-            # 로그 레벨 분포
-            level_dist_data = self.db.get_log_level_distribution()
             log_level_distribution = [
                 LogLevelDistribution(
                     level=d["level"],
                     count=d["count"],
                     percentage=round(d["percentage"], 2)
                 )
-                for d in level_dist_data
+                for d in data["levels"]
             ]
             
             return AggregatedStats(
@@ -77,20 +242,85 @@ class LogAggregatorService:
     def get_time_series(
         self,
         hours: int = 24,
-        service: Optional[str] = None
-    ) -> List[TimeSeriesData]:
-        """시계열 데이터 조회"""
+        service: Optional[str] = None,
+        step: str = "1h",
+        split: Optional[str] = None,
+        fill: bool = False,
+        max_points: Optional[int] = None
+    ) -> TimeSeriesResponse:
+        """
+        시계열 데이터 조회
+        
+        Args:
+            step: 구간 단위 (1m / 5m / 1h / 1d)
+            split: 계열 분리 기준 (level / service)
+            fill: 데이터가 없는 구간을 0 으로 채움
+            max_points: 구간 수 상한 (넘으면 step 의 정수배로 합산)
+        """
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(hours=hours)
+        bin_size = resolve_step(step, start_time, end_time, max_points)
+        
+        # 메모리 카운터는 (service, level) 분 카운트라 service 로는 나누지 않는다
+        if self._live_covers(hours) and split != "service":
+            counts: Dict[tuple, int] = {}
+            for minute, levels in self.live.get_minute_counts(start_time, service):
+                bucket = floor_bin(minute, bin_size)
+                rows = levels.items() if split else [(None, sum(levels.values()))]
+                for key, count in rows:
+                    counts[(bucket, key)] = counts.get((bucket, key), 0) + count
+            data = build_series(
+                counts, start_time, end_time, bin_size, step, split, fill
+            )
+        else:
+            data = self._cached(
+                "timeseries", (hours, service, step, split, fill, max_points),
+                lambda: self._load_time_series(hours, service, step, split, fill, bin_size),
+                hours=hours
+            )
+        
+        return TimeSeriesResponse(
+            hours=hours,
+            service=service or "all",
+            step=step,
+            split=split,
+            bin_seconds=int(bin_size.total_seconds()),
+            data=[TimeSeriesData(**row) for row in data]
+        )
+    
+    def _load_time_series(
+        self,
+        hours: int,
+        service: Optional[str],
+        step: str,
+        split: Optional[str],
+        fill: bool,
+        bin_size: timedelta
+    ) -> List[Dict]:
         try:
-            hourly_data = self.db.get_hourly_stats(hours=hours, service=service)
+            counts: Dict[tuple, int] = {}
+            start_time = datetime.utcnow() - timedelta(hours=hours)
+            if self._materialized_covers(start_time):
+                end_time = datetime.utcnow()
+                add_rows(counts, self.materializer.get_step_counts(
+                    start_time, end_time, bin_size, split=split, service=service
+                ))
+            else:
+                start_time, hot_start, use_archive = self._split_range(hours)
+                end_time = datetime.utcnow()
+                add_rows(counts, self.db.get_step_counts(
+                    hot_start, end_time, bin_size, split=split, service=service,
+                    from_rollup=self.use_rollups
+                ))
+                if use_archive:
+                    add_rows(counts, self.archive.get_step_counts(
+                        start_time, hot_start, bin_size, split=split, service=service
+                    ))
             
-            return [
-                TimeSeriesData(
-                    timestamp=d["hour"],
-                    count=d["count"]
-                )
-                for d in hourly_data
-            ]
+            return build_series(counts, start_time, end_time, bin_size, step, split, fill)
             
+        except QUERY_TIMEOUT_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Error getting time series: {e}")
             return []
@@ -101,8 +331,63 @@ class LogAggregatorService:
         hours: int = 24
     ) -> ErrorRateResponse:
         """에러율 조회"""
+        if self._live_covers(hours):
+            total_logs = error_logs = 0
+            start_time = datetime.utcnow() - timedelta(hours=hours)
+            for _, levels in self.live.get_minute_counts(start_time, service):
+                total_logs += sum(levels.values())
+                error_logs += levels.get("ERROR", 0) + levels.get("CRITICAL", 0)
+            return ErrorRateResponse(
+                service=service or "all",
+                total_logs=total_logs,
+                error_logs=error_logs,
+                error_rate=round(error_logs / total_logs * 100, 2) if total_logs else 0.0,
+                period=f"last_{hours}_hours"
+            )
+        
+        return self._cached(
+            "error_rate", (service, hours),
+            lambda: self._load_error_rate(service, hours), hours=hours
+        )
+    
+    def _load_error_rate(self, service: Optional[str], hours: int) -> ErrorRateResponse:
         try:
-            data = self.db.get_error_rate(service=service, hours=hours)
+            start_time = datetime.utcnow() - timedelta(hours=hours)
+            if self._materialized_covers(start_time):
+                rows = self.materializer.get_level_hour_counts(
+                    start_time, datetime.utcnow(), service
+                )
+                total_logs = sum(row["count"] for row in rows)
+                error_logs = sum(
+                    row["count"] for row in rows if row["level"] in ("ERROR", "CRITICAL")
+                )
+                return ErrorRateResponse(
+                    service=service or "all",
+                    total_logs=total_logs,
+                    error_logs=error_logs,
+                    error_rate=round(error_logs / total_logs * 100, 2) if total_logs else 0.0,
+                    period=f"last_{hours}_hours"
+                )
+            
+            start_time, hot_start, use_archive = self._split_range(hours)
+            data = self.db.get_error_rate(
+                service=service, hours=hours, from_rollup=self.use_rollups,
+                start_time=hot_start
+            )
+            
+            if use_archive:
+                # 아카이브 구간 건수를 합쳐 에러율 재계산
+                archived_total, archived_errors = self.archive.get_error_counts(
+                    start_time, hot_start, service
+                )
+                total_logs = data.get("total_logs", 0) + archived_total
+                error_logs = data.get("error_logs", 0) + archived_errors
+                data = {
+                    "service": service or "all",
+                    "total_logs": total_logs,
+                    "error_logs": error_logs,
+                    "error_rate": round(error_logs / total_logs * 100, 2) if total_logs else 0.0,
+                }
             
             return ErrorRateResponse(
                 service=data.get("service", "all"),
@@ -118,8 +403,13 @@ class LogAggregatorService:
     
     def get_top_errors(self, limit: int = 10) -> List[TopErrorsResponse]:
         """Top 에러 조회"""
+        return self._cached("top_errors", (limit,), lambda: self._load_top_errors(limit))
+    
+    def _load_top_errors(self, limit: int) -> List[TopErrorsResponse]:
         try:
-            errors_data = self.db.get_top_errors(limit=limit)
+            errors_data = self.db.get_top_errors(
+                limit=limit, from_rollup=self.use_rollups
+            )
             
             return [
                 TopErrorsResponse(
@@ -131,15 +421,273 @@ class LogAggregatorService:
                 for e in errors_data
             ]
             
+        except QUERY_TIMEOUT_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Error getting top errors: {e}")
             return []
     
-    def generate_hourly_aggregation(self):
-        """시간대별 집계 생성 (스케줄러용)"""
+    def get_window_top_errors(self, window: str, limit: int = 10) -> Dict:
+        """
+        최근 기간(5m / 1h / 24h) Top 에러
+        
+        sketch 가 준비되어 있으면 추정치(메모리 조회), 아니면 MongoDB 정확 집계.
+        """
+        if self.top_errors is not None and self.top_errors.ready:
+            data = self.top_errors.top(window, limit)
+            return {
+                "window": window,
+                "approximate": True,
+                "since": self.top_errors.window_start(window),
+                "total_errors": data["total_errors"],
+                "error_bound": data["error_bound"],
+                "errors": [TopErrorsResponse(**e) for e in data["errors"]],
+            }
+        
+        return self._cached(
+            "top_errors", (limit, window),
+            lambda: self._load_window_top_errors(window, limit)
+        )
+    
+    def _load_window_top_errors(self, window: str, limit: int) -> Dict:
+        length, _ = WINDOWS[window]
+        since = datetime.utcnow() - length
+        errors = self.db.get_top_errors(
+            limit=limit, from_rollup=self.use_rollups, start_time=since
+        )
+        return {
+            "window": window,
+            "approximate": False,
+            "since": since,
+            "errors": [TopErrorsResponse(**e) for e in errors],
+        }
+    
+    def reconcile_top_errors(self, window: str, limit: int = 10) -> Dict:
+        """Top 에러 sketch 를 MongoDB 정확 집계와 비교하고 그 기간을 다시 채운다"""
+        with self.db.query_timeout():
+            return self.top_errors.reconcile(window, limit)
+    
+    def get_latency(
+        self,
+        minutes: int = 60,
+        service: Optional[str] = None,
+        endpoint: Optional[str] = None
+    ) -> LatencyResponse:
+        """최근 minutes 분의 (service, endpoint) 별 응답 시간 분위수"""
+        return self._cached(
+            "latency", (minutes, service, endpoint),
+            lambda: self._load_latency(minutes, service, endpoint),
+            hours=minutes // 60
+        )
+    
+    def _load_latency(
+        self,
+        minutes: int,
+        service: Optional[str],
+        endpoint: Optional[str]
+    ) -> LatencyResponse:
+        try:
+            data = self.latency.get_latency(minutes, service=service, endpoint=endpoint)
+            return LatencyResponse(
+                minutes=minutes,
+                service=service or "all",
+                endpoint=endpoint or "all",
+                **data
+            )
+            
+        except Exception as e:
+            logger.error(f"Error getting latency: {e}")
+            raise
+    
+    def get_cardinality(
+        self,
+        field: str,
+        minutes: int = 60,
+        service: Optional[str] = None,
+        levels: Optional[List[str]] = None
+    ) -> CardinalityResponse:
+        """최근 minutes 분의 metadata 필드 고유 값 수 (HyperLogLog 추정)"""
+        levels = sorted(levels or [])
+        return self._cached(
+            "cardinality", (field, minutes, service, tuple(levels)),
+            lambda: self._load_cardinality(field, minutes, service, levels),
+            hours=minutes // 60
+        )
+    
+    def _load_cardinality(
+        self,
+        field: str,
+        minutes: int,
+        service: Optional[str],
+        levels: List[str]
+    ) -> CardinalityResponse:
+        try:
+            data = self.cardinality.get_cardinality(
+                field, minutes, service=service, levels=levels or None
+            )
+            return CardinalityResponse(
+                field=field,
+                minutes=minutes,
+                service=service or "all",
+                levels=levels,
+                **data
+            )
+            
+        except Exception as e:
+            logger.error(f"Error getting cardinality: {e}")
+            raise
+    
+    def get_batch_stats(self, request: BatchStatsRequest) -> BatchStatsResponse:
+        """같은 기간의 여러 통계를 한 번의 파이프라인으로 조회"""
+        queries = tuple(dict.fromkeys(request.queries))
+        return self._cached(
+            "batch", (queries, request.hours, request.service, request.top_errors_limit),
+            lambda: self._load_batch_stats(queries, request),
+            hours=request.hours
+        )
+    
+    def _load_batch_stats(self, queries: tuple, request: BatchStatsRequest) -> BatchStatsResponse:
+        """
+        MongoDB 구간은 get_batch_stats 1회로 조회하고, 아카이브 구간이 있으면
+        아카이브가 지원하는 timeseries / error_rate 에만 합친다.
+        """
+        try:
+            hours, service = request.hours, request.service
+            start_time, hot_start, use_archive = self._split_range(hours)
+            data = self.db.get_batch_stats(
+                list(queries), hot_start, service=service,
+                from_rollup=self.use_rollups, top_errors_limit=request.top_errors_limit
+            )
+            
+            response = BatchStatsResponse(hours=hours, service=service or "all")
+            if "services" in data:
+                response.services = [
+                    ServiceStats(**{**s, "error_rate": round(s.get("error_rate", 0), 2)})
+                    for s in data["services"]
+                ]
+            if "levels" in data:
+                response.levels = [
+                    LogLevelDistribution(
+                        level=d["level"], count=d["count"], percentage=round(d["percentage"], 2)
+                    )
+                    for d in data["levels"]
+                ]
+            if "timeseries" in data:
+                hourly_data = data["timeseries"]
+                if use_archive:
+                    hourly_data = self.archive.get_hourly_stats(start_time, hot_start, service) + hourly_data
+                response.timeseries = [
+                    TimeSeriesData(timestamp=d["hour"], count=d["count"]) for d in hourly_data
+                ]
+            if "error_rate" in data:
+                total_logs = data["error_rate"]["total_logs"]
+                error_logs = data["error_rate"]["error_logs"]
+                if use_archive:
+                    archived_total, archived_errors = self.archive.get_error_counts(
+                        start_time, hot_start, service
+                    )
+                    total_logs += archived_total
+                    error_logs += archived_errors
+                response.error_rate = ErrorRateResponse(
+                    service=service or "all",
+                    total_logs=total_logs,
+                    error_logs=error_logs,
+                    error_rate=round(error_logs / total_logs * 100, 2) if total_logs else 0.0,
+                    period=f"last_{hours}_hours"
+                )
+            if "top_errors" in data:
+                response.top_errors = [TopErrorsResponse(**e) for e in data["top_errors"]]
+            return response
+            
+        except Exception as e:
+            logger.error(f"Error getting batch stats: {e}")
+            raise
+    
+    def get_distinct_traces(
+        self,
+        field: str = "stack_trace",
+        hours: int = 24,
+        service: Optional[str] = None,
+        limit: int = 10,
+        rehydrate: bool = False
+    ) -> DistinctTracesResponse:
+        """
+        중복 제거된 stack trace(blob) 별 발생 통계
+        
+        Args:
+            field: blob 으로 저장된 metadata 필드 이름
+            hours: 과거 N시간
+            service: 특정 서비스 필터
+            limit: 반환할 trace 수 (발생 건수 순)
+            rehydrate: blobs 컬렉션에서 원문을 함께 조회
+        """
+        return self._cached(
+            "traces", (field, hours, service, limit, rehydrate),
+            lambda: self._load_distinct_traces(field, hours, service, limit, rehydrate),
+            hours=hours
+        )
+    
+    def _load_distinct_traces(
+        self,
+        field: str,
+        hours: int,
+        service: Optional[str],
+        limit: int,
+        rehydrate: bool
+    ) -> DistinctTracesResponse:
+        try:
+            data = self.db.get_distinct_blob_stats(
+                field=field, hours=hours, service=service, limit=limit
+            )
+            
+            values = {}
+            if rehydrate and data["traces"]:
+                values = self.db.get_blobs([t["fingerprint"] for t in data["traces"]])
+            
+            return DistinctTracesResponse(
+                field=field,
+                distinct_count=data["distinct_count"],
+                total_occurrences=data["total_occurrences"],
+                period=f"last_{hours}_hours",
+                traces=[
+                    TraceStats(
+                        fingerprint=t["fingerprint"],
+                        count=t["count"],
+                        services=t["services"],
+                        last_occurred=t["last_occurred"],
+                        value=values.get(t["fingerprint"])
+                    )
+                    for t in data["traces"]
+                ]
+            )
+            
+        except Exception as e:
+            logger.error(f"Error getting distinct traces: {e}")
+            raise
+    
+    def get_blob(self, fingerprint: str) -> Optional[str]:
+        """blob 원문 조회 (없으면 None)"""
+        with self.db.query_timeout():
+            return self.db.get_blobs([fingerprint]).get(fingerprint)
+    
+    def generate_hourly_aggregation(self) -> Optional[Dict]:
+        """
+        시간대별 집계 생성 (스케줄러용)
+        
+        재계산 롤업이 켜져 있으면 1회 계산한다. 아니면 최근 1시간의 시간별 로그 수를
+        logs_hourly_stats 에 hour 기준으로 덮어쓴다 (여러 번 실행해도 중복되지 않음).
+        """
         try:
             logger.info("Generating hourly aggregation...")
             
+            if self.materializer is not None:
+                result = self.materializer.run_once()
+                if result is None:
+                    # 다른 인스턴스가 계산 중
+                    result = {"skipped": True}
+                logger.info(f"Hourly aggregation completed: {result}")
+                return result
+            
             # 1시간 단위 통계 생성
             hourly_data = self.db.get_hourly_stats(hours=1)
             
@@ -152,9 +700,11 @@ class LogAggregatorService:
                 self.db.save_hourly_stats(stats)
             
             logger.info(f"Hourly aggregation completed: {len(hourly_data)} entries")
+            return {"hours": len(hourly_data)}
             
         except Exception as e:
             logger.error(f"Error generating hourly aggregation: {e}")
+            return None
 
     def get_recent_stats(self, start_time: datetime) -> Dict[str, Dict[str, int]]:
         """
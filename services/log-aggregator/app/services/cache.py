@@ -0,0 +1,181 @@
+"""
+집계 결과 TTL 캐시
+
+update_prometheus_metrics(15초), Grafana 새로고침, API 호출이 같은 집계를 반복 실행하지 않도록
+(엔드포인트, 파라미터) 별로 결과를 TTL 동안 재사용한다.
+
+- single-flight: 같은 키의 동시 miss 는 MongoDB 조회 1회를 함께 기다린다
+- stale-while-revalidate: TTL 이 지나도 max_stale 동안은 이전 값을 바로 돌려주고
+  백그라운드에서 갱신한다 (키당 갱신 1개)
+- 조회가 실패하면 캐시하지 않고 예외를 그대로 전달한다 (백그라운드 갱신 실패는 이전 값 유지)
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+# main.py 의 REGISTRY 에 등록해 /metrics 로 노출
+CACHE_REQUESTS = Counter(
+    "aggregator_cache_requests_total",
+    "Aggregation cache lookups (hit, stale, miss, coalesced)",
+    ["endpoint", "result"],
+    registry=None,
+)
+CACHE_REFRESH_SECONDS = Histogram(
+    "aggregator_cache_refresh_seconds",
+    "Time spent running the underlying query on a cache miss or refresh",
+    ["endpoint"],
+    registry=None,
+)
+CACHE_REFRESH_ERRORS = Counter(
+    "aggregator_cache_refresh_errors_total",
+    "Cache loads that raised an exception",
+    ["endpoint"],
+    registry=None,
+)
+CACHE_ENTRIES = Gauge(
+    "aggregator_cache_entries", "Entries held by the aggregation cache", registry=None
+)
+CACHE_METRICS = (CACHE_REQUESTS, CACHE_REFRESH_SECONDS, CACHE_REFRESH_ERRORS, CACHE_ENTRIES)
+
+CacheKey = Tuple[str, Hashable]
+
+
+def parse_ttls(spec: str) -> Dict[str, float]:
+    """'overall=10,timeseries=30' -> {"overall": 10.0, "timeseries": 30.0}"""
+    ttls = {}
+    for entry in (spec or "").split(","):
+        if not entry.strip():
+            continue
+        endpoint, _, ttl = entry.partition("=")
+        if not endpoint.strip() or not ttl.strip():
+            raise ValueError(f"Invalid cache TTL entry: {entry!r}")
+        ttls[endpoint.strip()] = float(ttl)
+    return ttls
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "stale_until")
+
+    def __init__(self, value: Any, expires_at: float, stale_until: float):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+
+class QueryCache:
+    """(엔드포인트, 파라미터) -> 집계 결과"""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_stale: float = 120.0,
+        refresh_workers: int = 2
+    ):
+        """
+        Args:
+            max_entries: 보관할 최대 키 수 (넘으면 가장 오래 쓰지 않은 키부터 제거)
+            max_stale: TTL 이 지난 뒤 이전 값을 돌려주며 갱신할 수 있는 시간 (초, 0이면 항상 동기 조회)
+            refresh_workers: 백그라운드 갱신 스레드 수
+        """
+        self.max_entries = max_entries
+        self.max_stale = max_stale
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._inflight: Dict[CacheKey, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=refresh_workers, thread_name_prefix="cache-refresh"
+        )
+
+    def get(
+        self,
+        endpoint: str,
+        params: Hashable,
+        loader: Callable[[], Any],
+        ttl: float
+    ) -> Any:
+        """
+        캐시된 값 (없거나 만료되었으면 loader 실행)
+
+        Args:
+            endpoint: 엔드포인트 이름 (메트릭 라벨)
+            params: 결과를 구분하는 파라미터 (hashable)
+            loader: 실제 조회 함수
+            ttl: 값을 새것으로 보는 시간 (초, 0 이하이면 캐시하지 않음)
+        """
+        if ttl <= 0:
+            return loader()
+
+        key = (endpoint, params)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.expires_at:
+                self._entries.move_to_end(key)
+                CACHE_REQUESTS.labels(endpoint=endpoint, result="hit").inc()
+                return entry.value
+
+            if entry is not None and now < entry.stale_until:
+                if key not in self._inflight:
+                    future = Future()
+                    self._inflight[key] = future
+                    self._executor.submit(self._load, key, loader, ttl, future)
+                CACHE_REQUESTS.labels(endpoint=endpoint, result="stale").inc()
+                return entry.value
+
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if owner:
+            CACHE_REQUESTS.labels(endpoint=endpoint, result="miss").inc()
+            self._load(key, loader, ttl, future)
+        else:
+            CACHE_REQUESTS.labels(endpoint=endpoint, result="coalesced").inc()
+        return future.result()
+
+    def _load(self, key: CacheKey, loader: Callable[[], Any], ttl: float, future: Future):
+        """loader 실행 후 저장하고 기다리는 호출에 결과 전달"""
+        endpoint = key[0]
+        started = time.perf_counter()
+        try:
+            value = loader()
+        except Exception as e:
+            CACHE_REFRESH_ERRORS.labels(endpoint=endpoint).inc()
+            logger.error(f"Failed to load {endpoint} for cache: {e}")
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            return
+        finally:
+            CACHE_REFRESH_SECONDS.labels(endpoint=endpoint).observe(time.perf_counter() - started)
+
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = _Entry(value, now + ttl, now + ttl + self.max_stale)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._inflight.pop(key, None)
+            CACHE_ENTRIES.set(len(self._entries))
+        future.set_result(value)
+
+    def invalidate(self, endpoint: Optional[str] = None):
+        """엔드포인트(없으면 전체) 캐시 제거"""
+        with self._lock:
+            for key in [k for k in self._entries if endpoint is None or k[0] == endpoint]:
+                del self._entries[key]
+            CACHE_ENTRIES.set(len(self._entries))
+
+    def close(self):
+        """백그라운드 갱신 스레드 종료"""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,107 @@
+"""
+metadata 필드(user_id / ip / session_id) 고유 값 수 (HyperLogLog)
+
+"최근 1시간 동안 에러를 겪은 사용자 수" 를 정확히 구하려면 기간의 모든 값을 $group 해야 한다.
+대신 재계산 롤업에 (버킷, service, level, 필드) 별 HyperLogLog 를 저장해 두고 조회 시 합친다.
+
+- 조회는 RollupMaterializer.plan() 으로 기간을 나눠 롤업 sketch 와 끝 구간 원본 값을 합친다
+  (재계산 롤업이 꺼져 있으면 원본 값만 스트리밍으로 sketch 에 더한다)
+- 메모리는 (service 수 x 2^precision 바이트) 로 기간 길이/값 수와 무관하다
+- 상대 표준 오차 1.04 / sqrt(2^precision) (기본 precision 12 -> 약 1.6%)
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.database.mongodb import DISTINCT_FIELDS, MongoDBClient
+from app.database.sketch import HyperLogLog
+from app.services.materializer import RAW, RollupMaterializer
+
+logger = logging.getLogger(__name__)
+
+
+class CardinalityAnalytics:
+    """기간별 metadata 필드 고유 값 수"""
+
+    def __init__(
+        self,
+        mongodb_client: MongoDBClient,
+        materializer: Optional[RollupMaterializer] = None
+    ):
+        """
+        Args:
+            mongodb_client: MongoDB 클라이언트
+            materializer: 재계산 롤업 (없으면 원본 logs 만 사용)
+        """
+        self.db = mongodb_client
+        self.materializer = materializer
+
+    def sketches(
+        self,
+        field: str,
+        start_time: datetime,
+        end_time: datetime,
+        service: Optional[str] = None,
+        levels: Optional[List[str]] = None
+    ) -> Dict[str, HyperLogLog]:
+        """[start_time, end_time) 의 service 별 HyperLogLog (레벨은 합친다)"""
+        if field not in DISTINCT_FIELDS:
+            raise ValueError(f"Unsupported distinct field: {field}")
+
+        segments = (
+            self.materializer.plan(start_time, end_time)
+            if self.materializer is not None
+            else [(RAW, start_time, end_time)]
+        )
+
+        merged: Dict[str, HyperLogLog] = {}
+        for granularity, segment_start, segment_end in segments:
+            if granularity == RAW:
+                for row in self.db.iter_distinct_values(
+                    segment_start, segment_end, [field], service=service, levels=levels
+                ):
+                    sketch = merged.get(row["service"])
+                    if sketch is None:
+                        sketch = merged[row["service"]] = HyperLogLog()
+                    sketch.add(row["value"])
+                continue
+
+            for doc in self.db.get_distinct_rollups(
+                granularity, segment_start, segment_end, field, service=service, levels=levels
+            ):
+                sketch = HyperLogLog.from_binary(doc["sketch"])
+                if doc["service"] in merged:
+                    merged[doc["service"]].merge(sketch)
+                else:
+                    merged[doc["service"]] = sketch
+        return merged
+
+    def get_cardinality(
+        self,
+        field: str,
+        minutes: int,
+        service: Optional[str] = None,
+        levels: Optional[List[str]] = None
+    ) -> Dict:
+        """
+        최근 minutes 분의 고유 값 수 추정
+
+        Returns:
+            {"estimate": 전체, "relative_error": 상대 표준 오차, "services": [{service, estimate}]}
+        """
+        end_time = datetime.utcnow()
+        sketches = self.sketches(field, end_time - timedelta(minutes=minutes), end_time, service, levels)
+
+        overall = HyperLogLog()
+        services = []
+        for name, sketch in sketches.items():
+            overall.merge(sketch)
+            services.append({"service": name, "estimate": sketch.estimate()})
+        services.sort(key=lambda item: item["estimate"], reverse=True)
+
+        return {
+            "estimate": overall.estimate(),
+            "relative_error": round(overall.relative_error, 4),
+            "services": services,
+        }
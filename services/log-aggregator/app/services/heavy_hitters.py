@@ -0,0 +1,299 @@
+"""
+기간별 Top 에러 메시지 (Space-Saving sketch)
+
+get_top_errors 는 저장된 모든 ERROR/CRITICAL 문서를 (message, service) 로 묶어 정렬하므로
+비용이 전체 이력에 비례한다. 여기서는 워터마크(created_at) 이후 새 에러 로그만 읽어
+기간(5m / 1h / 24h)별 Space-Saving 요약에 더하고, 조회는 요약만 합친다.
+
+- 기간마다 고정 크기 pane(5m: 1분, 1h: 5분, 24h: 1시간)별로 요약을 두고,
+  조회 시 기간에 걸치는 pane 을 합친다. 그래서 조회 구간은 최대 pane 하나만큼 길다
+- 조회 비용은 O(pane 수 x capacity) 로 이력 크기와 무관하다
+- 오차: 요약이 돌려주는 각 항목의 count 는 실제 건수 이상이고, 초과분은 그 항목의 error 이하이다.
+  error 는 기간 전체 에러 로그 수 / capacity 이하이므로, 그보다 많이 발생한 메시지는 반드시 포함된다
+- reconcile() 은 MongoDB 에서 기간을 정확히 다시 집계해 정확한 Top 에러와 sketch 오차를 돌려주고,
+  그 기간의 pane 을 다시 채운다
+
+인스턴스마다 메모리에 따로 유지하며, 시작할 때 최근 24시간을 집계로 채운다 (저장하지 않음).
+compact 모드는 created_at 이 없어 timestamp 를 워터마크로 쓰므로 늦게 도착한 로그는 reconcile 때 반영된다.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
+
+from app.database.mongodb import MongoDBClient
+
+logger = logging.getLogger(__name__)
+
+# 기간 -> (길이, pane 크기)
+WINDOWS = {
+    "5m": (timedelta(minutes=5), timedelta(minutes=1)),
+    "1h": (timedelta(hours=1), timedelta(minutes=5)),
+    "24h": (timedelta(hours=24), timedelta(hours=1)),
+}
+
+# main.py 의 REGISTRY 에 등록해 /metrics 로 노출
+HEAVY_HITTER_EVENTS = Counter(
+    "aggregator_top_errors_sketch_events_total",
+    "Error logs added to the top-errors sketches",
+    registry=None,
+)
+HEAVY_HITTER_ERROR_BOUND = Gauge(
+    "aggregator_top_errors_sketch_error_bound",
+    "Upper bound on the over-count of any top-errors sketch entry",
+    ["window"],
+    registry=None,
+)
+HEAVY_HITTER_METRICS = (HEAVY_HITTER_EVENTS, HEAVY_HITTER_ERROR_BOUND)
+
+ErrorKey = Tuple[str, str]  # (service, message)
+
+
+def floor_to(ts: datetime, step: timedelta) -> datetime:
+    """ts 가 속한 step 단위 구간의 시작"""
+    return datetime.min + ((ts - datetime.min) // step) * step
+
+
+class SpaceSaving:
+    """
+    Space-Saving 요약 (Metwally et al., 2005)
+
+    capacity 개의 [count, error, last_occurred] 만 유지한다. 없는 키가 들어오면
+    count 가 가장 작은 항목을 밀어내고 그 count 를 이어받는다 (error 로 기록).
+    모든 키에 대해 실제 건수 <= count <= 실제 건수 + error, error <= total / capacity.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.total = 0
+        self.counters: Dict[ErrorKey, list] = {}
+
+    def add(self, key: ErrorKey, weight: int = 1, last_occurred: Optional[datetime] = None):
+        self.total += weight
+        entry = self.counters.get(key)
+        if entry is not None:
+            entry[0] += weight
+            if last_occurred and (entry[2] is None or last_occurred > entry[2]):
+                entry[2] = last_occurred
+            return
+
+        if len(self.counters) < self.capacity:
+            self.counters[key] = [weight, 0, last_occurred]
+            return
+
+        victim = min(self.counters, key=lambda k: self.counters[k][0])
+        floor = self.counters.pop(victim)[0]
+        self.counters[key] = [floor + weight, floor, last_occurred]
+
+    def min_count(self) -> int:
+        """요약이 가득 찼을 때 없는 키의 최대 가능 건수"""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(entry[0] for entry in self.counters.values())
+
+    @classmethod
+    def merge(cls, sketches: Iterable["SpaceSaving"], capacity: int) -> "SpaceSaving":
+        """
+        여러 요약 합치기 (Agarwal et al., mergeable summaries)
+
+        어떤 요약에 없는 키는 그 요약의 min_count 만큼 count/error 에 더해 상한을 유지한다.
+        """
+        sketches = list(sketches)
+        merged = cls(capacity)
+        keys = set().union(*(sketch.counters for sketch in sketches)) if sketches else set()
+        floors = [sketch.min_count() for sketch in sketches]
+
+        for key in keys:
+            count = error = 0
+            last = None
+            for sketch, floor in zip(sketches, floors):
+                entry = sketch.counters.get(key)
+                if entry is None:
+                    count += floor
+                    error += floor
+                    continue
+                count += entry[0]
+                error += entry[1]
+                if entry[2] and (last is None or entry[2] > last):
+                    last = entry[2]
+            merged.counters[key] = [count, error, last]
+
+        if len(merged.counters) > capacity:
+            kept = sorted(merged.counters.items(), key=lambda item: item[1][0], reverse=True)
+            merged.counters = dict(kept[:capacity])
+        merged.total = sum(sketch.total for sketch in sketches)
+        return merged
+
+    def top(self, limit: int) -> List[Tuple[ErrorKey, list]]:
+        return sorted(self.counters.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+
+
+class TopErrorTracker:
+    """기간별 Top 에러 sketch (워터마크 이후 새 에러 로그로 증분 갱신)"""
+
+    def __init__(
+        self,
+        mongodb_client: MongoDBClient,
+        capacity: int = 200,
+        settle_seconds: float = 5.0
+    ):
+        """
+        Args:
+            mongodb_client: MongoDB 클라이언트
+            capacity: pane 당 유지할 (service, message) 수 (오차 상한 = 기간 에러 수 / capacity)
+            settle_seconds: 아직 커밋되지 않았을 수 있는 최근 구간 (초)
+        """
+        self.db = mongodb_client
+        self.field = mongodb_client.watermark_field()
+        self.capacity = capacity
+        self.settle = timedelta(seconds=settle_seconds)
+
+        self.panes: Dict[str, Dict[datetime, SpaceSaving]] = {name: {} for name in WINDOWS}
+        self.watermark: Optional[datetime] = None
+        self._lock = threading.Lock()
+        # refresh 와 reconcile 이 같은 워터마크 구간을 동시에 다루지 않도록
+        self._update_lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.watermark is not None
+
+    def _add_rows(self, rows: List[Dict], windows: Iterable[str], now: datetime):
+        """(service, message, 분) 행을 기간별 pane 에 더한다 (기간을 벗어난 행은 버림)"""
+        for name in windows:
+            length, step = WINDOWS[name]
+            oldest = floor_to(now - length, step)
+            panes = self.panes[name]
+            for row in rows:
+                pane = floor_to(row["minute"], step)
+                if pane < oldest:
+                    continue
+                sketch = panes.get(pane)
+                if sketch is None:
+                    sketch = panes[pane] = SpaceSaving(self.capacity)
+                sketch.add(
+                    (row["service"], str(row["message"])), row["count"], row["last_occurred"]
+                )
+
+    def _prune(self, now: datetime):
+        for name, (length, step) in WINDOWS.items():
+            oldest = floor_to(now - length, step)
+            panes = self.panes[name]
+            for pane in [pane for pane in panes if pane < oldest]:
+                del panes[pane]
+
+    def refresh(self):
+        """워터마크 이후 저장된 에러 로그 반영 (처음에는 최근 24시간을 집계로 채운다)"""
+        with self._update_lock:
+            now = datetime.utcnow()
+            upto = now - self.settle
+            since = self.window_start("24h", now)
+
+            if self.watermark is not None and upto <= self.watermark:
+                return
+            rows = self.db.get_error_minute_counts(since, self.field, upto, after=self.watermark)
+
+            with self._lock:
+                self._add_rows(rows, WINDOWS, now)
+                self._prune(now)
+                if self.watermark is None:
+                    logger.info(f"Top-errors sketch seeded with {len(rows)} groups")
+                self.watermark = upto
+
+        HEAVY_HITTER_EVENTS.inc(sum(row["count"] for row in rows))
+        with self._lock:
+            for name, (length, step) in WINDOWS.items():
+                oldest = floor_to(now - length, step)
+                total = sum(sketch.total for pane, sketch in self.panes[name].items() if pane >= oldest)
+                HEAVY_HITTER_ERROR_BOUND.labels(window=name).set(total / self.capacity)
+
+    def _merged(self, window: str, now: datetime) -> SpaceSaving:
+        length, step = WINDOWS[window]
+        oldest = floor_to(now - length, step)
+        with self._lock:
+            sketches = [sketch for pane, sketch in self.panes[window].items() if pane >= oldest]
+            return SpaceSaving.merge(sketches, self.capacity)
+
+    def window_start(self, window: str, now: Optional[datetime] = None) -> datetime:
+        """기간 조회가 실제로 포함하는 구간의 시작 (첫 pane 시작)"""
+        length, step = WINDOWS[window]
+        return floor_to((now or datetime.utcnow()) - length, step)
+
+    def top(self, window: str, limit: int = 10) -> Dict:
+        """
+        기간의 Top 에러 (추정)
+
+        Returns:
+            {"errors": [{message, service, count, max_overcount, last_occurred}],
+             "total_errors": 기간 에러 로그 수, "error_bound": 항목별 초과분 상한}
+        """
+        merged = self._merged(window, datetime.utcnow())
+        return {
+            "errors": [
+                {
+                    "service": service,
+                    "message": message,
+                    "count": count,
+                    "max_overcount": error,
+                    "last_occurred": last,
+                }
+                for (service, message), (count, error, last) in merged.top(limit)
+            ],
+            "total_errors": merged.total,
+            "error_bound": merged.total / self.capacity,
+        }
+
+    def reconcile(self, window: str, limit: int = 10) -> Dict:
+        """
+        MongoDB 에서 기간을 정확히 다시 집계해 sketch 와 비교하고, 그 기간의 pane 을 다시 채운다
+
+        Returns:
+            {"exact": 정확한 Top 에러, "sketch": 재집계 전 추정,
+             "max_abs_error": 추정 Top 항목의 최대 오차, "error_bound": 재집계 전 오차 상한}
+        """
+        with self._update_lock:
+            return self._reconcile(window, limit)
+
+    def _reconcile(self, window: str, limit: int) -> Dict:
+        now = datetime.utcnow()
+        since = self.window_start(window, now)
+        upto = self.watermark or now - self.settle
+        rows = self.db.get_error_minute_counts(since, self.field, upto)
+
+        exact: Dict[ErrorKey, list] = {}
+        for row in rows:
+            key = (row["service"], str(row["message"]))
+            entry = exact.setdefault(key, [0, None])
+            entry[0] += row["count"]
+            if entry[1] is None or row["last_occurred"] > entry[1]:
+                entry[1] = row["last_occurred"]
+
+        estimate = self.top(window, limit)
+        max_abs_error = max(
+            (
+                abs(error["count"] - exact.get((error["service"], error["message"]), [0])[0])
+                for error in estimate["errors"]
+            ),
+            default=0,
+        )
+
+        with self._lock:
+            self.panes[window] = {}
+            self._add_rows(rows, [window], now)
+
+        ranked = sorted(exact.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+        return {
+            "window": window,
+            "since": since,
+            "upto": upto,
+            "exact": [
+                {"service": service, "message": message, "count": count, "last_occurred": last}
+                for (service, message), (count, last) in ranked
+            ],
+            "sketch": estimate["errors"],
+            "max_abs_error": max_abs_error,
+            "error_bound": estimate["error_bound"],
+        }
@@ -0,0 +1,148 @@
+"""
+응답 시간(metadata.response_time_ms) 분위수
+
+p50/p95/p99 를 MongoDB 에서 정확히 구하려면 모든 문서를 정렬해야 한다. 대신
+(service, endpoint, 분) 별 로그 버킷 sketch(app.database.sketch)를 합쳐 추정한다.
+
+- 재계산 롤업(logs_agg_minute / hour / day)에 kind="latency" 문서로 압축 바이너리 sketch 를 저장한다
+- 조회는 RollupMaterializer.plan() 으로 기간을 나눠 롤업 sketch 와 끝 구간 원본 버킷 집계를 합친다
+  (재계산 롤업이 꺼져 있으면 원본 버킷 집계만, 이때도 원본 값은 애플리케이션으로 오지 않는다)
+- 분위수 추정값의 상대 오차는 relative_accuracy 이하이다 (기본 1%)
+"""
+
+import logging
+import math
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import Gauge
+
+from app.database.mongodb import MongoDBClient
+from app.database.sketch import DEFAULT_RELATIVE_ACCURACY, LatencySketch, gamma_for, sketches_from_rows
+from app.services.materializer import RAW, RollupMaterializer
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = {"p50": 0.5, "p90": 0.9, "p95": 0.95, "p99": 0.99}
+
+# main.py 의 REGISTRY 에 등록해 /metrics 로 노출
+LATENCY_QUANTILE = Gauge(
+    "api_latency_quantile_ms",
+    "Estimated response time quantile over the recent window",
+    ["service", "endpoint", "quantile"],
+    registry=None,
+)
+LATENCY_METRICS = (LATENCY_QUANTILE,)
+
+LatencyKey = Tuple[str, str]  # (service, endpoint)
+
+
+class LatencyAnalytics:
+    """기간별 (service, endpoint) 응답 시간 분위수"""
+
+    def __init__(
+        self,
+        mongodb_client: MongoDBClient,
+        materializer: Optional[RollupMaterializer] = None,
+        relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY
+    ):
+        """
+        Args:
+            mongodb_client: MongoDB 클라이언트
+            materializer: 재계산 롤업 (없으면 원본 logs 의 버킷 집계만 사용)
+            relative_accuracy: 분위수 상대 오차 (롤업에 저장된 sketch 와 같아야 합쳐진다)
+        """
+        self.db = mongodb_client
+        self.materializer = materializer
+        self.gamma = gamma_for(relative_accuracy)
+        self._exported: set = set()
+        self._export_lock = threading.Lock()
+
+    def sketches(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        service: Optional[str] = None,
+        endpoint: Optional[str] = None
+    ) -> Dict[LatencyKey, LatencySketch]:
+        """[start_time, end_time) 의 (service, endpoint) 별 sketch (롤업 + 원본 버킷 병합)"""
+        segments = (
+            self.materializer.plan(start_time, end_time)
+            if self.materializer is not None
+            else [(RAW, start_time, end_time)]
+        )
+
+        merged: Dict[LatencyKey, LatencySketch] = {}
+
+        def merge_into(key: LatencyKey, sketch: LatencySketch):
+            if key in merged:
+                merged[key].merge(sketch)
+            else:
+                merged[key] = sketch
+
+        for granularity, segment_start, segment_end in segments:
+            if granularity == RAW:
+                rows = self.db.get_latency_buckets(
+                    segment_start, segment_end, math.log(self.gamma),
+                    service=service, endpoint=endpoint
+                )
+                for key, sketch in sketches_from_rows(rows, self.gamma, ("service", "endpoint")).items():
+                    merge_into(key, sketch)
+                continue
+
+            for doc in self.db.get_latency_rollups(
+                granularity, segment_start, segment_end, service=service, endpoint=endpoint
+            ):
+                merge_into((doc["service"], doc["endpoint"]), LatencySketch.from_binary(doc["sketch"]))
+        return merged
+
+    @staticmethod
+    def summarize(sketch: LatencySketch) -> Dict:
+        return {
+            "count": sketch.count,
+            **{name: sketch.quantile(q) for name, q in QUANTILES.items()},
+        }
+
+    def get_latency(
+        self,
+        minutes: int,
+        service: Optional[str] = None,
+        endpoint: Optional[str] = None
+    ) -> Dict:
+        """
+        최근 minutes 분의 응답 시간 분위수
+
+        Returns:
+            {"overall": {count, p50, p90, p95, p99}, "endpoints": [{service, endpoint, ...}]}
+        """
+        end_time = datetime.utcnow()
+        sketches = self.sketches(end_time - timedelta(minutes=minutes), end_time, service, endpoint)
+
+        overall = LatencySketch(self.gamma)
+        endpoints = []
+        for (svc, ep), sketch in sorted(sketches.items()):
+            overall.merge(sketch)
+            endpoints.append({"service": svc, "endpoint": ep, **self.summarize(sketch)})
+        endpoints.sort(key=lambda item: item["count"], reverse=True)
+
+        return {"overall": self.summarize(overall), "endpoints": endpoints}
+
+    def export_gauges(self, minutes: int):
+        """최근 minutes 분 분위수를 Prometheus 게이지로 (사라진 (service, endpoint) 는 제거)"""
+        end_time = datetime.utcnow()
+        sketches = self.sketches(end_time - timedelta(minutes=minutes), end_time)
+
+        with self._export_lock:
+            current = set()
+            for (service, endpoint), sketch in sketches.items():
+                for name, q in QUANTILES.items():
+                    value = sketch.quantile(q)
+                    if value is None:
+                        continue
+                    LATENCY_QUANTILE.labels(service=service, endpoint=endpoint, quantile=name).set(value)
+                    current.add((service, endpoint, name))
+
+            for labels in self._exported - current:
+                LATENCY_QUANTILE.remove(*labels)
+            self._exported = current
@@ -0,0 +1,344 @@
+"""
+실시간 로그 카운터 (change stream tailing)
+
+logs 컬렉션(라우팅/파티션 포함)의 insert 를 change stream 으로 받아 메모리 카운터를 갱신한다.
+Prometheus 메트릭과 통계 API(overall / error-rate / timeseries)는 집계 쿼리 없이 이 카운터에서 읽는다.
+
+- (service, level) 누적 합계와 최근 window_minutes 동안의 분 단위 카운터
+- resume token 과 합계를 archive_state 에 주기적으로 저장해 재시작 시 놓친 insert 부터 이어 받는다
+- 처음 시작할 때는 합계/분 카운터를 MongoDB 집계로 채우고 (cutoff 시점까지),
+  그 이후 이벤트만 더한다 (created_at, compact 는 timestamp 로 cutoff 비교)
+- change stream 을 쓸 수 없으면 (standalone, time-series 컬렉션) 워터마크 polling 으로 대신한다
+
+재시작 시 분 카운터는 다시 집계로 채운다 (합계만 저장).
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
+from pymongo.errors import OperationFailure
+
+from app.database.mongodb import MongoDBClient
+from app.database.schema import STORAGE_TIMESERIES
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = "live_counters"
+
+MODE_STREAM = "stream"
+MODE_POLLING = "polling"
+
+# replica set 이 아님 / change stream 을 지원하지 않는 저장소
+UNSUPPORTED_ERROR_CODES = {40573, 40324, 136}
+# resume token 이 oplog 에서 사라짐
+HISTORY_LOST_ERROR_CODES = {280, 286}
+
+# main.py 의 REGISTRY 에 등록해 /metrics 로 노출
+LIVE_EVENTS = Counter(
+    "aggregator_live_events_total",
+    "Log inserts applied to the live counters",
+    ["source"],
+    registry=None,
+)
+LIVE_LAG = Gauge(
+    "aggregator_live_lag_seconds",
+    "Seconds since the live counters last applied an update",
+    registry=None,
+)
+LIVE_MODE = Gauge(
+    "aggregator_live_mode",
+    "Live counter source (1 for the active mode)",
+    ["mode"],
+    registry=None,
+)
+LIVE_METRICS = (LIVE_EVENTS, LIVE_LAG, LIVE_MODE)
+
+LevelKey = Tuple[str, str]
+
+
+class LiveCounters:
+    """change stream(또는 polling)으로 유지하는 메모리 로그 카운터"""
+
+    def __init__(
+        self,
+        mongodb_client: MongoDBClient,
+        window_minutes: int = 1440,
+        poll_interval: float = 5.0,
+        settle_seconds: float = 5.0,
+        persist_interval: float = 10.0
+    ):
+        """
+        Args:
+            mongodb_client: MongoDB 클라이언트
+            window_minutes: 분 단위 카운터를 유지할 기간 (이보다 긴 조회는 MongoDB 집계)
+            poll_interval: polling 모드 조회 주기 (초)
+            settle_seconds: polling 모드에서 아직 커밋되지 않았을 수 있는 최근 구간 (초)
+            persist_interval: resume token / 합계 저장 주기 (초)
+        """
+        self.db = mongodb_client
+        self.field = mongodb_client.watermark_field()
+        self.window = timedelta(minutes=window_minutes)
+        self.poll_interval = poll_interval
+        self.settle = timedelta(seconds=settle_seconds)
+        self.persist_interval = persist_interval
+
+        # time-series 컬렉션 insert 는 change stream 에 나오지 않는다
+        self.mode = MODE_POLLING if mongodb_client.storage_mode == STORAGE_TIMESERIES else MODE_STREAM
+        self.ready = False
+
+        self.totals: Dict[LevelKey, int] = {}
+        self.minutes: Dict[datetime, Dict[LevelKey, int]] = {}
+        self._window_start: Optional[datetime] = None
+        self._updated_at = 0.0
+
+        self._resume_token: Optional[Dict] = None
+        self._watermark: Optional[datetime] = None
+        # 집계로 채운 구간 (이 시점 이하 이벤트는 이미 반영됨, None이면 비교하지 않음)
+        self._totals_cutoff: Optional[datetime] = None
+        self._minutes_cutoff: Optional[datetime] = None
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._persisted_at = 0.0
+        # 저장된 resume token 이 만료되었으면 다음 시드는 집계로 채운다
+        self._discard_state = False
+
+    # ------------------------------------------------------------------
+    # 실행
+    # ------------------------------------------------------------------
+    def start(self):
+        """백그라운드 스레드 시작"""
+        self._thread = threading.Thread(target=self._run, name="live-counters", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """중지 (마지막 상태 저장)"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self.ready:
+            try:
+                self._persist()
+            except Exception as e:
+                logger.warning(f"Failed to persist live counters: {e}")
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                if not self.ready:
+                    self._seed()
+                if self.mode == MODE_STREAM:
+                    self._tail()
+                else:
+                    self._poll()
+                    self._stop.wait(self.poll_interval)
+                backoff = 1.0
+            except OperationFailure as e:
+                if e.code in UNSUPPORTED_ERROR_CODES:
+                    logger.warning(f"Change streams unavailable ({e.code}), falling back to polling")
+                    self._switch_to_polling()
+                elif e.code in HISTORY_LOST_ERROR_CODES:
+                    logger.warning("Change stream resume token expired, reseeding live counters")
+                    self._resume_token = None
+                    self._discard_state = True
+                    self.ready = False
+                else:
+                    logger.error(f"Live counters failed: {e}")
+                    self._stop.wait(backoff)
+                    backoff = min(backoff * 2, 60)
+            except Exception as e:
+                logger.error(f"Live counters failed: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 60)
+
+    def _seed(self):
+        """저장된 상태 복구 또는 MongoDB 집계로 카운터 채우기"""
+        cutoff = datetime.utcnow()
+        state = self.db.get_archive_state(STATE_KEY)
+        restored = bool(state) and state.get("field") == self.field and not self._discard_state
+
+        if restored:
+            totals = {(row["service"], row["level"]): row["count"] for row in state["totals"]}
+            resume_token = state.get("resume_token") if self.mode == MODE_STREAM else None
+            # polling 으로 저장한 상태(또는 token 없이)면 저장 시점 워터마크부터 이어간다
+            restored = resume_token is not None or state.get("watermark") is not None
+        if restored:
+            self._resume_token = resume_token
+            self._watermark = state.get("watermark") or cutoff
+            self._totals_cutoff = None
+        else:
+            totals = {
+                (row["service"], row["level"]): row["count"]
+                for row in self.db.get_level_counts(self.field, upto=cutoff)
+            }
+            self._resume_token = None
+            self._watermark = cutoff
+            self._totals_cutoff = cutoff
+
+        # polling 은 워터마크 이후를 다시 집계하므로 분 카운터는 워터마크까지만 채운다
+        minutes_upto = cutoff if self.mode == MODE_STREAM else self._watermark
+        window_start = self._minute(cutoff - self.window)
+        minutes: Dict[datetime, Dict[LevelKey, int]] = {}
+        for row in self.db.get_minute_level_counts(self.field, upto=minutes_upto, since=window_start):
+            bucket = minutes.setdefault(row["minute"], {})
+            key = (row["service"], row["level"])
+            bucket[key] = bucket.get(key, 0) + row["count"]
+
+        with self._lock:
+            self.totals = totals
+            self.minutes = minutes
+            self._window_start = window_start
+            self._minutes_cutoff = minutes_upto
+            self._updated_at = time.monotonic()
+            self._discard_state = False
+            self.ready = True
+
+        LIVE_MODE.labels(mode=MODE_STREAM).set(self.mode == MODE_STREAM)
+        LIVE_MODE.labels(mode=MODE_POLLING).set(self.mode == MODE_POLLING)
+        logger.info(
+            f"Live counters ready ({self.mode}, "
+            f"{'restored' if restored else 'seeded'}, {sum(totals.values())} logs)"
+        )
+
+    def _switch_to_polling(self):
+        self.mode = MODE_POLLING
+        if self._watermark is None:
+            self._watermark = datetime.utcnow()
+        LIVE_MODE.labels(mode=MODE_STREAM).set(0)
+        LIVE_MODE.labels(mode=MODE_POLLING).set(1)
+
+    def _tail(self):
+        """change stream 이벤트 반영 (중지 또는 에러까지)"""
+        with self.db.watch_log_inserts(resume_token=self._resume_token) as stream:
+            logger.info("Tailing log inserts with change stream")
+            while not self._stop.is_set() and stream.alive:
+                change = stream.try_next()
+                if change is not None:
+                    doc = self.db.schema.decode_document(change.get("fullDocument") or {})
+                    self._apply(
+                        doc["service"], doc["level"], doc["timestamp"], doc.get(self.field)
+                    )
+                    LIVE_EVENTS.labels(source=MODE_STREAM).inc()
+
+                with self._lock:
+                    self._resume_token = stream.resume_token
+                    # 이벤트가 없어도 stream 은 최신 상태
+                    self._updated_at = time.monotonic()
+                    # 저장 후 polling 으로 바뀌어도 이어갈 수 있도록
+                    self._watermark = datetime.utcnow()
+                self._maybe_persist()
+
+    def _poll(self):
+        """워터마크 이후 문서 반영"""
+        upto = datetime.utcnow() - self.settle
+        if upto > self._watermark:
+            rows = self.db.get_minute_level_counts(self.field, after=self._watermark, upto=upto)
+            with self._lock:
+                for row in rows:
+                    key = (row["service"], row["level"])
+                    self.totals[key] = self.totals.get(key, 0) + row["count"]
+                    if row["minute"] >= self._window_start:
+                        bucket = self.minutes.setdefault(row["minute"], {})
+                        bucket[key] = bucket.get(key, 0) + row["count"]
+                self._watermark = upto
+                self._updated_at = time.monotonic()
+            LIVE_EVENTS.labels(source=MODE_POLLING).inc(sum(row["count"] for row in rows))
+        self._maybe_persist()
+
+    def _apply(
+        self,
+        service: str,
+        level: str,
+        timestamp: Optional[datetime],
+        marker: Optional[datetime]
+    ):
+        """insert 1건 반영 (시드 집계에 이미 포함된 문서는 건너뜀)"""
+        key = (service, level)
+        with self._lock:
+            if self._totals_cutoff is None or marker is None or marker > self._totals_cutoff:
+                self.totals[key] = self.totals.get(key, 0) + 1
+
+            if timestamp is None or (
+                self._minutes_cutoff is not None and marker is not None
+                and marker <= self._minutes_cutoff
+            ):
+                return
+            minute = self._minute(timestamp)
+            if minute >= self._window_start:
+                bucket = self.minutes.setdefault(minute, {})
+                bucket[key] = bucket.get(key, 0) + 1
+
+    def _maybe_persist(self):
+        if time.monotonic() - self._persisted_at < self.persist_interval:
+            return
+        try:
+            self._persist()
+        except Exception as e:
+            logger.warning(f"Failed to persist live counters: {e}")
+        self._prune()
+
+    def _persist(self):
+        """resume token 과 합계를 같은 시점으로 저장"""
+        with self._lock:
+            state = {
+                "field": self.field,
+                "resume_token": self._resume_token,
+                "watermark": self._watermark,
+                "totals": [
+                    {"service": service, "level": level, "count": count}
+                    for (service, level), count in self.totals.items()
+                ],
+            }
+        self.db.set_archive_state(STATE_KEY, state)
+        self._persisted_at = time.monotonic()
+
+    def _prune(self):
+        """window 밖으로 나간 분 카운터 제거"""
+        window_start = self._minute(datetime.utcnow() - self.window)
+        with self._lock:
+            for minute in [m for m in self.minutes if m < window_start]:
+                del self.minutes[minute]
+            self._window_start = window_start
+        LIVE_LAG.set(time.monotonic() - self._updated_at)
+
+    @staticmethod
+    def _minute(timestamp: datetime) -> datetime:
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.replace(tzinfo=None) - timestamp.utcoffset()
+        return timestamp.replace(second=0, microsecond=0)
+
+    # ------------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------------
+    def covers(self, start_time: datetime) -> bool:
+        """start_time 이후 분 카운터를 메모리에서 읽을 수 있는지"""
+        return self.ready and self._window_start is not None and start_time >= self._window_start
+
+    def get_totals(self) -> Dict[LevelKey, int]:
+        """(service, level) 누적 로그 수"""
+        with self._lock:
+            return dict(self.totals)
+
+    def get_minute_counts(
+        self,
+        start_time: datetime,
+        service: Optional[str] = None
+    ) -> List[Tuple[datetime, Dict[str, int]]]:
+        """start_time 이후 분별 {level: count} (분 순서)"""
+        start_minute = self._minute(start_time)
+        with self._lock:
+            rows = []
+            for minute in sorted(m for m in self.minutes if m >= start_minute):
+                levels: Dict[str, int] = {}
+                for (svc, level), count in self.minutes[minute].items():
+                    if service is None or svc == service:
+                        levels[level] = levels.get(level, 0) + count
+                if levels:
+                    rows.append((minute, levels))
+            return rows
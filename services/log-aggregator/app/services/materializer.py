@@ -0,0 +1,374 @@
+"""
+분/시간/일 롤업 재계산 (materialized rollups)
+
+원본 logs 를 주기적으로 집계해 logs_agg_minute / logs_agg_hour / logs_agg_day 에
+(버킷, service, level[, 에러 메시지]) 별 문서를 결정적 _id 로 덮어쓴다. 같은 버킷을 몇 번
+다시 계산해도 결과는 같다 (멱등).
+
+- 늦게 도착한 로그: 워터마크(created_at) 이후 저장된 문서가 속한 분 버킷만 원본에서 다시 집계하고,
+  그 분을 포함하는 시간/일 버킷은 작은 롤업에서 다시 합친다
+- settle_seconds 로 최근 구간은 기다리고, 그래도 워터마크 뒤에 늦게 커밋된 문서는
+  reconcile_interval 마다 최근 reconcile_hours 전체를 다시 계산해 바로잡는다
+  (compact 모드는 created_at 이 없어 timestamp 를 워터마크로 쓰므로 늦은 로그는 재계산 때 반영된다)
+- 처음 실행하면 오늘(UTC)부터 계산하고, 이후 실행마다 하루씩 과거로 채운다 (covered_from)
+- 여러 Aggregator 인스턴스 중 리스를 가진 하나만 계산한다. 상태(워터마크, covered_from)는
+  archive_state 에 저장되어 모든 인스턴스가 조회 계획(plan)에 사용한다
+
+조회는 plan() 이 기간을 나눠, 롤업이 완성된 구간은 가장 큰 단위(일 > 시간 > 분)로,
+아직 계산되지 않은 끝 구간(워터마크가 속한 분 이후)과 covered_from 이전은 원본 logs 로 읽는다.
+"""
+
+import logging
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.database.mongodb import ROLLUP_GRANULARITIES, MongoDBClient
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = "rollup_materializer"
+LEASE_NAME = "rollup_materializer"
+RAW = "raw"
+
+# 버킷 정렬 단위
+UNITS = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+# 떨어진 분 버킷 사이가 이 간격 이하이면 한 번의 원본 집계로 묶는다
+MERGE_GAP = timedelta(minutes=30)
+
+# main.py 의 REGISTRY 에 등록해 /metrics 로 노출
+MATERIALIZE_RUNS = Counter(
+    "aggregator_rollup_materialize_runs_total",
+    "Rollup materializer runs",
+    ["result"],
+    registry=None,
+)
+MATERIALIZE_SECONDS = Histogram(
+    "aggregator_rollup_materialize_seconds",
+    "Time spent per rollup materializer run",
+    registry=None,
+)
+MATERIALIZED_BUCKETS = Counter(
+    "aggregator_rollup_materialized_minutes_total",
+    "Minute buckets recomputed from raw logs",
+    registry=None,
+)
+MATERIALIZE_LAG = Gauge(
+    "aggregator_rollup_materialize_lag_seconds",
+    "Age of the rollup materializer watermark",
+    registry=None,
+)
+MATERIALIZER_METRICS = (
+    MATERIALIZE_RUNS, MATERIALIZE_SECONDS, MATERIALIZED_BUCKETS, MATERIALIZE_LAG
+)
+
+Segment = Tuple[str, Optional[datetime], datetime]
+
+
+def floor_time(ts: datetime, granularity: str) -> datetime:
+    """granularity 버킷 시작 시각"""
+    if granularity == "day":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(second=0, microsecond=0)
+
+
+def ceil_time(ts: datetime, granularity: str) -> datetime:
+    """ts 이상인 첫 granularity 버킷 시작 시각"""
+    floored = floor_time(ts, granularity)
+    return floored if floored == ts else floored + UNITS[granularity]
+
+
+def largest_granularity(step: timedelta) -> str:
+    """step 을 나누어 떨어지게 하는 가장 큰 롤업 단위 (그 단위 버킷은 step 구간 하나에 온전히 들어간다)"""
+    for granularity in reversed(ROLLUP_GRANULARITIES):
+        if step % UNITS[granularity] == timedelta(0):
+            return granularity
+    raise ValueError(f"Time series step must be a whole number of minutes: {step}")
+
+
+def cover_aligned(start: datetime, end: datetime, granularity: str = "day") -> List[Segment]:
+    """분 단위로 정렬된 [start, end) 를 가장 큰 버킷 단위 구간들로 분할"""
+    if start >= end:
+        return []
+    if granularity == "minute":
+        return [("minute", start, end)]
+
+    finer = ROLLUP_GRANULARITIES[ROLLUP_GRANULARITIES.index(granularity) - 1]
+    inner_start = ceil_time(start, granularity)
+    inner_end = floor_time(end, granularity)
+    if inner_start >= inner_end:
+        return cover_aligned(start, end, finer)
+    return [
+        *cover_aligned(start, inner_start, finer),
+        (granularity, inner_start, inner_end),
+        *cover_aligned(inner_end, end, finer),
+    ]
+
+
+class RollupMaterializer:
+    """분/시간/일 롤업 유지 및 조회 계획"""
+
+    def __init__(
+        self,
+        mongodb_client: MongoDBClient,
+        settle_seconds: float = 60.0,
+        reconcile_interval: float = 3600.0,
+        reconcile_hours: int = 2,
+        lease_ttl: int = 300,
+        state_ttl: float = 10.0
+    ):
+        """
+        Args:
+            mongodb_client: MongoDB 클라이언트
+            settle_seconds: 계산하지 않고 기다리는 최근 구간 (초)
+            reconcile_interval: 최근 구간 전체 재계산 주기 (초, 0이면 하지 않음)
+            reconcile_hours: 전체 재계산할 최근 시간 수
+            lease_ttl: 계산 리스 유지 시간 (초)
+            state_ttl: 조회 계획에 쓰는 상태 캐시 시간 (초)
+        """
+        self.db = mongodb_client
+        self.field = mongodb_client.watermark_field()
+        self.settle = timedelta(seconds=settle_seconds)
+        self.reconcile_interval = reconcile_interval
+        self.reconcile_hours = reconcile_hours
+        self.lease_ttl = lease_ttl
+        self.state_ttl = state_ttl
+        self.owner = f"{socket.gethostname()}-{id(self)}"
+
+        self._state: Optional[Dict] = None
+        self._state_loaded_at = 0.0
+
+        self.db.ensure_rollup_indexes()
+
+    # ------------------------------------------------------------------
+    # 계산
+    # ------------------------------------------------------------------
+    def run_once(self) -> Optional[Dict]:
+        """
+        리스를 얻으면 1회 계산
+
+        Returns:
+            {"minutes": 다시 계산한 분 버킷 수, "watermark": ..., "covered_from": ...}
+            (리스를 얻지 못했으면 None)
+        """
+        if not self.db.acquire_lease(LEASE_NAME, self.owner, self.lease_ttl):
+            MATERIALIZE_RUNS.labels(result="skipped").inc()
+            return None
+
+        started = time.perf_counter()
+        try:
+            result = self._materialize()
+        except Exception:
+            MATERIALIZE_RUNS.labels(result="error").inc()
+            raise
+        finally:
+            MATERIALIZE_SECONDS.observe(time.perf_counter() - started)
+        MATERIALIZE_RUNS.labels(result="ok").inc()
+        return result
+
+    def _materialize(self) -> Dict:
+        generation = datetime.utcnow()
+        upto = generation - self.settle
+        state = self.db.get_archive_state(STATE_KEY)
+        if state and state.get("field") != self.field:
+            state = None
+
+        minutes = 0
+        if state is None:
+            # 첫 실행: 오늘(UTC) 처음부터
+            covered_from = floor_time(upto, "day")
+            minutes += self._materialize_range(covered_from, ceil_time(upto, "minute"), generation)
+            reconciled_at = generation
+        else:
+            covered_from = state["covered_from"]
+            reconciled_at = state.get("reconciled_at", generation)
+            ranges = self._touched_ranges(state["watermark"], upto, covered_from)
+
+            if (
+                self.reconcile_interval > 0
+                and (generation - reconciled_at).total_seconds() >= self.reconcile_interval
+            ):
+                recent = max(floor_time(upto - timedelta(hours=self.reconcile_hours), "minute"), covered_from)
+                ranges = self._merge_ranges([*ranges, (recent, ceil_time(upto, "minute"))])
+                reconciled_at = generation
+
+            for start, end in ranges:
+                minutes += self._materialize_range(start, end, generation)
+
+        # 과거 하루씩 채우기
+        oldest = self.db.get_oldest_log_time()
+        backfill_done = oldest is None or oldest >= covered_from
+        if not backfill_done:
+            previous_day = covered_from - UNITS["day"]
+            minutes += self._materialize_range(previous_day, covered_from, generation)
+            covered_from = previous_day
+            backfill_done = oldest >= covered_from
+
+        state = {
+            "field": self.field,
+            "watermark": upto,
+            "covered_from": covered_from,
+            "backfill_done": backfill_done,
+            "reconciled_at": reconciled_at,
+        }
+        self.db.set_archive_state(STATE_KEY, state)
+        self._state = state
+        self._state_loaded_at = time.monotonic()
+
+        MATERIALIZED_BUCKETS.inc(minutes)
+        MATERIALIZE_LAG.set((datetime.utcnow() - upto).total_seconds())
+        if minutes:
+            logger.info(
+                f"Materialized {minutes} minute buckets "
+                f"(watermark {upto.isoformat()}, covered from {covered_from.isoformat()})"
+            )
+        return {"minutes": minutes, "watermark": upto, "covered_from": covered_from}
+
+    def _touched_ranges(
+        self,
+        watermark: datetime,
+        upto: datetime,
+        covered_from: datetime
+    ) -> List[Tuple[datetime, datetime]]:
+        """워터마크 이후 저장된 문서가 속한 분 버킷 -> 묶은 [start, end) 구간"""
+        if upto <= watermark:
+            return []
+        touched = [
+            minute for minute in self.db.get_touched_minutes(self.field, watermark, upto)
+            if minute >= covered_from
+        ]
+        return self._merge_ranges([(minute, minute + UNITS["minute"]) for minute in touched])
+
+    @staticmethod
+    def _merge_ranges(ranges: List[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
+        merged: List[Tuple[datetime, datetime]] = []
+        for start, end in sorted(ranges):
+            if merged and start - merged[-1][1] <= MERGE_GAP:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    def _materialize_range(self, start: datetime, end: datetime, generation: datetime) -> int:
+        """분 버킷 [start, end) 를 원본에서, 이를 포함하는 시간/일 버킷을 작은 롤업에서 다시 계산"""
+        if start >= end:
+            return 0
+        docs = self.db.compute_minute_rollups(start, end)
+        self.db.replace_rollups("minute", start, end, docs, generation)
+
+        for granularity in ROLLUP_GRANULARITIES[1:]:
+            bucket_start = floor_time(start, granularity)
+            bucket_end = ceil_time(end, granularity)
+            docs = self.db.compute_coarser_rollups(granularity, bucket_start, bucket_end)
+            self.db.replace_rollups(granularity, bucket_start, bucket_end, docs, generation)
+
+        return int((end - start) / UNITS["minute"])
+
+    # ------------------------------------------------------------------
+    # 조회 계획
+    # ------------------------------------------------------------------
+    def _coverage(self) -> Optional[Dict]:
+        """저장된 상태 (state_ttl 동안 캐시, 다른 인스턴스가 계산한 결과도 반영)"""
+        if self._state is None or time.monotonic() - self._state_loaded_at >= self.state_ttl:
+            state = self.db.get_archive_state(STATE_KEY)
+            self._state = state if state and state.get("field") == self.field else None
+            self._state_loaded_at = time.monotonic()
+        return self._state
+
+    def ready(self) -> bool:
+        """롤업이 한 번 이상 계산되었는지"""
+        return self._coverage() is not None
+
+    def covers(self, start: Optional[datetime]) -> bool:
+        """start 이후를 원본 logs 없이(끝 구간 제외) 롤업으로 읽을 수 있는지"""
+        state = self._coverage()
+        if state is None:
+            return False
+        if start is None:
+            return state.get("backfill_done", False)
+        return start >= state["covered_from"]
+
+    def plan(
+        self,
+        start: Optional[datetime],
+        end: datetime,
+        granularity: str = "day"
+    ) -> List[Segment]:
+        """
+        [start, end) 를 (단위, 시작, 끝) 구간으로 분할 (단위: day / hour / minute / raw)
+
+        start 가 None 이면 처음부터 (과거 채우기가 끝났으면 원본 logs 를 읽지 않는다).
+        granularity 보다 큰 롤업 단위는 쓰지 않는다.
+        """
+        state = self._coverage()
+        if state is None:
+            return [(RAW, start, end)]
+
+        covered_from = state["covered_from"]
+        materialized_upto = floor_time(state["watermark"], "minute")
+        segments: List[Segment] = []
+
+        if start is None:
+            if not state.get("backfill_done", False):
+                segments.append((RAW, None, min(end, covered_from)))
+            start = covered_from
+        elif start < covered_from:
+            segments.append((RAW, start, min(end, covered_from)))
+            start = covered_from
+
+        aligned_start = min(ceil_time(start, "minute"), end)
+        aligned_end = max(floor_time(min(end, materialized_upto), "minute"), aligned_start)
+
+        if start < aligned_start:
+            segments.append((RAW, start, aligned_start))
+        segments.extend(cover_aligned(aligned_start, aligned_end, granularity))
+        if aligned_end < end:
+            segments.append((RAW, aligned_end, end))
+        return [segment for segment in segments if segment[1] is None or segment[1] < segment[2]]
+
+    def get_level_hour_counts(
+        self,
+        start: Optional[datetime],
+        end: datetime,
+        service: Optional[str] = None
+    ) -> List[Dict]:
+        """계획한 구간별 롤업/원본 조회 결과 {service, level, hour, count} (합치지 않은 행)"""
+        rows: List[Dict] = []
+        for granularity, segment_start, segment_end in self.plan(start, end):
+            rows.extend(self.db.get_level_hour_counts(
+                segment_start,
+                segment_end,
+                service=service,
+                granularity=None if granularity == RAW else granularity
+            ))
+        return rows
+
+    def get_step_counts(
+        self,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+        split: Optional[str] = None,
+        service: Optional[str] = None
+    ) -> List[Dict]:
+        """계획한 구간별 step 단위 로그 수 {bucket, key, count} (합치지 않은 행)"""
+        rows: List[Dict] = []
+        for granularity, segment_start, segment_end in self.plan(start, end, largest_granularity(step)):
+            rows.extend(self.db.get_step_counts(
+                segment_start,
+                segment_end,
+                step,
+                split=split,
+                service=service,
+                granularity=None if granularity == RAW else granularity
+            ))
+        return rows
@@ -0,0 +1,153 @@
+"""
+로그 보존(retention) 서비스
+
+hot tier(MongoDB logs)와 cold tier(Parquet 아카이브)를 관리한다.
+
+1. 지난 일자(UTC)의 로그를 Parquet로 내보낸다 (일자당 1회, 상태는 archive_state 에 기록)
+2. 보존 기간(retention_days)이 지난 일자는 아카이브 건수를 다시 확인한 뒤 MongoDB에서 삭제한다
+3. 삭제된 구간의 경계(hot_boundary)를 기록해 조회 시 아카이브/MongoDB 구간을 나눈다
+
+TTL 인덱스는 내보내기 완료 여부와 무관하게 문서를 지우므로 쓰지 않고, 내보내기가 끝난
+일자만 일 단위로 삭제한다. 일자 파티션(LOGS_PARTITIONING=daily)이면 삭제는 파티션 drop 이며,
+아카이브 없이 보존 기간만 적용할 수도 있다 (archive=None).
+blobs 컬렉션(BLOB_DEDUP_ENABLED)은 정리하지 않는다 (아카이브된 로그도 참조하므로 영구 보관).
+"""
+import logging
+import os
+import socket
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from app.database.archive import ParquetArchive
+from app.database.mongodb import MongoDBClient
+
+logger = logging.getLogger(__name__)
+
+HOT_BOUNDARY_KEY = "hot_boundary"
+LEASE_NAME = "retention"
+
+
+def day_range(day: date) -> Tuple[datetime, datetime]:
+    """일자 -> [00:00, 다음날 00:00) (naive UTC)"""
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+class RetentionService:
+    """Parquet 내보내기 + 보존 기간 만료 처리"""
+
+    def __init__(
+        self,
+        mongodb_client: MongoDBClient,
+        archive: Optional[ParquetArchive],
+        retention_days: int = 7,
+        export_delay_hours: int = 1,
+        lease_seconds: int = 3600
+    ):
+        """
+        Args:
+            mongodb_client: MongoDB 클라이언트
+            archive: Parquet 아카이브 (None이면 내보내기 없이 보존 기간이 지난 일자만 삭제)
+            retention_days: MongoDB에 원본 로그를 보관할 일수
+            export_delay_hours: 자정 이후 늦게 도착하는 로그를 기다리는 시간
+            lease_seconds: 실행 리스 유지 시간 (인스턴스 장애 시 이 시간 후 다른 인스턴스가 인계)
+        """
+        self.db = mongodb_client
+        self.archive = archive
+        self.retention_days = retention_days
+        self.export_delay = timedelta(hours=export_delay_hours)
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}-{os.getpid()}"
+
+        self._hot_boundary: Optional[datetime] = None
+
+    @staticmethod
+    def _export_key(day: date) -> str:
+        return f"export:{day.isoformat()}"
+
+    def _exportable_days(self, now: datetime) -> List[date]:
+        """내보내기 대상 일자 (가장 오래된 로그 ~ 마감된 마지막 일자)"""
+        oldest = self.db.get_oldest_log_time()
+        if oldest is None:
+            return []
+
+        last_day = (now - self.export_delay).date() - timedelta(days=1)
+        days = []
+        day = oldest.date()
+        while day <= last_day:
+            days.append(day)
+            day += timedelta(days=1)
+        return days
+
+    def export_day(self, day: date) -> int:
+        """하루치 로그를 Parquet로 내보내고 상태 기록"""
+        start, end = day_range(day)
+        counts = self.archive.write_day(day, self.db.iter_logs(start, end))
+        exported = sum(counts.values())
+
+        self.db.set_archive_state(self._export_key(day), {
+            "rows": exported,
+            "services": counts,
+            "exported_at": datetime.utcnow(),
+        })
+        return exported
+
+    def _is_exported(self, day: date) -> bool:
+        state = self.db.get_archive_state(self._export_key(day))
+        return state is not None and self.archive.has_day(day)
+
+    def expire_day(self, day: date) -> int:
+        """
+        보존 기간이 지난 일자 삭제
+
+        내보낸 뒤 늦게 도착한 로그가 있으면 (건수 불일치) 먼저 다시 내보낸다.
+        경계를 삭제 전에 옮겨 조회가 해당 일자를 아카이브에서 읽도록 한다.
+        """
+        start, end = day_range(day)
+        if self.archive is not None:
+            state = self.db.get_archive_state(self._export_key(day)) or {}
+            if self.db.count_logs(start, end) != state.get("rows"):
+                logger.info(f"Late logs found for {day.isoformat()}, re-exporting")
+                self.export_day(day)
+
+            self._set_hot_boundary(end)
+        deleted = self.db.delete_logs(start, end)
+        logger.info(f"Expired {deleted} logs for {day.isoformat()}")
+        return deleted
+
+    def _set_hot_boundary(self, boundary: datetime):
+        current = self.get_hot_boundary()
+        if current is None or boundary > current:
+            self.db.set_archive_state(HOT_BOUNDARY_KEY, {"expired_before": boundary})
+            self._hot_boundary = boundary
+
+    def get_hot_boundary(self) -> Optional[datetime]:
+        """이 시각 이전 로그는 아카이브에만 있다 (없으면 None)"""
+        state = self.db.get_archive_state(HOT_BOUNDARY_KEY)
+        self._hot_boundary = state["expired_before"] if state else None
+        return self._hot_boundary
+
+    def run_once(self) -> Dict[str, int]:
+        """
+        내보내기 + 만료 1회 실행 (다른 인스턴스가 리스를 가지고 있으면 건너뜀)
+
+        Returns:
+            {"exported": 내보낸 일자 수, "expired": 삭제한 로그 수}
+        """
+        result = {"exported": 0, "expired": 0}
+        if not self.db.acquire_lease(LEASE_NAME, self.owner, self.lease_seconds):
+            logger.debug("Retention lease held by another instance, skipping")
+            return result
+
+        now = datetime.utcnow()
+        expire_before = now.date() - timedelta(days=self.retention_days)
+
+        for day in self._exportable_days(now):
+            if self.archive is not None and not self._is_exported(day):
+                self.export_day(day)
+                result["exported"] += 1
+
+            if day < expire_before:
+                result["expired"] += self.expire_day(day)
+
+        return result
@@ -0,0 +1,92 @@
+"""
+단위(step)를 고를 수 있는 시계열 (1m / 5m / 1h / 1d)
+
+- 구간은 MongoDB $dateTrunc 와 같이 TIME_BIN_ORIGIN(2000-01-01) 기준으로 정렬한다.
+  원본 logs 는 timestamp 범위 스캔 후 $dateTrunc 로, 재계산 롤업은 step 을 나누는 단위까지만 써서 묶는다
+- 구간 수가 max_points 를 넘으면 step 을 정수배로 늘려 조회 단계에서부터 점 수를 줄인다 (downsampling).
+  로그 수는 더할 수 있는 값이라 큰 구간 값은 작은 구간 값의 합과 같다
+- fill 이면 데이터가 없는 구간을 0 으로 채운다 (split 이면 나타난 계열마다)
+"""
+
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from app.database.mongodb import TIME_BIN_ORIGIN
+
+STEPS = {
+    "1m": timedelta(minutes=1),
+    "5m": timedelta(minutes=5),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+}
+# 구간 시작 표시 형식 (1h 는 기존 시간대별 통계와 같은 YYYY-MM-DD-HH)
+LABEL_FORMATS = {
+    "1m": "%Y-%m-%d-%H:%M",
+    "5m": "%Y-%m-%d-%H:%M",
+    "1h": "%Y-%m-%d-%H",
+    "1d": "%Y-%m-%d",
+}
+SPLITS = ("level", "service")
+# 계열당 최대 점 수 (max_points 를 주지 않아도 이 이상이면 downsampling)
+MAX_POINTS = 20000
+
+SeriesKey = Tuple[datetime, Optional[str]]  # (구간 시작, 계열)
+
+
+def floor_bin(ts: datetime, step: timedelta) -> datetime:
+    """ts 가 속한 step 구간의 시작 ($dateTrunc binSize 와 같은 정렬)"""
+    return TIME_BIN_ORIGIN + ((ts - TIME_BIN_ORIGIN) // step) * step
+
+
+def bin_count(start: datetime, end: datetime, step: timedelta) -> int:
+    """[start, end) 가 걸치는 step 구간 수"""
+    return math.ceil((end - floor_bin(start, step)) / step)
+
+
+def resolve_step(
+    step: str,
+    start: datetime,
+    end: datetime,
+    max_points: Optional[int] = None
+) -> timedelta:
+    """실제 조회할 구간 크기 (구간 수가 max_points 이하가 되도록 step 의 정수배)"""
+    base = STEPS[step]
+    limit = min(max_points or MAX_POINTS, MAX_POINTS)
+    factor = max(1, math.ceil(bin_count(start, end, base) / limit))
+    # 정수배 구간은 기준 시각에 다시 정렬되므로 한 구간이 더 걸칠 수 있다
+    while bin_count(start, end, base * factor) > limit:
+        factor += 1
+    return base * factor
+
+
+def add_rows(counts: Dict[SeriesKey, int], rows: List[Dict]):
+    """{bucket, key, count} 행을 (구간, 계열) 별로 더한다 (롤업/원본/아카이브 구간 병합)"""
+    for row in rows:
+        key = (row["bucket"], row["key"])
+        counts[key] = counts.get(key, 0) + row["count"]
+
+
+def build_series(
+    counts: Dict[SeriesKey, int],
+    start: datetime,
+    end: datetime,
+    bin_size: timedelta,
+    step: str,
+    split: Optional[str] = None,
+    fill: bool = False
+) -> List[Dict]:
+    """(구간, 계열) 별 로그 수 -> 구간/계열 순 [{timestamp, series, count}]"""
+    if fill:
+        keys = {key for _, key in counts} or ({None} if split is None else set())
+        bucket = floor_bin(start, bin_size)
+        while bucket < end:
+            for key in keys:
+                counts.setdefault((bucket, key), 0)
+            bucket += bin_size
+
+    label = LABEL_FORMATS[step]
+    return [
+        {"timestamp": bucket.strftime(label), "series": key, "count": count}
+        for (bucket, key), count in sorted(counts.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+    ]
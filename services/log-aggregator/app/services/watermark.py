@@ -0,0 +1,164 @@
+"""
+워터마크 기반 증분 로그 카운터 (Prometheus 메트릭 갱신용)
+
+전체 컬렉션을 매번 집계하지 않고, 저장 시각(created_at) 워터마크 이후 문서만 집계해
+메모리의 (service, level) 합계에 더한다. 갱신 비용은 전체 데이터가 아니라 새 데이터에 비례한다.
+
+- settle_seconds: created_at 은 insert 직전에 기록되므로 최근 구간은 아직 커밋되지 않았을 수 있다.
+  now - settle_seconds 까지만 집계해 워터마크 뒤에 늦게 커밋되는 문서를 줄인다
+- reconcile_interval: 그래도 생기는 누락(재시도로 늦게 커밋된 문서, 보존 기간 삭제)은
+  주기적인 전체 집계로 바로잡는다
+- 워터마크와 합계는 archive_state 에 저장해 재시작 시 전체 집계 없이 이어간다
+  (인스턴스마다 각자 계산하며, 어느 인스턴스의 스냅샷이든 그 자체로 일관된다)
+
+compact 모드는 created_at 을 저장하지 않으므로 timestamp 를 워터마크로 쓴다.
+이 경우 늦게 도착한 로그(timestamp 가 워터마크 이전)는 다음 재집계에서 반영된다.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
+
+from app.database.mongodb import MongoDBClient
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = "metrics_watermark"
+
+# main.py 의 REGISTRY 에 등록해 /metrics 로 노출
+WATERMARK_LAG = Gauge(
+    "aggregator_metrics_watermark_lag_seconds",
+    "Age of the incremental metrics watermark",
+    registry=None,
+)
+INCREMENTAL_DOCUMENTS = Counter(
+    "aggregator_metrics_incremental_documents_total",
+    "Documents aggregated by incremental metrics refreshes",
+    registry=None,
+)
+RECONCILIATIONS = Counter(
+    "aggregator_metrics_reconciliations_total",
+    "Full recounts run by the incremental metrics updater",
+    registry=None,
+)
+RECONCILE_DRIFT = Gauge(
+    "aggregator_metrics_reconcile_drift",
+    "Absolute difference between incremental and recounted totals at the last reconciliation",
+    registry=None,
+)
+WATERMARK_METRICS = (WATERMARK_LAG, INCREMENTAL_DOCUMENTS, RECONCILIATIONS, RECONCILE_DRIFT)
+
+LevelKey = Tuple[str, str]
+
+
+class WatermarkCounter:
+    """(service, level) 별 누적 로그 수를 워터마크 이후 증분으로 유지"""
+
+    def __init__(
+        self,
+        mongodb_client: MongoDBClient,
+        settle_seconds: float = 30.0,
+        reconcile_interval: float = 3600.0,
+        persist_interval: float = 60.0
+    ):
+        """
+        Args:
+            mongodb_client: MongoDB 클라이언트
+            settle_seconds: 집계하지 않고 기다리는 최근 구간 (초)
+            reconcile_interval: 전체 재집계 주기 (초, 0이면 재집계하지 않음)
+            persist_interval: 워터마크/합계 저장 주기 (초)
+        """
+        self.db = mongodb_client
+        self.field = mongodb_client.watermark_field()
+        self.settle = timedelta(seconds=settle_seconds)
+        self.reconcile_interval = reconcile_interval
+        self.persist_interval = persist_interval
+
+        self.totals: Dict[LevelKey, int] = {}
+        self.watermark: Optional[datetime] = None
+        self._reconciled_at = 0.0
+        self._persisted_at = 0.0
+
+    def _load_state(self) -> bool:
+        """저장된 워터마크/합계 복구 (기준 필드가 바뀌었으면 버린다)"""
+        state = self.db.get_archive_state(STATE_KEY)
+        if not state or state.get("field") != self.field:
+            return False
+
+        self.watermark = state["watermark"]
+        self.totals = {(row["service"], row["level"]): row["count"] for row in state["totals"]}
+        # 재시작 직후가 아니라 저장된 시점 기준으로 재집계 주기를 이어간다
+        age = (datetime.utcnow() - state.get("reconciled_at", self.watermark)).total_seconds()
+        self._reconciled_at = time.monotonic() - max(age, 0)
+        logger.info(f"Restored metrics watermark at {self.watermark.isoformat()}")
+        return True
+
+    def _persist(self):
+        self.db.set_archive_state(STATE_KEY, {
+            "field": self.field,
+            "watermark": self.watermark,
+            "totals": [
+                {"service": service, "level": level, "count": count}
+                for (service, level), count in self.totals.items()
+            ],
+            "reconciled_at": datetime.utcnow() - timedelta(
+                seconds=time.monotonic() - self._reconciled_at
+            ),
+        })
+        self._persisted_at = time.monotonic()
+
+    def reconcile(self, upto: datetime):
+        """upto 까지 전체 재집계로 합계 교체"""
+        rows = self.db.get_level_counts(self.field, upto=upto)
+        totals = {(row["service"], row["level"]): row["count"] for row in rows}
+
+        if self.watermark is not None:
+            drift = sum(
+                abs(totals.get(key, 0) - self.totals.get(key, 0))
+                for key in totals.keys() | self.totals.keys()
+            )
+            RECONCILE_DRIFT.set(drift)
+            if drift:
+                logger.info(f"Metrics reconciliation corrected drift of {drift} logs")
+
+        self.totals = totals
+        self.watermark = upto
+        self._reconciled_at = time.monotonic()
+        RECONCILIATIONS.inc()
+
+    def refresh(self) -> Dict[LevelKey, int]:
+        """
+        워터마크 이후 문서를 합계에 반영 (재집계 주기가 되었으면 전체 재집계)
+
+        Returns:
+            {(service, level): 누적 로그 수}
+        """
+        upto = datetime.utcnow() - self.settle
+
+        if self.watermark is None and not self._load_state():
+            self.reconcile(upto)
+        elif (
+            self.reconcile_interval > 0
+            and time.monotonic() - self._reconciled_at >= self.reconcile_interval
+        ):
+            self.reconcile(upto)
+        elif upto > self.watermark:
+            rows = self.db.get_level_counts(self.field, after=self.watermark, upto=upto)
+            for row in rows:
+                key = (row["service"], row["level"])
+                self.totals[key] = self.totals.get(key, 0) + row["count"]
+            INCREMENTAL_DOCUMENTS.inc(sum(row["count"] for row in rows))
+            self.watermark = upto
+
+        WATERMARK_LAG.set((datetime.utcnow() - self.watermark).total_seconds())
+
+        if time.monotonic() - self._persisted_at >= self.persist_interval:
+            try:
+                self._persist()
+            except Exception as e:
+                logger.warning(f"Failed to persist metrics watermark: {e}")
+
+        return dict(self.totals)
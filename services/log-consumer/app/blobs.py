@@ -0,0 +1,108 @@
+"""
+큰 metadata 필드 중복 제거 (content-addressed blob)
+
+stack_trace 처럼 크고 반복되는 metadata 문자열은 sha256 해시를 키로 blobs 컬렉션에
+한 번만 저장하고, 로그에는 해시만 남긴다.
+
+    logs:  {"metadata": {"request_id": ..., "_blobs": {"stack_trace": "<sha256>"}}}
+    blobs: {"_id": "<sha256>", "field": "stack_trace", "value": ..., "size": ..., "first_seen": ...}
+
+최근 저장한 해시는 프로세스 내 LRU 로 기억해 같은 blob 의 upsert 를 생략한다.
+blobs 는 보존 기간/TTL 로 지워지지 않는다 (영구 보관). 기본값은 꺼져 있다 (BLOB_DEDUP_ENABLED).
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from prometheus_client import Counter
+
+from app.models.log import LogEntry
+
+BLOB_REFS_KEY = "_blobs"
+
+BLOB_REFS = Counter(
+    "log_blob_refs_total",
+    "Large metadata fields replaced by a blob reference",
+)
+BLOB_UPSERTS_SKIPPED = Counter(
+    "log_blob_upserts_skipped_total",
+    "Blob references whose upsert was skipped because the hash was recently stored",
+)
+BLOB_BYTES_DEDUPED = Counter(
+    "log_blob_bytes_deduplicated_total",
+    "Bytes of metadata not written to logs because they were stored as blobs",
+)
+
+
+def fingerprint(value: str) -> str:
+    """blob 해시 (sha256 hex)"""
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class BlobDeduplicator:
+    """metadata 의 큰 문자열 필드를 blob 참조로 바꾸고 새 blob 을 모은다"""
+
+    def __init__(self, min_bytes: int = 512, cache_size: int = 10000):
+        """
+        Args:
+            min_bytes: blob 으로 분리할 문자열 필드의 최소 크기
+            cache_size: 저장 완료된 해시 LRU 크기
+        """
+        self.min_bytes = min_bytes
+        self.cache_size = cache_size
+        self.known: "OrderedDict[str, None]" = OrderedDict()
+
+    def _is_known(self, digest: str) -> bool:
+        if digest in self.known:
+            self.known.move_to_end(digest)
+            return True
+        return False
+
+    def remember(self, digests):
+        """blobs 컬렉션에 저장된 해시 기록"""
+        for digest in digests:
+            self.known[digest] = None
+            self.known.move_to_end(digest)
+        while len(self.known) > self.cache_size:
+            self.known.popitem(last=False)
+
+    def dedupe(self, logs: List[LogEntry]) -> Tuple[List[LogEntry], Dict[str, Tuple[str, str]]]:
+        """
+        배치의 큰 metadata 필드를 blob 참조로 치환
+
+        원본 로그는 바꾸지 않는다 (스필/재시도는 원본 기준).
+
+        Returns:
+            (치환된 로그, 새로 저장할 blob {해시: (필드 이름, 값)})
+        """
+        new_blobs: Dict[str, Tuple[str, str]] = {}
+        result = []
+
+        for log in logs:
+            metadata = log.metadata or {}
+            refs = {}
+            for key, value in metadata.items():
+                if isinstance(value, str) and len(value) >= self.min_bytes:
+                    digest = fingerprint(value)
+                    refs[key] = digest
+                    BLOB_REFS.inc()
+                    BLOB_BYTES_DEDUPED.inc(len(value))
+
+                    if digest in new_blobs:
+                        continue
+                    if self._is_known(digest):
+                        BLOB_UPSERTS_SKIPPED.inc()
+                    else:
+                        new_blobs[digest] = (key, value)
+
+            if not refs:
+                result.append(log)
+                continue
+
+            stripped = {k: v for k, v in metadata.items() if k not in refs}
+            existing = metadata.get(BLOB_REFS_KEY)
+            stripped[BLOB_REFS_KEY] = {**(existing if isinstance(existing, dict) else {}), **refs}
+            result.append(log.model_copy(update={"metadata": stripped}))
+
+        return result, new_blobs
@@ -0,0 +1,112 @@
+"""
+MongoDB 저장용 서킷 브레이커
+
+연속 실패가 failure_threshold 에 도달하면 open 상태가 되어 저장을 시도하지 않는다.
+open 상태에서는 지수 백오프 간격으로 probe 하고, probe 가 성공하면 half-open 을 거쳐
+다음 저장 성공 시 closed 로 돌아간다.
+"""
+
+import logging
+import time
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Gauge 값 (0: closed, 1: open, 2: half-open)
+STATE_VALUES = {STATE_CLOSED: 0, STATE_OPEN: 1, STATE_HALF_OPEN: 2}
+
+BREAKER_STATE = Gauge(
+    "mongodb_circuit_breaker_state",
+    "MongoDB circuit breaker state (0=closed, 1=open, 2=half-open)",
+)
+BREAKER_TRIPS = Counter(
+    "mongodb_circuit_breaker_trips_total",
+    "Number of times the MongoDB circuit breaker opened",
+)
+BREAKER_PROBES = Counter(
+    "mongodb_circuit_breaker_probes_total",
+    "MongoDB health probes while the circuit breaker is open",
+    ["result"],
+)
+
+
+class CircuitBreaker:
+    """연속 실패 기반 서킷 브레이커"""
+
+    def __init__(
+        self,
+        failure_threshold: int = 2,
+        probe_interval: float = 1.0,
+        max_probe_interval: float = 60.0,
+    ):
+        """
+        Args:
+            failure_threshold: open 으로 전환되는 연속 실패 횟수
+            probe_interval: 첫 probe 대기 시간 (초)
+            max_probe_interval: probe 대기 시간 상한 (초)
+        """
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.max_probe_interval = max_probe_interval
+
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self._current_interval = probe_interval
+        self._next_probe_at = 0.0
+
+        BREAKER_STATE.set(STATE_VALUES[self.state])
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.warning(f"Circuit breaker: {self.state} -> {state}")
+            self.state = state
+            BREAKER_STATE.set(STATE_VALUES[state])
+
+    @property
+    def is_closed(self) -> bool:
+        return self.state == STATE_CLOSED
+
+    def allow_request(self) -> bool:
+        """저장 시도 가능 여부 (open 상태면 False)"""
+        return self.state != STATE_OPEN
+
+    def probe_due(self) -> bool:
+        """open 상태에서 probe 시점이 되었는지"""
+        return self.state == STATE_OPEN and time.monotonic() >= self._next_probe_at
+
+    def record_success(self):
+        """저장 성공"""
+        self.consecutive_failures = 0
+        self._current_interval = self.probe_interval
+        self._set_state(STATE_CLOSED)
+
+    def record_failure(self):
+        """저장 실패 (half-open 에서 실패하면 즉시 다시 open)"""
+        self.consecutive_failures += 1
+
+        if self.state == STATE_HALF_OPEN:
+            self._open(backoff=True)
+        elif self.state == STATE_CLOSED and self.consecutive_failures >= self.failure_threshold:
+            BREAKER_TRIPS.inc()
+            self._open(backoff=False)
+
+    def record_probe(self, healthy: bool):
+        """probe 결과 반영 (성공하면 half-open, 실패하면 대기 시간 2배)"""
+        BREAKER_PROBES.labels(result="success" if healthy else "failure").inc()
+
+        if healthy:
+            self._set_state(STATE_HALF_OPEN)
+        else:
+            self._open(backoff=True)
+
+    def _open(self, backoff: bool):
+        if backoff:
+            self._current_interval = min(self._current_interval * 2, self.max_probe_interval)
+        self._next_probe_at = time.monotonic() + self._current_interval
+        self._set_state(STATE_OPEN)
+        logger.warning(f"Next MongoDB probe in {self._current_interval:.1f}s")
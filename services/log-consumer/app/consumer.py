@@ -4,13 +4,26 @@ Kafka Consumer 구현
 
 import json
 import logging
-from typing import Optional
-from kafka import KafkaConsumer
+import time
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
+from kafka import KafkaConsumer, OffsetAndMetadata, TopicPartition
+from kafka.coordinator.assignors.range import RangePartitionAssignor
+from kafka.coordinator.assignors.roundrobin import RoundRobinPartitionAssignor
+from kafka.coordinator.assignors.sticky.sticky_assignor import StickyPartitionAssignor
 
 # from kafka.errors import KafkaError # Unused
 from app.models.log import LogEntry
 from app.database.mongodb import MongoDBHandler
-from prometheus_client import Counter
+from app.lag_server import LagSnapshot
+from app.rollup import MinuteRollup
+from app.circuit_breaker import CircuitBreaker
+from app.spill import SpillBuffer
+from app.payload import MAX_OVERFLOW_BYTES, estimate_size, truncate_log
+from app.blobs import BlobDeduplicator
+from app.dedup import DuplicateFilter
+from app.rebalance import PAUSED_SECONDS, BatchFlushingRebalanceListener
+from prometheus_client import Counter, Gauge, Histogram
 
 # Metrics
 LOGS_PROCESSED = Counter(
@@ -19,6 +32,49 @@ LOGS_PROCESSED = Counter(
 LOG_PROCESSING_ERRORS = Counter(
     "log_processing_errors_total", "Total number of log processing errors"
 )
+LOG_DUPLICATES = Counter(
+    "log_duplicates_total", "Total number of redelivered logs that were already stored"
+)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+INGEST_LATENCY = Histogram(
+    "log_ingest_latency_seconds",
+    "Time from log timestamp to MongoDB insert",
+    ["service"],
+    buckets=LATENCY_BUCKETS,
+)
+KAFKA_TO_WRITE_LATENCY = Histogram(
+    "kafka_record_to_write_seconds",
+    "Time from Kafka record timestamp to MongoDB insert",
+    ["lane"],
+    # priority lane 의 수십 ms 지연도 구분되도록 작은 구간을 더한다
+    buckets=(0.01, 0.025) + LATENCY_BUCKETS,
+)
+CONSUMER_LAG = Gauge(
+    "kafka_consumer_lag",
+    "Consumer lag per partition (end offset - position)",
+    ["topic", "partition"],
+)
+OVERSIZED_LOGS = Counter(
+    "log_oversized_total",
+    "Logs larger than the per-record limit",
+    ["action"],
+)
+BATCH_BYTES = Histogram(
+    "log_batch_bytes",
+    "Estimated serialized size of batches written to MongoDB",
+    buckets=(64 * 1024, 256 * 1024, 1024**2, 4 * 1024**2, 8 * 1024**2, 16 * 1024**2, 32 * 1024**2),
+)
+LANE_BATCHES = Counter(
+    "log_lane_batches_total",
+    "Batches written per consumer lane by flush trigger",
+    ["lane", "trigger"],
+)
+PAUSED_PARTITIONS = Gauge(
+    "kafka_consumer_paused_partitions",
+    "Partitions paused while MongoDB is unavailable or the spill is draining",
+)
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +99,20 @@ class LogConsumer:
         group_id: str,
         mongodb_handler: MongoDBHandler,
         batch_size: int = 100,
+        lag_refresh_interval: float = 10.0,
+        rollup_enabled: bool = True,
+        breaker: Optional[CircuitBreaker] = None,
+        spill: Optional[SpillBuffer] = None,
+        drain_batch_size: int = 2000,
+        max_batch_bytes: int = 8 * 1024 * 1024,
+        max_record_bytes: int = 256 * 1024,
+        max_field_bytes: int = 16 * 1024,
+        blob_dedup: Optional[BlobDeduplicator] = None,
+        group_instance_id: Optional[str] = None,
+        session_timeout_ms: int = 30000,
+        lane: str = "bulk",
+        batch_linger_ms: int = 2000,
+        duplicate_filter: Optional[DuplicateFilter] = None,
     ):
         """
         Args:
@@ -51,12 +121,31 @@ class LogConsumer:
             group_id: Consumer Group ID
             mongodb_handler: MongoDB 핸들러
             batch_size: 배치 저장 크기
+            lag_refresh_interval: 파티션 lag 갱신 주기 (초)
+            rollup_enabled: 분 단위 롤업 카운터 유지 여부
+            breaker: MongoDB 저장 서킷 브레이커
+            spill: MongoDB 장애 중 배치를 기록할 로컬 스필 (None이면 파티션 pause만 사용)
+            drain_batch_size: 복구 후 스필을 다시 저장할 때의 배치 크기
+            max_batch_bytes: 배치의 직렬화 크기 상한 (건수 상한과 함께 적용)
+            max_record_bytes: 레코드 1건 크기 상한 (넘으면 잘라서 저장, 원본은 logs_overflow)
+            max_field_bytes: 잘라낼 때 문자열 필드 1개의 최대 크기
+            blob_dedup: 큰 metadata 필드를 blobs 컬렉션 참조로 바꾸는 중복 제거기
+            group_instance_id: 재시작해도 바뀌지 않는 static membership ID (없으면 dynamic membership)
+            session_timeout_ms: 세션 타임아웃 (static member 가 재시작 후 돌아올 수 있는 시간)
+            lane: 컨슈머 레인 이름 (bulk: 대량 INFO/DEBUG, priority: ERROR/CRITICAL 우선순위 토픽)
+            batch_linger_ms: 배치가 차지 않아도 첫 레코드 이후 이 시간이 지나면 저장
+            duplicate_filter: 재전달된 레코드를 insert 전에 걸러내는 Bloom filter
         """
         self.bootstrap_servers = bootstrap_servers
         self.topic = topic
         self.group_id = group_id
         self.mongodb_handler = mongodb_handler
         self.batch_size = batch_size
+        self.group_instance_id = group_instance_id or None
+        self.session_timeout_ms = session_timeout_ms
+        self.lane = lane
+        self.batch_linger_ms = batch_linger_ms
+        self.lag_refresh_interval = lag_refresh_interval
         self.consumer: Optional[KafkaConsumer] = None
 
         # 통계
@@ -64,15 +153,53 @@ class LogConsumer:
         self.total_success = 0
         self.total_failed = 0
 
+        # 파티션별 lag 스냅샷 (lag 엔드포인트에서 읽기 전용으로 사용)
+        self.partition_lag: LagSnapshot = {}
+        self._last_lag_refresh = 0.0
+
+        # 분 단위 롤업 카운터 (logs_rollup_minute)
+        self.rollup: Optional[MinuteRollup] = MinuteRollup() if rollup_enabled else None
+
+        # MongoDB 장애 대응 (서킷 브레이커 + 스필 / 파티션 pause)
+        self.breaker = breaker or CircuitBreaker()
+        self.spill = spill
+        self.drain_batch_size = drain_batch_size
+        self.paused = False
+        self._paused_at = 0.0
+
+        # 아직 저장하지 않은 배치 (리밸런스 시 flush)
+        self.batch: list[LogEntry] = []
+        self.batch_bytes = 0
+        self._batch_started_at = 0.0
+
+        # 배치/레코드 크기 제한
+        self.max_batch_bytes = max_batch_bytes
+        self.max_record_bytes = max_record_bytes
+        self.max_field_bytes = max_field_bytes
+
+        # 큰 metadata 필드 (stack_trace 등) 중복 제거
+        self.blob_dedup = blob_dedup
+
+        # 리밸런스/재시작 후 재전달된 레코드 억제
+        self.duplicate_filter = duplicate_filter
+
         self._create_consumer()
 
     def _create_consumer(self):
         """Kafka Consumer 생성"""
         try:
             self.consumer = KafkaConsumer(
-                self.topic,
                 bootstrap_servers=self.bootstrap_servers,
                 group_id=self.group_id,
+                # static membership: 같은 ID로 session timeout 안에 재접속하면 리밸런스 없음
+                group_instance_id=self.group_instance_id or "",
+                leave_group_on_close=self.group_instance_id is None,
+                # 이동하는 파티션을 최소화 (range 는 기존 멤버와의 롤링 전환용)
+                partition_assignment_strategy=(
+                    StickyPartitionAssignor,
+                    RangePartitionAssignor,
+                    RoundRobinPartitionAssignor,
+                ),
                 # 메시지 처리 설정
                 auto_offset_reset="earliest",  # 처음부터 읽기
                 enable_auto_commit=True,  # 자동 offset commit
@@ -81,14 +208,26 @@ class LogConsumer:
                 value_deserializer=safe_json_deserializer,
                 # 성능 설정
                 max_poll_records=self.batch_size,  # 한 번에 가져올 최대 레코드 수
-                session_timeout_ms=30000,  # 30초
-                heartbeat_interval_ms=10000,  # 10초
+                # fetch 응답 크기도 배치 크기 상한에 맞춰 메모리 사용량을 고정
+                fetch_max_bytes=self.max_batch_bytes,
+                max_partition_fetch_bytes=min(self.max_batch_bytes, 1024 * 1024),
+                session_timeout_ms=self.session_timeout_ms,
+                heartbeat_interval_ms=min(10000, self.session_timeout_ms // 3),
+            )
+            self.consumer.subscribe(
+                [self.topic],
+                listener=BatchFlushingRebalanceListener(
+                    on_revoke=self._on_partitions_revoked,
+                    on_assign=self._on_partitions_assigned,
+                ),
             )
 
             logger.info(
                 f"Kafka Consumer created - "
                 f"Topic: {self.topic}, Group: {self.group_id}, "
-                f"Batch size: {self.batch_size}"
+                f"Instance: {self.group_instance_id or 'dynamic'}, "
+                f"Lane: {self.lane}, "
+                f"Batch size: {self.batch_size}, Linger: {self.batch_linger_ms}ms"
             )
 
         except Exception as e:
@@ -101,77 +240,481 @@ class LogConsumer:
         """
         logger.info("Starting message consumption...")
 
-        batch = []
+        # linger 보다 오래 poll 에서 기다리지 않도록
+        poll_timeout_ms = max(min(1000, self.batch_linger_ms), 10)
 
         try:
-            for message in self.consumer:
-                try:
-                    # 메시지 값이 없으면 스킵 (역직렬화 실패 등)
-                    if message.value is None:
+            while True:
+                records = self.consumer.poll(timeout_ms=poll_timeout_ms)
+                messages = [message for partition_messages in records.values() for message in partition_messages]
+
+                for index, message in enumerate(messages):
+                    try:
+                        # 메시지 값이 없으면 스킵 (역직렬화 실패 등)
+                        if message.value is None:
+                            continue
+
+                        # Kafka 메시지를 LogEntry로 변환
+                        log_entry = LogEntry.from_kafka_message(
+                            message.value,
+                            kafka_timestamp=message.timestamp,
+                            kafka_topic=message.topic,
+                            kafka_partition=message.partition,
+                            kafka_offset=message.offset,
+                        )
+                        # 직렬화 크기로 배치 크기 추정 (큰 레코드는 잘라서 저장)
+                        size = message.serialized_value_size
+                        if size is None or size < 0:
+                            size = estimate_size(log_entry)
+                        if size > self.max_record_bytes:
+                            log_entry, size = self._shrink_oversized(
+                                log_entry, message.value, size
+                            )
+
+                        if not self.batch:
+                            self._batch_started_at = time.monotonic()
+                        self.batch.append(log_entry)
+                        self.batch_bytes += size
+
+                        logger.debug(
+                            f"Received log - "
+                            f"Partition: {message.partition}, "
+                            f"Offset: {message.offset}, "
+                            f"Service: {log_entry.service}"
+                        )
+
+                    except Exception as e:
+                        logger.error(f"Error processing message: {e}")
+                        self.total_failed += 1
+                        LOG_PROCESSING_ERRORS.inc()
                         continue
 
-                    # Kafka 메시지를 LogEntry로 변환
-                    log_entry = LogEntry.from_kafka_message(message.value)
-                    batch.append(log_entry)
+                    # 배치 건수 또는 크기 상한에 도달하면 저장
+                    if len(self.batch) >= self.batch_size or self.batch_bytes >= self.max_batch_bytes:
+                        batch = self._take_batch("size")
+                        if not self._save_batch(batch):
+                            # 저장도 스필도 못 했으면 되감고 나머지 레코드는 다시 받는다
+                            self._pause_and_rewind(batch, messages[index + 1:])
+                            break
+
+                # 배치가 덜 찼어도 linger 가 지나면 저장 (트래픽이 적을 때 지연 상한)
+                if self.batch and self._linger_expired():
+                    batch = self._take_batch("linger")
+                    if not self._save_batch(batch):
+                        self._pause_and_rewind(batch, [])
 
-                    logger.debug(
-                        f"Received log - "
-                        f"Partition: {message.partition}, "
-                        f"Offset: {message.offset}, "
-                        f"Service: {log_entry.service}"
-                    )
+                # MongoDB probe / 스필 drain / 파티션 resume
+                self._recover()
 
-                    # 배치 크기에 도달하면 저장
-                    if len(batch) >= self.batch_size:
-                        self._save_batch(batch)
-                        batch = []
+                # 메시지가 없어도 주기적으로 lag 갱신
+                self._maybe_refresh_lag()
 
-                except Exception as e:
-                    logger.error(f"Error processing message: {e}")
-                    self.total_failed += 1
-                    LOG_PROCESSING_ERRORS.inc()
-                    continue
+                # 자정 전에 내일 파티션 생성 (daily 파티션, MongoDB 장애 중에는 건너뜀)
+                if self.breaker.allow_request():
+                    self.mongodb_handler.maybe_prepare_partitions()
 
         except KeyboardInterrupt:
             logger.info("Consumer interrupted by user")
 
         finally:
-            # 남은 배치 저장
-            if batch:
-                self._save_batch(batch)
+            # 남은 배치 저장 (실패하면 offset을 되감아 commit 되지 않게 한다)
+            batch = self._take_batch()
+            if batch and not self._save_batch(batch):
+                self._pause_and_rewind(batch, [])
+
+            # 스필에 남은 로그의 첫 offset 으로 되감는다 (close 의 auto commit 이 되감은 position 을 commit)
+            self._rewind_spilled()
 
             self._print_stats()
             self.close()
 
-    def _save_batch(self, batch: list[LogEntry]):
-        """배치를 MongoDB에 저장"""
-        if not batch:
+    def _linger_expired(self) -> bool:
+        """현재 배치의 첫 레코드 이후 batch_linger_ms 가 지났는지"""
+        return (time.monotonic() - self._batch_started_at) * 1000 >= self.batch_linger_ms
+
+    def _take_batch(self, trigger: str = "flush") -> list[LogEntry]:
+        """현재 배치를 꺼내고 초기화"""
+        batch = self.batch
+        if batch:
+            BATCH_BYTES.observe(self.batch_bytes)
+            LANE_BATCHES.labels(lane=self.lane, trigger=trigger).inc()
+        self.batch = []
+        self.batch_bytes = 0
+        return batch
+
+    def _on_partitions_revoked(self, revoked: set):
+        """
+        리밸런스로 파티션을 내놓기 전에 남은 배치 저장
+
+        kafka-python 은 revoke 콜백 직전에 현재 position 을 auto commit 하므로,
+        저장하지 못한 배치나 스필에 남은 로그가 있으면 그 첫 offset 으로 다시 commit 해
+        새 owner 가 이어받게 한다 (스필은 MongoDB 복구 후에도 drain 되며, 중복은 결정적 _id 로 걸러진다).
+        """
+        batch = self._take_batch()
+        offsets = {}
+        if batch and not self._save_batch(batch):
+            offsets = self._first_offsets(batch, [])
+        for tp, offset in self._spilled_offsets().items():
+            offsets[tp] = min(offsets.get(tp, offset), offset)
+
+        offsets = {tp: offset for tp, offset in offsets.items() if tp in revoked}
+        if not offsets:
+            return
+
+        self.consumer.commit({tp: OffsetAndMetadata(offset, "") for tp, offset in offsets.items()})
+        logger.warning(f"Committed rewound offsets for {len(offsets)} revoked partitions")
+
+    def _on_partitions_assigned(self, assigned: set):
+        """새 파티션 할당 후 처리 (MongoDB 장애로 pause 중이면 새 파티션도 pause)"""
+        if self.paused and assigned:
+            self.consumer.pause(*assigned)
+            PAUSED_PARTITIONS.set(len(assigned))
+
+    def _spilled_offsets(self) -> dict:
+        """스필에 남은 로그의 파티션별 첫 offset"""
+        if self.spill is None or len(self.spill) == 0:
+            return {}
+        return {
+            TopicPartition(topic, partition): offset
+            for (topic, partition), offset in self.spill.first_offsets().items()
+        }
+
+    def _rewind_spilled(self):
+        """
+        할당된 파티션을 스필에 남은 로그의 첫 offset 으로 되감는다 (종료 시)
+
+        auto commit 은 스필에 기록한 레코드 뒤까지 offset 을 commit 하므로, 스필 디렉터리가
+        Pod 와 함께 사라지면 그 로그를 다시 받을 수 없다. 종료 전에 되감아 두면 다음 owner 가
+        Kafka 에서 다시 읽는다 (같은 스필이 남아 있으면 drain 과 중복되지만 결정적 _id 로 걸러진다).
+        """
+        offsets = self._spilled_offsets()
+        if not offsets:
             return
 
         try:
-            success_count, failure_count = self.mongodb_handler.insert_logs_batch(batch)
+            assignment = self.consumer.assignment()
+            rewound = 0
+            for tp, offset in offsets.items():
+                if tp in assignment and offset < self.consumer.position(tp):
+                    self.consumer.seek(tp, offset)
+                    rewound += 1
+            logger.warning(
+                f"Rewound {rewound} partitions to {len(self.spill)} spilled logs before shutdown"
+            )
+        except Exception as e:
+            logger.error(f"Failed to rewind offsets for spilled logs: {e}")
 
-            self.total_processed += len(batch)
-            self.total_success += success_count
-            self.total_failed += failure_count
+    def _save_batch(self, batch: list[LogEntry]) -> bool:
+        """
+        배치를 MongoDB에 저장
 
-            # Prometheus Metrics
-            LOGS_PROCESSED.inc(success_count)
-            if failure_count > 0:
-                LOG_PROCESSING_ERRORS.inc(failure_count)
+        서킷 브레이커가 열려 있거나 MongoDB 장애로 저장하지 못한 로그는 스필에 기록한다.
 
-            logger.info(
-                f"Batch saved - "
-                f"Size: {len(batch)}, "
-                f"Success: {success_count}, "
-                f"Failed: {failure_count}, "
-                f"Total processed: {self.total_processed}"
-            )
+        Returns:
+            처리 여부 (False면 저장도 스필도 못 했으므로 호출 측에서 offset을 되감아야 함)
+        """
+        if not batch:
+            return True
+
+        if not self.breaker.allow_request():
+            return self._buffer(batch)
 
+        unavailable = self._store(batch)
+        if unavailable:
+            return self._buffer(unavailable)
+        return True
+
+    def _store(self, batch: list[LogEntry]) -> List[LogEntry]:
+        """
+        MongoDB 저장 후 통계/지연/롤업 반영
+
+        Returns:
+            MongoDB 장애로 저장하지 못한 로그
+        """
+        try:
+            if self.duplicate_filter is not None:
+                batch, suppressed = self.duplicate_filter.filter(batch)
+                if suppressed:
+                    logger.info(f"Suppressed {suppressed} redelivered logs")
+                if not batch:
+                    return []
+
+            documents = batch
+            if self.blob_dedup is not None:
+                # blob 을 먼저 저장해야 로그의 참조가 항상 유효하다
+                documents, new_blobs = self.blob_dedup.dedupe(batch)
+                if not self.mongodb_handler.upsert_blobs(new_blobs):
+                    self.breaker.record_failure()
+                    return list(batch)
+                self.blob_dedup.remember(new_blobs)
+
+            result = self.mongodb_handler.insert_logs_batch(documents)
         except Exception as e:
+            # 저장 단계에서 난 예외만 잡는다 (되감아 다시 받도록 배치를 돌려준다)
             logger.error(f"Failed to save batch: {e}")
-            self.total_failed += len(batch)
-            LOG_PROCESSING_ERRORS.inc(len(batch))
+            self.breaker.record_failure()
+            return list(batch)
+
+        success_count, failure_count = result.success_count, result.failure_count
+
+        unavailable = (
+            [log for log in batch if log.document_id() in result.unavailable_ids]
+            if result.unavailable_ids
+            else []
+        )
+        if unavailable:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+        self.total_processed += len(batch) - len(unavailable)
+        self.total_success += success_count
+        self.total_failed += failure_count
+
+        # Prometheus Metrics
+        LOGS_PROCESSED.inc(success_count)
+        if failure_count > 0:
+            LOG_PROCESSING_ERRORS.inc(failure_count)
+        if result.duplicate_ids:
+            LOG_DUPLICATES.inc(len(result.duplicate_ids))
+
+        # 저장된(이미 있던 것 포함) 로그만 필터에 기록 (되감을 로그는 다시 받아야 한다)
+        if self.duplicate_filter is not None:
+            not_stored = result.failed_ids | result.unavailable_ids
+            self.duplicate_filter.remember(
+                [log for log in batch if log.document_id() not in not_stored]
+                if not_stored
+                else batch
+            )
+
+        # 이번에 새로 저장된 로그만 지연/롤업에 반영 (재전달된 중복 제외)
+        skipped_ids = result.duplicate_ids | result.failed_ids | result.unavailable_ids
+        stored = (
+            [log for log in batch if log.document_id() not in skipped_ids]
+            if skipped_ids
+            else batch
+        )
+        if stored:
+            self._observe_latency(stored)
+
+        self._flush_rollup(stored)
+
+        logger.info(
+            f"Batch saved - "
+            f"Size: {len(batch)}, "
+            f"Success: {success_count}, "
+            f"Failed: {failure_count}, "
+            f"Total processed: {self.total_processed}"
+        )
+
+        return unavailable
+
+    def _shrink_oversized(self, log: LogEntry, value: dict, size: int):
+        """
+        max_record_bytes 를 넘는 로그 처리
+
+        원본은 logs_overflow 에 out-of-line 으로 보관하고 (BSON 제한 이내일 때),
+        logs 에는 긴 필드를 잘라낸 로그를 저장한다.
+
+        Returns:
+            (잘린 로그, 추정 크기)
+        """
+        truncated, truncated_size = truncate_log(
+            log, self.max_record_bytes, self.max_field_bytes
+        )
+
+        if (
+            size <= MAX_OVERFLOW_BYTES
+            and self.breaker.allow_request()
+            and self.mongodb_handler.store_overflow(log.document_id(), value)
+        ):
+            truncated.metadata["_overflow"] = True
+            OVERSIZED_LOGS.labels(action="overflow").inc()
+        else:
+            OVERSIZED_LOGS.labels(action="truncated").inc()
+
+        logger.warning(
+            f"Oversized log {log.document_id()} ({size} bytes) "
+            f"truncated to {truncated_size} bytes"
+        )
+        return truncated, truncated_size
+
+    def _byte_chunks(
+        self, logs: list[LogEntry], sizes: list[int], max_count: int
+    ) -> Iterator[list[LogEntry]]:
+        """건수와 크기 상한을 모두 지키는 배치로 나눈다"""
+        chunk, chunk_bytes = [], 0
+        for log, size in zip(logs, sizes):
+            if chunk and (len(chunk) >= max_count or chunk_bytes + size > self.max_batch_bytes):
+                yield chunk
+                chunk, chunk_bytes = [], 0
+            chunk.append(log)
+            chunk_bytes += size
+        if chunk:
+            yield chunk
+
+    def _buffer(self, logs: list[LogEntry]) -> bool:
+        """MongoDB에 저장하지 못한 로그를 스필에 기록 (스필이 없거나 가득 차면 False)"""
+        if self.spill is not None and self.spill.append(logs):
+            logger.warning(
+                f"Spilled {len(logs)} logs to disk ({len(self.spill)} buffered)"
+            )
+            return True
+        return False
+
+    def _pause(self):
+        """할당된 파티션 전체 pause (리밸런스로 새로 받은 파티션 포함)"""
+        assignment = self.consumer.assignment()
+        if assignment:
+            self.consumer.pause(*assignment)
+        if not self.paused:
+            logger.warning("Paused consumption")
+            self._paused_at = time.monotonic()
+        self.paused = True
+        PAUSED_PARTITIONS.set(len(assignment))
+
+    def _resume(self):
+        """pause 해제"""
+        paused = self.consumer.paused()
+        if paused:
+            self.consumer.resume(*paused)
+        if self.paused:
+            PAUSED_SECONDS.labels(reason="mongodb").inc(time.monotonic() - self._paused_at)
+        self.paused = False
+        PAUSED_PARTITIONS.set(0)
+        logger.info("Resumed consumption")
+
+    def _pause_and_rewind(self, logs: list[LogEntry], messages: list):
+        """
+        저장하지 못한 로그와 아직 처리하지 않은 레코드의 첫 offset으로 되감고 pause
+
+        자동 commit 은 되감은 position 을 commit 하므로 해당 레코드는 유실되지 않는다.
+        """
+        offsets = self._first_offsets(logs, messages)
+
+        assignment = self.consumer.assignment()
+        for tp, offset in offsets.items():
+            if tp in assignment:
+                self.consumer.seek(tp, offset)
+
+        logger.warning(f"Rewound {len(offsets)} partitions to retry {len(logs)} unsaved logs")
+        self._pause()
+
+    @staticmethod
+    def _first_offsets(logs: list[LogEntry], messages: list) -> dict:
+        """파티션별 가장 작은 offset (로그의 Kafka 좌표 + 처리하지 않은 레코드)"""
+        offsets = {}
+        coordinates = [(log.kafka_topic, log.kafka_partition, log.kafka_offset) for log in logs]
+        coordinates += [(m.topic, m.partition, m.offset) for m in messages]
+
+        for topic, partition, offset in coordinates:
+            if topic is None or partition is None or offset is None:
+                continue
+            tp = TopicPartition(topic, partition)
+            offsets[tp] = min(offsets.get(tp, offset), offset)
+        return offsets
+
+    def _recover(self):
+        """
+        장애 복구 처리 (poll 루프마다 호출)
+
+        1. 브레이커가 열려 있으면 지수 백오프 간격으로 MongoDB ping
+        2. 저장 가능해지면 파티션을 pause 한 채 스필을 세그먼트 단위로 최대 속도로 drain
+        3. 스필이 비면 파티션 resume
+        """
+        if self.breaker.probe_due():
+            self.breaker.record_probe(self.mongodb_handler.ping())
+
+        if not self.breaker.allow_request():
+            if self.paused:
+                self._pause()
+            return
+
+        if self.spill is not None and len(self.spill) > 0:
+            self._pause()
+            self._drain_spill()
+            return
+
+        if self.paused:
+            self._resume()
+
+    def _drain_spill(self):
+        """가장 오래된 스필 세그먼트를 저장 (중간에 실패하면 세그먼트 유지)"""
+        logs, sizes = self.spill.peek_segment()
+        if not logs:
+            self.spill.pop_segment()
+            return
+
+        for chunk in self._byte_chunks(logs, sizes, self.drain_batch_size):
+            if self._store(chunk):
+                logger.warning("MongoDB unavailable while draining spill")
+                return
+
+        self.spill.pop_segment()
+        logger.info(f"Drained {len(logs)} spilled logs ({len(self.spill)} remaining)")
+
+    def _flush_rollup(self, stored: list[LogEntry]):
+        """새로 저장된 로그를 롤업에 반영하고 $inc upsert로 flush"""
+        if self.rollup is None:
+            return
+
+        self.rollup.add_batch(stored)
+
+        level_counts, error_counts = self.rollup.drain()
+        failed_levels, failed_errors = self.mongodb_handler.upsert_rollups(level_counts, error_counts)
+        if failed_levels or failed_errors:
+            # 반영되지 않은 카운터만 다음 배치에서 다시 시도
+            self.rollup.merge(failed_levels, failed_errors)
+
+    def _observe_latency(self, batch: list[LogEntry]):
+        """저장 완료 시점 기준 end-to-end 지연 기록"""
+        now = datetime.now(timezone.utc)
+        now_ms = now.timestamp() * 1000
+
+        for log in batch:
+            timestamp = log.timestamp
+            # producer는 naive UTC 타임스탬프를 보낸다
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=timezone.utc)
+
+            INGEST_LATENCY.labels(service=log.service).observe(
+                max((now - timestamp).total_seconds(), 0)
+            )
+
+            if log.kafka_timestamp is not None and log.kafka_timestamp >= 0:
+                KAFKA_TO_WRITE_LATENCY.labels(lane=self.lane).observe(
+                    max((now_ms - log.kafka_timestamp) / 1000, 0)
+                )
+
+    def _maybe_refresh_lag(self):
+        """lag_refresh_interval 마다 파티션 lag 갱신"""
+        now = time.monotonic()
+        if now - self._last_lag_refresh < self.lag_refresh_interval:
+            return
+        self._last_lag_refresh = now
+
+        try:
+            self._refresh_lag()
+        except Exception as e:
+            logger.warning(f"Failed to refresh consumer lag: {e}")
+
+    def _refresh_lag(self):
+        """파티션별 lag (end offset - position) 계산"""
+        assignment = self.consumer.assignment()
+        end_offsets = self.consumer.end_offsets(list(assignment)) if assignment else {}
+
+        snapshot: LagSnapshot = {}
+        for tp in assignment:
+            position = self.consumer.position(tp)
+            lag = max(end_offsets.get(tp, position) - position, 0)
+            snapshot[(tp.topic, tp.partition)] = lag
+            CONSUMER_LAG.labels(topic=tp.topic, partition=str(tp.partition)).set(lag)
+
+        # 리밸런스로 빠진 파티션의 gauge 제거
+        for topic, partition in self.partition_lag.keys() - snapshot.keys():
+            CONSUMER_LAG.remove(topic, str(partition))
+
+        self.partition_lag = snapshot
 
     def _print_stats(self):
         """통계 출력"""
@@ -189,6 +732,9 @@ class LogConsumer:
 
     def close(self):
         """Consumer 종료"""
+        if self.duplicate_filter is not None:
+            self.duplicate_filter.save()
+
         if self.consumer:
             self.consumer.close()
             logger.info("Kafka Consumer closed")
@@ -0,0 +1,173 @@
+"""
+Compact 문서 스키마 인코더
+
+짧은 필드 이름과 사전(dictionary) 코드로 로그 문서 크기를 줄인다.
+
+    {"_id", "t": timestamp, "s": service 코드, "l": level 코드, "m": 메시지 템플릿 ID, "md": metadata}
+
+- service/level 문자열은 log_dictionary 컬렉션의 작은 정수 코드로 저장
+- 메시지는 log_templates 컬렉션에 한 번만 저장하고 해시 기반 int64 ID로 참조
+- created_at 은 저장하지 않는다 (_id/timestamp로 충분)
+"""
+import hashlib
+import logging
+from typing import Dict, List, Optional, Set
+
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.models.log import LogEntry
+
+logger = logging.getLogger(__name__)
+
+DICTIONARY_COLLECTION = "log_dictionary"
+TEMPLATES_COLLECTION = "log_templates"
+
+# level 코드는 고정 (새 레벨은 5부터 할당)
+DEFAULT_LEVEL_CODES = {"DEBUG": 0, "INFO": 1, "WARNING": 2, "ERROR": 3, "CRITICAL": 4}
+
+# 표준 필드 이름 -> compact 필드 이름
+COMPACT_FIELDS = {
+    "timestamp": "t",
+    "service": "s",
+    "level": "l",
+    "message": "m",
+    "metadata": "md",
+}
+
+
+def template_id(message: str) -> int:
+    """메시지 템플릿 ID (sha1 앞 8바이트, signed int64)"""
+    digest = hashlib.sha1(message.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+class CompactCodec:
+    """log_dictionary / log_templates 기반 compact 인코더 (프로세스 내 캐시)"""
+
+    def __init__(self, db):
+        self.dictionary = db[DICTIONARY_COLLECTION]
+        self.templates = db[TEMPLATES_COLLECTION]
+
+        # kind -> {value: code}
+        self.codes: Dict[str, Dict[str, int]] = {"service": {}, "level": {}}
+        # code -> value (디코딩용)
+        self.values: Dict[str, Dict[int, str]] = {"service": {}, "level": {}}
+        self.known_templates: Set[int] = set()
+        self.template_messages: Dict[int, str] = {}
+
+        self._seed_levels()
+        self._load_dictionary()
+
+    def _seed_levels(self):
+        """고정 level 코드 등록"""
+        operations = [
+            UpdateOne(
+                {"_id": f"level:{level}"},
+                {"$setOnInsert": {"kind": "level", "value": level, "code": code}},
+                upsert=True,
+            )
+            for level, code in DEFAULT_LEVEL_CODES.items()
+        ]
+        self.dictionary.bulk_write(operations, ordered=False)
+        self.dictionary.update_one(
+            {"_id": "counter:level"},
+            {"$max": {"seq": max(DEFAULT_LEVEL_CODES.values())}},
+            upsert=True,
+        )
+
+    def _load_dictionary(self):
+        """저장된 코드 전체 로드"""
+        for doc in self.dictionary.find({"kind": {"$in": list(self.codes)}}):
+            self._remember(doc["kind"], doc["value"], doc["code"])
+
+    def _remember(self, kind: str, value: str, code: int):
+        self.codes[kind][value] = code
+        self.values[kind][code] = value
+
+    def code_for(self, kind: str, value: str) -> int:
+        """값의 코드 조회 (없으면 할당)"""
+        code = self.codes[kind].get(value)
+        if code is not None:
+            return code
+
+        # 카운터로 다음 코드 할당 후 등록 (동시 할당 경쟁 시 먼저 등록된 코드 사용)
+        counter = self.dictionary.find_one_and_update(
+            {"_id": f"counter:{kind}"},
+            {"$inc": {"seq": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        code = counter["seq"]
+
+        try:
+            self.dictionary.insert_one(
+                {"_id": f"{kind}:{value}", "kind": kind, "value": value, "code": code}
+            )
+        except DuplicateKeyError:
+            code = self.dictionary.find_one({"_id": f"{kind}:{value}"})["code"]
+
+        logger.info(f"Dictionary code assigned - {kind}: {value} -> {code}")
+        self._remember(kind, value, code)
+        return code
+
+    def lookup(self, kind: str, value: str) -> Optional[int]:
+        """코드 조회 (할당하지 않음)"""
+        return self.codes[kind].get(value)
+
+    def register_templates(self, messages: List[str]):
+        """처음 보는 메시지 템플릿을 log_templates 에 upsert"""
+        new_ids = []
+        operations = []
+        for message in set(messages):
+            tid = template_id(message)
+            if tid in self.known_templates:
+                continue
+            new_ids.append(tid)
+            operations.append(
+                UpdateOne({"_id": tid}, {"$setOnInsert": {"message": message}}, upsert=True)
+            )
+
+        if operations:
+            self.templates.bulk_write(operations, ordered=False)
+            self.known_templates.update(new_ids)
+
+    def encode(self, log: LogEntry) -> dict:
+        """LogEntry -> compact 문서 (템플릿은 register_templates 로 미리 등록)"""
+        return {
+            "_id": log.document_id(),
+            "t": log.timestamp,
+            "s": self.code_for("service", log.service),
+            "l": self.code_for("level", log.level),
+            "m": template_id(log.message),
+            "md": log.metadata,
+        }
+
+    def encode_batch(self, logs: List[LogEntry]) -> List[dict]:
+        """배치 인코딩 (템플릿 등록 포함)"""
+        self.register_templates([log.message for log in logs])
+        return [self.encode(log) for log in logs]
+
+    def value_for(self, kind: str, code: int, default: str) -> str:
+        """코드 -> 값 (다른 Consumer가 할당한 코드면 사전을 다시 로드)"""
+        if code not in self.values[kind]:
+            self._load_dictionary()
+        return self.values[kind].get(code, default)
+
+    def decode(self, doc: dict) -> dict:
+        """compact 문서 -> 표준 문서"""
+        tid = doc.get("m")
+        message = self.template_messages.get(tid)
+        if message is None and tid is not None:
+            template = self.templates.find_one({"_id": tid})
+            message = template["message"] if template else ""
+            self.template_messages[tid] = message
+
+        return {
+            "_id": doc["_id"],
+            "timestamp": doc.get("t"),
+            "service": self.value_for("service", doc.get("s"), "unknown"),
+            "level": self.value_for("level", doc.get("l"), "UNKNOWN"),
+            "message": message,
+            "metadata": doc.get("md", {}),
+        }
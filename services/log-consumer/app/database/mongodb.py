@@ -2,28 +2,124 @@
 MongoDB 연결 및 데이터 저장
 """
 import logging
-from typing import List, Optional
-from pymongo import MongoClient, ASCENDING, DESCENDING
-from pymongo.errors import ConnectionFailure, BulkWriteError
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+from pymongo import MongoClient, ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import (
+    AutoReconnect,
+    BulkWriteError,
+    ConnectionFailure,
+    DuplicateKeyError,
+    ExecutionTimeout,
+    NetworkTimeout,
+    OperationFailure,
+)
 from app.models.log import LogEntry
+from app.database.compact import COMPACT_FIELDS, CompactCodec
+from app.database.routing import (
+    DEFAULT_COLLECTION,
+    PARTITION_DAILY,
+    PARTITION_MODES,
+    PARTITION_NONE,
+    ROUTING_SERVICE,
+    CollectionRouter,
+    partition_collection,
+    partition_day,
+)
+from app.rollup import ErrorKey, LevelKey, message_key
 
 logger = logging.getLogger(__name__)
 
+DUPLICATE_KEY_ERROR = 11000
+
+# 재시도하면 성공할 수 있는 writeErrors 코드
+# (MaxTimeMSExpired, InterruptedAtShutdown, PrimarySteppedDown, NotWritablePrimary 등)
+RETRYABLE_WRITE_ERROR_CODES = {6, 7, 50, 89, 91, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436}
+
+# 요청 전체가 실패했지만 재시도 가능한 예외
+TRANSIENT_ERRORS = (AutoReconnect, ConnectionFailure, NetworkTimeout, ExecutionTimeout)
+
+# logs 컬렉션 저장 모드
+STORAGE_STANDARD = "standard"
+STORAGE_TIMESERIES = "timeseries"
+STORAGE_COMPACT = "compact"
+STORAGE_MODES = (STORAGE_STANDARD, STORAGE_TIMESERIES, STORAGE_COMPACT)
+
+TIMESERIES_OPTIONS = {
+    "timeField": "timestamp",
+    "metaField": "meta",
+    "granularity": "seconds",
+}
+
+
+class BatchInsertResult(NamedTuple):
+    """배치 저장 결과"""
+    success_count: int  # 신규 저장 + 이미 저장되어 있던 문서
+    failure_count: int
+    duplicate_ids: Set[str]  # 이미 저장되어 있던 문서 _id
+    failed_ids: Set[str]  # 재시도해도 저장할 수 없는 문서 _id
+    # 일시적 에러로 재시도를 모두 소진한 문서 _id (MongoDB 장애, 나중에 다시 저장 가능)
+    unavailable_ids: FrozenSet[str] = frozenset()
+
 
 class MongoDBHandler:
     """MongoDB 핸들러"""
     
-    def __init__(self, connection_string: str, database_name: str = "logs"):
+    def __init__(
+        self,
+        connection_string: str,
+        database_name: str = "logs",
+        max_retries: int = 5,
+        retry_backoff: float = 0.5,
+        max_retry_backoff: float = 10.0,
+        storage_mode: str = STORAGE_STANDARD,
+        logs_collection_name: str = "logs",
+        router: Optional[CollectionRouter] = None,
+        partitioning: str = PARTITION_NONE,
+        partition_prepare_interval: float = 300.0
+    ):
         """
         Args:
             connection_string: MongoDB 연결 문자열
             database_name: 데이터베이스 이름
+            max_retries: 배치 저장 재시도 횟수
+            retry_backoff: 재시도 초기 대기 시간 (초, 지수 증가)
+            max_retry_backoff: 재시도 최대 대기 시간 (초)
+            storage_mode: logs 컬렉션 저장 모드 (standard | timeseries | compact)
+                timeseries 모드에서는 _id 유니크 인덱스가 없으므로
+                재시도 시 중복 저장을 막지 못한다.
+            logs_collection_name: 로그를 저장할 컬렉션 이름 (백필 대상 컬렉션 등)
+            router: 서비스별 컬렉션 라우팅 (None이면 모두 logs_collection_name)
+            partitioning: 일자 파티션 (none | daily, daily 면 <컬렉션>_YYYYMMDD 에 저장)
+            partition_prepare_interval: 오늘/내일 파티션을 미리 만드는 주기 (초)
         """
+        if storage_mode not in STORAGE_MODES:
+            raise ValueError(f"Invalid storage mode: {storage_mode}")
+        if partitioning not in PARTITION_MODES:
+            raise ValueError(f"Invalid partitioning: {partitioning}")
+        
         self.connection_string = connection_string
         self.database_name = database_name
+        self.storage_mode = storage_mode
+        self.logs_collection_name = logs_collection_name
+        self.router = router or CollectionRouter()
+        self.partitioning = partitioning
+        self.partition_prepare_interval = partition_prepare_interval
+        self._partitions_prepared_at = 0.0
+        # 인덱스까지 준비된 로그 컬렉션
+        self._ready_collections: Dict[str, object] = {}
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
         self.client: Optional[MongoClient] = None
         self.db = None
         self.logs_collection = None
+        self.rollup_collection = None
+        self.overflow_collection = None
+        self.blobs_collection = None
+        self.codec: Optional[CompactCodec] = None
         
         self._connect()
     
@@ -41,10 +137,15 @@ class MongoDBHandler:
             self.client.admin.command('ping')
             
             self.db = self.client[self.database_name]
-            self.logs_collection = self.db["logs"]
+            self.rollup_collection = self.db["logs_rollup_minute"]
+            self.overflow_collection = self.db["logs_overflow"]
+            self.blobs_collection = self.db["blobs"]
+            if self.storage_mode == STORAGE_COMPACT:
+                self.codec = CompactCodec(self.db)
             
             # 인덱스 생성
             self._create_indexes()
+            self.logs_collection = self._collection(self.logs_collection_name)
             
             logger.info(f"MongoDB connected: {self.database_name}")
             
@@ -52,27 +153,146 @@ class MongoDBHandler:
             logger.error(f"Failed to connect to MongoDB: {e}")
             raise
     
-    def _create_indexes(self):
-        """인덱스 생성"""
+    def _collection(self, name: str, single_service: bool = False):
+        """로그 컬렉션 (처음 사용할 때 time-series 생성 / 인덱스 생성)"""
+        collection = self._ready_collections.get(name)
+        if collection is not None:
+            return collection
+        
+        if self.storage_mode == STORAGE_TIMESERIES:
+            self._ensure_timeseries_collection(name)
+        collection = self.db[name]
+        self._create_log_indexes(collection, single_service)
+        
+        self._ready_collections[name] = collection
+        return collection
+    
+    def _base_collection(self, service: str) -> str:
+        """서비스의 로그를 저장할 컬렉션 (파티션 적용 전)"""
+        name = self.router.collection_for(service)
+        return self.logs_collection_name if name == DEFAULT_COLLECTION else name
+    
+    def _is_single_service(self, base: str) -> bool:
+        # 서비스 전용 컬렉션에는 service 로 시작하는 인덱스가 필요 없다
+        return self.router.mode == ROUTING_SERVICE and base != self.logs_collection_name
+    
+    def _collection_name(self, service: str, timestamp: Optional[datetime] = None) -> str:
+        """로그를 저장할 컬렉션 이름 (daily 파티션이면 로그 일자의 파티션)"""
+        base = self._base_collection(service)
+        if self.partitioning != PARTITION_DAILY:
+            return base
+        return partition_collection(base, partition_day(timestamp or datetime.utcnow()))
+    
+    def _collection_for(self, service: str, timestamp: Optional[datetime] = None):
+        """서비스의 로그를 저장할 컬렉션 (timestamp 가 없으면 오늘 파티션)"""
+        base = self._base_collection(service)
+        return self._collection(
+            self._collection_name(service, timestamp), self._is_single_service(base)
+        )
+    
+    def maybe_prepare_partitions(self):
+        """partition_prepare_interval 마다 오늘/내일 파티션 생성"""
+        if self.partitioning != PARTITION_DAILY:
+            return
+        now = time.monotonic()
+        if now - self._partitions_prepared_at < self.partition_prepare_interval:
+            return
+        self._partitions_prepared_at = now
+        
         try:
-            # 타임스탬프 인덱스 (내림차순 - 최신 로그 빠른 조회)
-            self.logs_collection.create_index(
-                [("timestamp", DESCENDING)]
-            )
-            
-            # 서비스별 타임스탬프 인덱스
-            self.logs_collection.create_index(
-                [("service", ASCENDING), ("timestamp", DESCENDING)]
+            self.prepare_partitions()
+        except Exception as e:
+            logger.warning(f"Failed to prepare log partitions: {e}")
+    
+    def prepare_partitions(self, now: Optional[datetime] = None):
+        """
+        오늘/내일 파티션을 인덱스와 함께 미리 생성
+        
+        자정 직후 첫 배치가 컬렉션/인덱스 생성을 기다리지 않게 하고,
+        Aggregator 가 파티션 목록을 조회할 때 새 일자 파티션이 이미 보이도록 한다.
+        어제 이전 파티션은 준비 목록에서 빼서, 보존 기간으로 drop 된 뒤 늦은 로그가 오면
+        (time-series 생성과 인덱스를 포함해) 다시 준비하게 한다.
+        """
+        today = (now or datetime.utcnow()).date()
+        days = [today, today + timedelta(days=1)]
+        
+        bases = set()
+        for name in self.router.known_collections():
+            bases.add(self.logs_collection_name if name == DEFAULT_COLLECTION else name)
+        
+        keep = set()
+        for base in bases:
+            for day in [today - timedelta(days=1)] + days:
+                keep.add(partition_collection(base, day))
+            for day in days:
+                self._collection(partition_collection(base, day), self._is_single_service(base))
+        
+        for name in list(self._ready_collections):
+            if name not in keep and name not in bases:
+                del self._ready_collections[name]
+    
+    def _ensure_timeseries_collection(self, name: str):
+        """로그 컬렉션을 time-series 컬렉션으로 생성 (없을 때만)"""
+        existing = {
+            info["name"]: info
+            for info in self.db.list_collections(filter={"name": name})
+        }
+        
+        if name not in existing:
+            self.db.create_collection(name, timeseries=TIMESERIES_OPTIONS)
+            logger.info(f"Created time-series collection: {name}")
+        elif existing[name].get("type") != "timeseries":
+            raise RuntimeError(
+                f"Collection '{name}' already exists as a regular collection. "
+                "Run 'python -m app.migrate_timeseries' before enabling timeseries mode."
             )
-            
-            # 로그 레벨별 타임스탬프 인덱스
-            self.logs_collection.create_index(
-                [("level", ASCENDING), ("timestamp", DESCENDING)]
+    
+    def _field(self, name: str) -> str:
+        """
+        저장 모드에 따른 실제 필드 경로
+        (time-series: service/level은 meta 하위, compact: 짧은 필드 이름)
+        """
+        if self.storage_mode == STORAGE_TIMESERIES and name in ("service", "level"):
+            return f"meta.{name}"
+        if self.storage_mode == STORAGE_COMPACT:
+            return COMPACT_FIELDS.get(name, name)
+        return name
+    
+    def _value(self, name: str, value: str):
+        """조회 조건 값 변환 (compact 모드는 service/level을 사전 코드로)"""
+        if self.codec and name in ("service", "level"):
+            code = self.codec.lookup(name, value)
+            return code if code is not None else -1
+        return value
+    
+    def _decode(self, doc: dict) -> dict:
+        """저장된 문서를 표준 형태로 변환"""
+        if self.codec:
+            doc = self.codec.decode(doc)
+        doc['_id'] = str(doc['_id'])
+        return doc
+    
+    def _encode(self, log_entry: LogEntry) -> dict:
+        """저장 모드에 맞는 MongoDB 문서로 변환"""
+        return self._encode_batch([log_entry])[0]
+    
+    def _encode_batch(self, log_entries: List[LogEntry]) -> List[dict]:
+        """저장 모드에 맞는 MongoDB 문서 리스트로 변환"""
+        if self.storage_mode == STORAGE_TIMESERIES:
+            return [log.to_timeseries_dict() for log in log_entries]
+        if self.storage_mode == STORAGE_COMPACT:
+            return self.codec.encode_batch(log_entries)
+        return [log.to_mongo_dict() for log in log_entries]
+    
+    def _create_indexes(self):
+        """롤업 인덱스 생성 (로그 컬렉션 인덱스는 _collection 에서 생성)"""
+        try:
+            # 분 단위 롤업 인덱스
+            self.rollup_collection.create_index(
+                [("kind", ASCENDING), ("minute", DESCENDING)]
             )
-            
-            # 복합 인덱스 (서비스 + 레벨)
-            self.logs_collection.create_index(
-                [("service", ASCENDING), ("level", ASCENDING)]
+            self.rollup_collection.create_index(
+                [("kind", ASCENDING), ("service", ASCENDING), ("minute", DESCENDING)]
             )
             
             logger.info("MongoDB indexes created successfully")
@@ -80,6 +300,61 @@ class MongoDBHandler:
         except Exception as e:
             logger.error(f"Failed to create indexes: {e}")
     
+    def _create_log_indexes(self, collection, single_service: bool = False):
+        """로그 컬렉션 인덱스 생성"""
+        try:
+            if self.storage_mode == STORAGE_TIMESERIES:
+                # time-series 컬렉션은 timestamp 기준으로 버킷 정렬되므로 meta 인덱스만 생성
+                if not single_service:
+                    collection.create_index(
+                        [("meta.service", ASCENDING), ("timestamp", DESCENDING)]
+                    )
+                collection.create_index(
+                    [("meta.level", ASCENDING), ("timestamp", DESCENDING)]
+                )
+                # Aggregator 증분 집계 (created_at 워터마크 이후 문서)
+                collection.create_index([("created_at", ASCENDING)])
+            else:
+                self._create_regular_indexes(collection, single_service)
+            
+            logger.info(f"MongoDB indexes created successfully: {collection.name}")
+            
+        except Exception as e:
+            logger.error(f"Failed to create indexes for {collection.name}: {e}")
+    
+    def _create_regular_indexes(self, collection, single_service: bool = False):
+        """일반 컬렉션 인덱스 생성 (standard / compact)"""
+        timestamp, service, level = (
+            self._field("timestamp"), self._field("service"), self._field("level")
+        )
+        
+        # 타임스탬프 인덱스 (내림차순 - 최신 로그 빠른 조회)
+        collection.create_index(
+            [(timestamp, DESCENDING)]
+        )
+        
+        # 로그 레벨별 타임스탬프 인덱스
+        collection.create_index(
+            [(level, ASCENDING), (timestamp, DESCENDING)]
+        )
+        
+        # Aggregator 증분 집계 (created_at 워터마크 이후 문서, compact 는 created_at 없음)
+        if self.storage_mode == STORAGE_STANDARD:
+            collection.create_index([("created_at", ASCENDING)])
+        
+        if single_service:
+            return
+        
+        # 서비스별 타임스탬프 인덱스
+        collection.create_index(
+            [(service, ASCENDING), (timestamp, DESCENDING)]
+        )
+        
+        # 복합 인덱스 (서비스 + 레벨)
+        collection.create_index(
+            [(service, ASCENDING), (level, ASCENDING)]
+        )
+    
     def insert_log(self, log_entry: LogEntry) -> bool:
         """
         단일 로그 저장
@@ -91,50 +366,326 @@ class MongoDBHandler:
             성공 여부
         """
         try:
-            log_dict = log_entry.to_mongo_dict()
-            result = self.logs_collection.insert_one(log_dict)
+            log_dict = self._encode(log_entry)
+            result = self._collection_for(log_entry.service, log_entry.timestamp).insert_one(log_dict)
             
             logger.debug(f"Log inserted with id: {result.inserted_id}")
             return True
             
+        except DuplicateKeyError:
+            # 결정적 _id 이므로 이미 저장된 로그
+            return True
+            
         except Exception as e:
             logger.error(f"Failed to insert log: {e}")
             return False
     
-    def insert_logs_batch(self, log_entries: List[LogEntry]) -> tuple[int, int]:
+    def upsert_blobs(self, blobs: Dict[str, Tuple[str, str]]) -> bool:
+        """
+        content-addressed blob 저장 (이미 있으면 그대로 둔다)
+        
+        Args:
+            blobs: {sha256: (metadata 필드 이름, 값)}
+            
+        Returns:
+            성공 여부
+        """
+        if not blobs:
+            return True
+        
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"_id": digest},
+                {
+                    "$setOnInsert": {
+                        "field": field,
+                        "value": value,
+                        "size": len(value),
+                        "first_seen": now
+                    }
+                },
+                upsert=True
+            )
+            for digest, (field, value) in blobs.items()
+        ]
+        
+        try:
+            self.blobs_collection.bulk_write(operations, ordered=False)
+            return True
+        except BulkWriteError as e:
+            # 동시 upsert 경합으로 인한 중복 키는 이미 저장된 것
+            errors = [
+                error for error in e.details.get('writeErrors', [])
+                if error.get('code') != DUPLICATE_KEY_ERROR
+            ]
+            if errors:
+                logger.error(f"Failed to upsert {len(errors)} blobs: {errors[0].get('errmsg')}")
+                return False
+            return True
+        except Exception as e:
+            logger.error(f"Failed to upsert blobs: {e}")
+            return False
+    
+    def store_overflow(self, log_id: str, payload: dict) -> bool:
+        """
+        잘려서 저장되는 큰 로그의 원본을 logs_overflow 에 보관
+        
+        Args:
+            log_id: logs 문서 _id
+            payload: 원본 Kafka 메시지 값
+        """
+        try:
+            self.overflow_collection.insert_one({
+                "_id": log_id,
+                "payload": payload,
+                "created_at": datetime.utcnow()
+            })
+            return True
+        except DuplicateKeyError:
+            return True
+        except Exception as e:
+            logger.error(f"Failed to store overflow payload for {log_id}: {e}")
+            return False
+    
+    def insert_logs_batch(
+        self,
+        log_entries: List[LogEntry],
+        max_retries: Optional[int] = None
+    ) -> BatchInsertResult:
         """
         배치로 로그 저장 (성능 최적화)
         
+        문서 _id가 결정적이므로 중복 키 에러는 이미 저장된 것으로 보고 성공 처리한다.
+        일시적인 에러로 실패한 문서만 지수 백오프로 재전송한다.
+        
         Args:
             log_entries: 저장할 로그 엔트리 리스트
+            max_retries: 재시도 횟수 (None이면 핸들러 설정값)
             
         Returns:
-            (성공 개수, 실패 개수)
+            BatchInsertResult
         """
         if not log_entries:
-            return 0, 0
+            return BatchInsertResult(0, 0, set(), set())
         
-        try:
-            log_dicts = [log.to_mongo_dict() for log in log_entries]
-            result = self.logs_collection.insert_many(log_dicts, ordered=False)
-            
-            success_count = len(result.inserted_ids)
-            failure_count = len(log_entries) - success_count
+        max_retries = self.max_retries if max_retries is None else max_retries
+        
+        # 라우팅/파티션이 켜져 있으면 서비스별/일자별 컬렉션으로 나눠 저장
+        groups: Dict[str, List[LogEntry]] = {}
+        for log in log_entries:
+            groups.setdefault(self._collection_name(log.service, log.timestamp), []).append(log)
+        
+        inserted_count = 0
+        duplicate_ids: Set[str] = set()
+        failed_ids: Set[str] = set()
+        unavailable_ids: Set[str] = set()
+        
+        for logs in groups.values():
+            try:
+                collection = self._collection_for(logs[0].service, logs[0].timestamp)
+                pending = self._encode_batch(logs)
+            except TRANSIENT_ERRORS as e:
+                # compact 모드 사전/템플릿 등록 실패
+                logger.warning(f"Transient error while encoding batch: {e}")
+                unavailable_ids.update(log.document_id() for log in logs)
+                continue
+            
+            inserted, duplicates, failed, unavailable = self._insert_documents(
+                collection, pending, max_retries
+            )
+            inserted_count += inserted
+            duplicate_ids |= duplicates
+            failed_ids |= failed
+            unavailable_ids |= unavailable
+        
+        success_count = inserted_count + len(duplicate_ids)
+        failure_count = len(failed_ids)
+        
+        if failure_count > 0 or unavailable_ids:
+            logger.warning(
+                f"Partial batch insert: {success_count} succeeded, {failure_count} failed, "
+                f"{len(unavailable_ids)} unavailable"
+            )
+        else:
+            logger.info(
+                f"Batch insert: {inserted_count} inserted, "
+                f"{len(duplicate_ids)} already stored"
+                + (f" ({len(groups)} collections)" if len(groups) > 1 else "")
+            )
+        
+        return BatchInsertResult(
+            success_count, failure_count, duplicate_ids, failed_ids, frozenset(unavailable_ids)
+        )
+    
+    def _insert_documents(
+        self,
+        collection,
+        pending: List[dict],
+        max_retries: int
+    ) -> Tuple[int, Set[str], Set[str], Set[str]]:
+        """
+        한 컬렉션에 문서 배치 저장 (일시적 에러로 실패한 문서만 재전송)
+        
+        Returns:
+            (신규 저장 수, 이미 있던 _id, 저장 불가 _id, 재시도 소진 _id)
+        """
+        duplicate_ids: Set[str] = set()
+        failed_ids: Set[str] = set()
+        unavailable_ids: Set[str] = set()
+        # 일시적 에러 후 재전송한 문서 (이전 시도에서 이미 저장됐을 수 있음)
+        uncertain_ids: Set[str] = set()
+        inserted_count = 0
+        attempt = 0
+        
+        while pending:
+            retry: List[dict] = []
+            
+            try:
+                result = collection.insert_many(pending, ordered=False)
+                inserted_count += len(result.inserted_ids)
+                
+            except BulkWriteError as e:
+                # 일부 성공, 일부 실패
+                inserted_count += e.details.get('nInserted', 0)
+                
+                for error in e.details.get('writeErrors', []):
+                    doc = pending[error['index']]
+                    if error.get('code') == DUPLICATE_KEY_ERROR:
+                        if doc['_id'] in uncertain_ids:
+                            # 이번 배치의 이전 시도에서 저장된 문서
+                            inserted_count += 1
+                        else:
+                            duplicate_ids.add(doc['_id'])
+                    elif error.get('code') in RETRYABLE_WRITE_ERROR_CODES:
+                        retry.append(doc)
+                    else:
+                        logger.error(f"Non-retryable write error for {doc['_id']}: {error.get('errmsg')}")
+                        failed_ids.add(doc['_id'])
+                
+            except TRANSIENT_ERRORS as e:
+                # 어디까지 저장됐는지 알 수 없으므로 전체 재전송 (중복은 성공 처리됨)
+                logger.warning(f"Transient error during batch insert: {e}")
+                retry = pending
+                uncertain_ids.update(doc['_id'] for doc in pending)
+                
+            except OperationFailure as e:
+                if e.has_error_label("RetryableWriteError"):
+                    logger.warning(f"Retryable error during batch insert: {e}")
+                    retry = pending
+                    uncertain_ids.update(doc['_id'] for doc in pending)
+                else:
+                    logger.error(f"Failed to insert batch: {e}")
+                    failed_ids.update(doc['_id'] for doc in pending)
+                
+            except Exception as e:
+                logger.error(f"Failed to insert batch: {e}")
+                failed_ids.update(doc['_id'] for doc in pending)
+            
+            pending = retry
+            if not pending:
+                break
+            
+            attempt += 1
+            if attempt > max_retries:
+                logger.error(f"Giving up on {len(pending)} logs after {max_retries} retries")
+                unavailable_ids.update(doc['_id'] for doc in pending)
+                break
+            
+            # 지수 백오프 + jitter
+            delay = min(self.retry_backoff * (2 ** (attempt - 1)), self.max_retry_backoff)
+            delay *= random.uniform(0.5, 1.0)
+            logger.warning(
+                f"Retrying {len(pending)} logs in {delay:.2f}s "
+                f"(attempt {attempt}/{max_retries})"
+            )
+            time.sleep(delay)
+        
+        return inserted_count, duplicate_ids, failed_ids, unavailable_ids
+    
+    def upsert_rollups(
+        self,
+        level_counts: Dict[LevelKey, int],
+        error_counts: Dict[ErrorKey, list]
+    ) -> Tuple[Dict[LevelKey, int], Dict[ErrorKey, list]]:
+        """
+        분 단위 롤업 카운터를 $inc upsert로 반영
+        
+        ordered=False 라 일부 연산이 실패해도 나머지 $inc 는 반영된다. 반영된 카운터를
+        다시 합치면 두 번 더해지므로, 실패한 연산의 카운터만 돌려준다.
+        
+        Args:
+            level_counts: (service, level, minute) -> count
+            error_counts: (service, level, minute, message) -> [count, last_occurred]
             
-            logger.info(f"Batch insert: {success_count} succeeded, {failure_count} failed")
-            return success_count, failure_count
+        Returns:
+            반영하지 못한 (level_counts, error_counts) (모두 반영되면 빈 dict, 호출자가 다시 합쳐야 함)
+        """
+        operations = []
+        keys = []  # operations 와 같은 순서의 (종류, 카운터 키)
+        
+        for (service, level, minute), count in level_counts.items():
+            keys.append(("level", (service, level, minute)))
+            operations.append(UpdateOne(
+                {"_id": f"{minute.isoformat()}|{service}|{level}"},
+                {
+                    "$inc": {"count": count},
+                    "$setOnInsert": {
+                        "kind": "level",
+                        "service": service,
+                        "level": level,
+                        "minute": minute
+                    }
+                },
+                upsert=True
+            ))
+        
+        for (service, level, minute, message), (count, last_occurred) in error_counts.items():
+            keys.append(("error", (service, level, minute, message)))
+            operations.append(UpdateOne(
+                {"_id": f"{minute.isoformat()}|{service}|{level}|{message_key(message)}"},
+                {
+                    "$inc": {"count": count},
+                    "$max": {"last_occurred": last_occurred},
+                    "$setOnInsert": {
+                        "kind": "error",
+                        "service": service,
+                        "level": level,
+                        "minute": minute,
+                        "message": message
+                    }
+                },
+                upsert=True
+            ))
+        
+        if not operations:
+            return {}, {}
+        
+        try:
+            self.rollup_collection.bulk_write(operations, ordered=False)
+            logger.debug(f"Rollup upsert: {len(operations)} documents")
+            return {}, {}
             
         except BulkWriteError as e:
-            # 일부 성공, 일부 실패
-            success_count = e.details.get('nInserted', 0)
-            failure_count = len(log_entries) - success_count
-            
-            logger.warning(f"Partial batch insert: {success_count} succeeded, {failure_count} failed")
-            return success_count, failure_count
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            logger.error(
+                f"Failed to upsert {len(failed)}/{len(operations)} rollup documents: "
+                f"{e.details.get('writeErrors', [])[:1]}"
+            )
+            failed_levels: Dict[LevelKey, int] = {}
+            failed_errors: Dict[ErrorKey, list] = {}
+            for index in failed:
+                kind, key = keys[index]
+                if kind == "level":
+                    failed_levels[key] = level_counts[key]
+                else:
+                    failed_errors[key] = error_counts[key]
+            return failed_levels, failed_errors
             
         except Exception as e:
-            logger.error(f"Failed to insert batch: {e}")
-            return 0, len(log_entries)
+            # 요청이 전달되기 전 실패 (연결/서버 선택 등) -> 반영된 연산이 없다고 보고 전부 돌려준다
+            logger.error(f"Failed to upsert rollups: {e}")
+            return level_counts, error_counts
     
     def get_logs(self, limit: int = 100, skip: int = 0) -> List[dict]:
         """
@@ -151,16 +702,13 @@ class MongoDBHandler:
             logs = list(
                 self.logs_collection
                 .find()
-                .sort("timestamp", DESCENDING)
+                .sort(self._field("timestamp"), DESCENDING)
                 .skip(skip)
                 .limit(limit)
             )
             
             # ObjectId를 문자열로 변환
-            for log in logs:
-                log['_id'] = str(log['_id'])
-            
-            return logs
+            return [self._decode(log) for log in logs]
             
         except Exception as e:
             logger.error(f"Failed to get logs: {e}")
@@ -170,16 +718,13 @@ class MongoDBHandler:
         """서비스별 로그 조회"""
         try:
             logs = list(
-                self.logs_collection
-                .find({"service": service})
-                .sort("timestamp", DESCENDING)
+                self._collection_for(service)
+                .find({self._field("service"): self._value("service", service)})
+                .sort(self._field("timestamp"), DESCENDING)
                 .limit(limit)
             )
             
-            for log in logs:
-                log['_id'] = str(log['_id'])
-            
-            return logs
+            return [self._decode(log) for log in logs]
             
         except Exception as e:
             logger.error(f"Failed to get logs by service: {e}")
@@ -190,15 +735,12 @@ class MongoDBHandler:
         try:
             logs = list(
                 self.logs_collection
-                .find({"level": level})
-                .sort("timestamp", DESCENDING)
+                .find({self._field("level"): self._value("level", level)})
+                .sort(self._field("timestamp"), DESCENDING)
                 .limit(limit)
             )
             
-            for log in logs:
-                log['_id'] = str(log['_id'])
-            
-            return logs
+            return [self._decode(log) for log in logs]
             
         except Exception as e:
             logger.error(f"Failed to get logs by level: {e}")
@@ -219,8 +761,8 @@ class MongoDBHandler:
                 {
                     "$group": {
                         "_id": {
-                            "service": "$service",
-                            "level": "$level"
+                            "service": f"${self._field('service')}",
+                            "level": f"${self._field('level')}"
                         },
                         "count": {"$sum": 1}
                     }
@@ -229,6 +771,13 @@ class MongoDBHandler:
             
             result = list(self.logs_collection.aggregate(pipeline))
             
+            if self.codec:
+                for row in result:
+                    row["_id"] = {
+                        "service": self.codec.value_for("service", row["_id"]["service"], "unknown"),
+                        "level": self.codec.value_for("level", row["_id"]["level"], "UNKNOWN")
+                    }
+            
             stats = {
                 "total": self.get_log_count(),
                 "by_service_and_level": result
@@ -240,6 +789,15 @@ class MongoDBHandler:
             logger.error(f"Failed to get stats: {e}")
             return {"total": 0, "by_service_and_level": []}
     
+    def ping(self) -> bool:
+        """MongoDB 응답 여부 (서킷 브레이커 probe 용)"""
+        try:
+            self.client.admin.command('ping')
+            return True
+        except Exception as e:
+            logger.warning(f"MongoDB ping failed: {e}")
+            return False
+    
     def close(self):
         """연결 종료"""
         if self.client:
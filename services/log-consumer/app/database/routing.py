@@ -0,0 +1,100 @@
+"""
+서비스별 logs 컬렉션 라우팅
+
+서비스(또는 서비스 그룹)마다 별도 컬렉션에 저장해 인덱스 경합을 줄인다.
+Aggregator 의 routing.py 와 같은 규칙을 사용해야 한다.
+
+LOGS_ROUTING:
+    ""/"none"   모든 로그를 logs 에 저장 (기본값)
+    "service"   서비스마다 logs_svc_<서비스> (예: logs_svc_api_service)
+    "a=X,b=X"   서비스 -> 컬렉션 매핑 (나열하지 않은 서비스는 logs)
+
+LOGS_PARTITIONING:
+    ""/"none"   위 컬렉션에 그대로 저장 (기본값)
+    "daily"     로그 timestamp(UTC) 일자별로 <컬렉션>_YYYYMMDD (예: logs_20240101)
+                보존 기간이 지난 일자는 컬렉션 drop 으로 삭제한다
+"""
+
+import re
+from datetime import date, datetime, timezone
+from typing import Dict, Set
+
+DEFAULT_COLLECTION = "logs"
+SERVICE_COLLECTION_PREFIX = "logs_svc_"
+
+ROUTING_NONE = "none"
+ROUTING_SERVICE = "service"
+
+PARTITION_NONE = "none"
+PARTITION_DAILY = "daily"
+PARTITION_MODES = (PARTITION_NONE, PARTITION_DAILY)
+
+
+def service_collection(service: str) -> str:
+    """서비스 전용 컬렉션 이름 (영숫자 외 문자는 _)"""
+    return SERVICE_COLLECTION_PREFIX + re.sub(r"[^A-Za-z0-9]+", "_", service).strip("_").lower()
+
+
+def partition_day(timestamp: datetime) -> date:
+    """파티션 일자 (timezone 이 있으면 UTC 로 변환, 없으면 UTC 로 간주)"""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    return timestamp.date()
+
+
+def partition_collection(collection: str, day: date) -> str:
+    """일자 파티션 컬렉션 이름 (예: logs_20240101)"""
+    return f"{collection}_{day:%Y%m%d}"
+
+
+class CollectionRouter:
+    """서비스 이름 -> logs 컬렉션 이름"""
+
+    def __init__(self, spec: str = "", max_collections: int = 64):
+        """
+        Args:
+            spec: LOGS_ROUTING 값
+            max_collections: service 모드에서 만들 수 있는 컬렉션 수 상한
+                (잘못된 service 값으로 컬렉션이 계속 생기지 않도록, 넘으면 logs)
+        """
+        spec = (spec or "").strip()
+        self.mode = ROUTING_NONE
+        self.groups: Dict[str, str] = {}
+        self.max_collections = max_collections
+        # 만든 전용 컬렉션만 기억한다 (서비스 이름은 기억하지 않아 잘못된 값이 많아도 상한 이내)
+        self._collections: Set[str] = set()
+
+        if spec.lower() == ROUTING_SERVICE:
+            self.mode = ROUTING_SERVICE
+        elif spec and spec.lower() != ROUTING_NONE:
+            for entry in spec.split(","):
+                service, _, collection = entry.partition("=")
+                if not service.strip() or not collection.strip():
+                    raise ValueError(f"Invalid LOGS_ROUTING entry: {entry!r}")
+                self.groups[service.strip()] = collection.strip()
+            self.mode = "groups"
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != ROUTING_NONE
+
+    def collection_for(self, service: str) -> str:
+        """로그를 저장할 컬렉션"""
+        if self.mode == ROUTING_NONE:
+            return DEFAULT_COLLECTION
+        if self.mode != ROUTING_SERVICE:
+            return self.groups.get(service, DEFAULT_COLLECTION)
+
+        collection = service_collection(service)
+        if collection in self._collections:
+            return collection
+        # 상한은 서비스 수가 아니라 컬렉션 수 (넘친 서비스는 logs 로, 기억하지 않는다)
+        if collection == SERVICE_COLLECTION_PREFIX or len(self._collections) >= self.max_collections:
+            return DEFAULT_COLLECTION
+
+        self._collections.add(collection)
+        return collection
+
+    def known_collections(self) -> Set[str]:
+        """지금까지 라우팅한 (또는 설정된) 컬렉션 (파티션 미리 생성용)"""
+        return {DEFAULT_COLLECTION} | set(self.groups.values()) | self._collections
@@ -0,0 +1,269 @@
+"""
+재전달 레코드 중복 억제 (시간 윈도우 회전 Bloom filter)
+
+리밸런스/재시작 후 at-least-once 재전달로 다시 읽은 레코드를 insert_many 전에 걸러낸다.
+
+- 키: Kafka 좌표(topic-partition-offset) 또는 metadata.request_id (producer 재시도로 생긴 중복까지)
+- 세대(generation) 여러 개를 두고 window_seconds 마다 가장 오래된 세대를 버린다
+  (최소 window_seconds 동안의 키를 기억, 메모리는 max_bytes 로 고정)
+- 세대가 설계 용량을 채우면 false positive 율을 지키기 위해 일찍 회전한다
+- 저장이 끝난 키만 기록한다 (저장하지 못해 되감은 레코드는 다시 받아야 하므로)
+
+false positive 는 처음 보는 로그를 버리게 되므로 error_rate 는 충분히 낮게 둔다.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from typing import List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
+
+from app.models.log import LogEntry
+
+logger = logging.getLogger(__name__)
+
+KEY_OFFSET = "offset"
+KEY_REQUEST_ID = "request_id"
+
+DUPLICATES_SUPPRESSED = Counter(
+    "log_duplicates_suppressed_total",
+    "Redelivered logs dropped by the duplicate filter before insert",
+)
+DEDUP_FILTER_BYTES = Gauge(
+    "log_dedup_filter_bytes", "Memory used by the duplicate filter bit arrays"
+)
+DEDUP_FILTER_FILL = Gauge(
+    "log_dedup_filter_fill_ratio",
+    "Keys in the current generation relative to its designed capacity",
+)
+DEDUP_ROTATIONS = Counter(
+    "log_dedup_filter_rotations_total",
+    "Duplicate filter generation rotations",
+    ["reason"],
+)
+
+
+class _Generation:
+    """Bloom filter 한 세대"""
+
+    def __init__(self, num_bits: int, started_at: float, count: int = 0, bits: Optional[bytearray] = None):
+        self.bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+        self.started_at = started_at
+        self.count = count
+
+
+class RotatingBloomFilter:
+    """시간 윈도우 회전 Bloom filter"""
+
+    def __init__(
+        self,
+        max_bytes: int = 8 * 1024 * 1024,
+        error_rate: float = 0.0001,
+        window_seconds: float = 3600,
+        generations: int = 2,
+    ):
+        """
+        Args:
+            max_bytes: 전체 비트 배열 크기 상한 (세대 수로 나눠 사용)
+            error_rate: 세대 하나가 설계 용량만큼 찼을 때의 false positive 율
+            window_seconds: 키를 기억하는 최소 시간
+            generations: 세대 수 (2 이상, 많을수록 회전 시 잃는 구간이 작다)
+        """
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        if generations < 2:
+            raise ValueError("generations must be at least 2")
+
+        self.error_rate = error_rate
+        self.window_seconds = window_seconds
+        self.generation_count = generations
+        # 가장 오래된 세대를 버려도 window_seconds 는 남도록 회전 주기를 정한다
+        self.rotate_interval = window_seconds / (generations - 1)
+
+        # 세대별 비트 수 m 과 해시 수 k (m = -n ln p / (ln 2)^2, k = m/n ln 2)
+        self.num_bits = max(8, (max_bytes // generations) * 8)
+        self.num_hashes = max(1, round(-math.log(error_rate) / math.log(2)))
+        self.capacity = max(1, int(self.num_bits * math.log(2) ** 2 / -math.log(error_rate)))
+
+        now = time.time()
+        self.generations: List[_Generation] = [_Generation(self.num_bits, now)]
+        self._update_metrics()
+
+    def _update_metrics(self):
+        DEDUP_FILTER_BYTES.set(sum(len(g.bits) for g in self.generations))
+        DEDUP_FILTER_FILL.set(self.generations[-1].count / self.capacity)
+
+    def _positions(self, key: str) -> List[int]:
+        """double hashing 으로 k 개의 비트 위치 계산"""
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    @staticmethod
+    def _test(generation: _Generation, positions: List[int]) -> bool:
+        bits = generation.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def _maybe_rotate(self):
+        current = self.generations[-1]
+        if time.time() - current.started_at >= self.rotate_interval:
+            reason = "window"
+        elif current.count >= self.capacity:
+            reason = "capacity"
+        else:
+            return
+
+        self.generations.append(_Generation(self.num_bits, time.time()))
+        if len(self.generations) > self.generation_count:
+            self.generations.pop(0)
+        DEDUP_ROTATIONS.labels(reason=reason).inc()
+        logger.info(f"Duplicate filter rotated ({reason}), {len(self.generations)} generations")
+
+    def __contains__(self, key: str) -> bool:
+        positions = self._positions(key)
+        return any(self._test(g, positions) for g in self.generations)
+
+    def add(self, key: str):
+        """키 기록 (현재 세대)"""
+        self._maybe_rotate()
+        current = self.generations[-1]
+        positions = self._positions(key)
+        if self._test(current, positions):
+            return
+        for p in positions:
+            current.bits[p >> 3] |= 1 << (p & 7)
+        current.count += 1
+
+    def add_many(self, keys):
+        for key in keys:
+            self.add(key)
+        self._update_metrics()
+
+    def save(self, path: str):
+        """상태 저장 (재시작 후 이어서 사용, 임시 파일에 쓴 뒤 교체)"""
+        header = {
+            "num_bits": self.num_bits,
+            "num_hashes": self.num_hashes,
+            "generations": [
+                {"started_at": g.started_at, "count": g.count} for g in self.generations
+            ],
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            for g in self.generations:
+                f.write(g.bits)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> bool:
+        """
+        저장된 상태 복구 (크기 설정이 바뀌었거나 윈도우가 지난 세대는 버린다)
+
+        Returns:
+            복구 여부
+        """
+        if not os.path.exists(path):
+            return False
+
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            if header["num_bits"] != self.num_bits or header["num_hashes"] != self.num_hashes:
+                logger.warning("Duplicate filter settings changed, discarding saved state")
+                return False
+
+            size = (self.num_bits + 7) // 8
+            now = time.time()
+            restored = []
+            for meta in header["generations"]:
+                bits = bytearray(f.read(size))
+                if len(bits) != size:
+                    return False
+                if now - meta["started_at"] < self.window_seconds + self.rotate_interval:
+                    restored.append(_Generation(self.num_bits, meta["started_at"], meta["count"], bits))
+
+        if not restored:
+            return False
+
+        self.generations = restored[-self.generation_count:]
+        self._update_metrics()
+        logger.info(f"Restored duplicate filter with {len(self.generations)} generations")
+        return True
+
+
+class DuplicateFilter:
+    """배치에서 이미 저장한 레코드를 걸러낸다"""
+
+    def __init__(
+        self,
+        bloom: RotatingBloomFilter,
+        key: str = KEY_OFFSET,
+        state_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            bloom: 회전 Bloom filter
+            key: 중복 판단 키 (offset: Kafka 좌표, request_id: metadata.request_id)
+            state_path: 종료 시 상태를 저장할 파일 (None이면 저장하지 않음)
+        """
+        if key not in (KEY_OFFSET, KEY_REQUEST_ID):
+            raise ValueError(f"Unknown duplicate filter key: {key}")
+
+        self.bloom = bloom
+        self.key = key
+        self.state_path = state_path or None
+
+        if self.state_path:
+            try:
+                self.bloom.load(self.state_path)
+            except Exception as e:
+                logger.warning(f"Failed to restore duplicate filter: {e}")
+
+    def key_of(self, log: LogEntry) -> str:
+        """로그의 중복 판단 키 (request_id 가 없으면 문서 _id)"""
+        if self.key == KEY_REQUEST_ID:
+            request_id = (log.metadata or {}).get("request_id")
+            if request_id:
+                return f"request_id:{request_id}"
+        return log.document_id()
+
+    def filter(self, logs: List[LogEntry]) -> Tuple[List[LogEntry], int]:
+        """
+        이미 저장한 (것으로 보이는) 로그 제외
+
+        Returns:
+            (남은 로그, 걸러낸 개수)
+        """
+        seen = set()
+        kept = []
+        for log in logs:
+            key = self.key_of(log)
+            if key in seen or key in self.bloom:
+                continue
+            seen.add(key)
+            kept.append(log)
+
+        suppressed = len(logs) - len(kept)
+        if suppressed:
+            DUPLICATES_SUPPRESSED.inc(suppressed)
+        return kept, suppressed
+
+    def remember(self, logs: List[LogEntry]):
+        """저장이 끝난 로그의 키 기록"""
+        self.bloom.add_many(self.key_of(log) for log in logs)
+
+    def save(self):
+        """상태 저장 (종료 시)"""
+        if not self.state_path:
+            return
+        try:
+            self.bloom.save(self.state_path)
+            logger.info(f"Saved duplicate filter state to {self.state_path}")
+        except Exception as e:
+            logger.warning(f"Failed to save duplicate filter: {e}")
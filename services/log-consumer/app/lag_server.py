@@ -0,0 +1,90 @@
+"""
+Consumer Lag HTTP 엔드포인트 (HPA External Metric 용)
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+LAG_METRIC_NAME = "kafka_consumer_lag"
+
+# (topic, partition) -> lag
+LagSnapshot = Dict[Tuple[str, int], int]
+
+
+def build_external_metric_list(snapshot: LagSnapshot, group_id: str) -> dict:
+    """
+    lag 스냅샷을 external.metrics.k8s.io 의 ExternalMetricValueList 형식으로 변환
+
+    HPA는 selector에 매칭되는 item 값을 합산하므로 파티션별 item을 그대로 내보낸다.
+    """
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    items = [
+        {
+            "metricName": LAG_METRIC_NAME,
+            "metricLabels": {
+                "topic": topic,
+                "partition": str(partition),
+                "group": group_id,
+            },
+            "timestamp": now,
+            "value": str(lag),
+        }
+        for (topic, partition), lag in sorted(snapshot.items())
+    ]
+
+    return {
+        "kind": "ExternalMetricValueList",
+        "apiVersion": "external.metrics.k8s.io/v1beta1",
+        "metadata": {},
+        "items": items,
+    }
+
+
+def start_lag_server(
+    port: int, lag_provider: Callable[[], LagSnapshot], group_id: str
+) -> ThreadingHTTPServer:
+    """
+    lag 조회용 HTTP 서버를 데몬 스레드로 시작
+
+    Args:
+        port: 리슨 포트
+        lag_provider: 최신 lag 스냅샷을 반환하는 함수
+        group_id: Consumer Group ID (metricLabels에 포함)
+    """
+
+    class LagRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+
+            if path == "/lag":
+                body = build_external_metric_list(lag_provider(), group_id)
+            elif path == "/lag/total":
+                body = {"metricName": LAG_METRIC_NAME, "value": sum(lag_provider().values())}
+            else:
+                self.send_error(404)
+                return
+
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            # 접근 로그는 debug 레벨로만 남긴다
+            logger.debug(format % args)
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), LagRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    logger.info(f"Lag endpoint started on port {port} (/lag, /lag/total)")
+    return server
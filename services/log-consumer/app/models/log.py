@@ -1,6 +1,8 @@
 """
 로그 데이터 모델 (Consumer용)
 """
+import hashlib
+import json
 from datetime import datetime
 from typing import Optional, Dict, Any
 from pydantic import BaseModel, Field, ConfigDict
@@ -19,14 +21,30 @@ class LogEntry(BaseModel):
     service: str
     message: str
     metadata: Optional[Dict[str, Any]] = Field(default_factory=dict)
+    # Kafka 레코드 정보 (MongoDB에는 _id 생성에만 사용)
+    kafka_timestamp: Optional[int] = None  # epoch ms, 지연 측정용
+    kafka_topic: Optional[str] = None
+    kafka_partition: Optional[int] = None
+    kafka_offset: Optional[int] = None
     
     @classmethod
-    def from_kafka_message(cls, message_value: dict) -> "LogEntry":
+    def from_kafka_message(
+        cls,
+        message_value: dict,
+        kafka_timestamp: Optional[int] = None,
+        kafka_topic: Optional[str] = None,
+        kafka_partition: Optional[int] = None,
+        kafka_offset: Optional[int] = None
+    ) -> "LogEntry":
         """
         Kafka 메시지에서 LogEntry 생성
         
         Args:
             message_value: Kafka 메시지의 value (dict)
+            kafka_timestamp: Kafka 레코드 타임스탬프 (epoch ms)
+            kafka_topic: 레코드 토픽
+            kafka_partition: 레코드 파티션
+            kafka_offset: 레코드 offset
             
         Returns:
             LogEntry 인스턴스
@@ -43,16 +61,66 @@ class LogEntry(BaseModel):
             level=message_value.get("level", "INFO"),
             service=message_value.get("service", "unknown"),
             message=message_value.get("message", ""),
-            metadata=message_value.get("metadata", {})
+            metadata=message_value.get("metadata", {}),
+            kafka_timestamp=kafka_timestamp,
+            kafka_topic=kafka_topic,
+            kafka_partition=kafka_partition,
+            kafka_offset=kafka_offset
         )
     
+    def document_id(self) -> str:
+        """
+        결정적 문서 ID
+        
+        Kafka 좌표(topic-partition-offset)가 있으면 그대로 사용하고,
+        없으면 내용 해시를 사용한다. 재시도/재전송 시 같은 로그는 같은 _id를 갖는다.
+        """
+        if (
+            self.kafka_topic is not None
+            and self.kafka_partition is not None
+            and self.kafka_offset is not None
+        ):
+            return f"{self.kafka_topic}-{self.kafka_partition}-{self.kafka_offset}"
+        
+        content = json.dumps(
+            {
+                "timestamp": self.timestamp.isoformat(),
+                "level": self.level,
+                "service": self.service,
+                "message": self.message,
+                "metadata": self.metadata,
+            },
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+    
     def to_mongo_dict(self) -> dict:
         """MongoDB 저장용 딕셔너리로 변환"""
         return {
+            "_id": self.document_id(),
             "timestamp": self.timestamp,
             "level": self.level,
             "service": self.service,
             "message": self.message,
             "metadata": self.metadata,
             "created_at": datetime.utcnow()
+        }
+    
+    def to_timeseries_dict(self) -> dict:
+        """
+        MongoDB time-series 컬렉션 저장용 딕셔너리로 변환
+        
+        timeField는 timestamp, metaField는 meta({service, level})
+        """
+        return {
+            "_id": self.document_id(),
+            "timestamp": self.timestamp,
+            "meta": {
+                "service": self.service,
+                "level": self.level
+            },
+            "message": self.message,
+            "metadata": self.metadata,
+            "created_at": datetime.utcnow()
         }
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+로그 페이로드 크기 제한
+
+Kafka 레코드의 직렬화 크기(serialized_value_size)로 배치 크기를 추정하고,
+max_record_bytes 를 넘는 레코드는 긴 필드를 잘라 저장한다.
+원본은 MongoDBHandler.store_overflow 로 logs_overflow 컬렉션에 따로 보관한다.
+"""
+
+from typing import Any, Tuple
+
+from app.models.log import LogEntry
+
+TRUNCATED_SUFFIX = "...[truncated {} bytes]"
+
+# BSON 문서 최대 크기(16MB)보다 여유 있게
+MAX_OVERFLOW_BYTES = 15 * 1024 * 1024
+
+
+def estimate_size(log: LogEntry) -> int:
+    """Kafka 좌표가 없는 로그(스필 등)의 크기 추정"""
+    return len(log.model_dump_json())
+
+
+def _truncate_str(value: str, max_bytes: int) -> str:
+    encoded = value.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return value
+    kept = encoded[:max_bytes].decode("utf-8", errors="ignore")
+    return kept + TRUNCATED_SUFFIX.format(len(encoded) - max_bytes)
+
+
+def _truncate_value(value: Any, max_field_bytes: int) -> Any:
+    """중첩된 metadata 안의 긴 문자열을 자른다"""
+    if isinstance(value, str):
+        return _truncate_str(value, max_field_bytes)
+    if isinstance(value, dict):
+        return {k: _truncate_value(v, max_field_bytes) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_truncate_value(v, max_field_bytes) for v in value]
+    return value
+
+
+def truncate_log(
+    log: LogEntry,
+    max_record_bytes: int,
+    max_field_bytes: int
+) -> Tuple[LogEntry, int]:
+    """
+    큰 로그를 max_record_bytes 안으로 줄인다
+
+    1. message 와 metadata 의 긴 문자열을 max_field_bytes 로 자른다
+    2. 그래도 크면 metadata 를 버리고 요약만 남긴다
+
+    Returns:
+        (잘린 로그, 추정 크기)
+    """
+    metadata = _truncate_value(log.metadata or {}, max_field_bytes)
+    metadata["_truncated"] = True
+
+    truncated = log.model_copy(update={
+        "message": _truncate_str(log.message, max_field_bytes),
+        "metadata": metadata,
+    })
+    size = estimate_size(truncated)
+
+    if size > max_record_bytes:
+        truncated = truncated.model_copy(update={
+            "metadata": {
+                "_truncated": True,
+                "_original_keys": sorted((log.metadata or {}).keys())[:50],
+            }
+        })
+        size = estimate_size(truncated)
+
+    return truncated, size
+
@@ -0,0 +1,90 @@
+"""
+분 단위 스트리밍 롤업 카운터
+"""
+
+import hashlib
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+from app.models.log import LogEntry
+
+ERROR_LEVELS = ("ERROR", "CRITICAL")
+
+# (service, level, minute) -> count
+LevelKey = Tuple[str, str, datetime]
+# (service, level, minute, message) -> [count, last_occurred]
+ErrorKey = Tuple[str, str, datetime, str]
+
+
+def to_naive_utc(timestamp: datetime) -> datetime:
+    """타임존이 있는 타임스탬프를 naive UTC 로 (producer 는 naive UTC, '...Z' 는 aware 로 들어온다)"""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def to_minute(timestamp: datetime) -> datetime:
+    """타임스탬프를 분 단위로 내림 (naive UTC)"""
+    return to_naive_utc(timestamp).replace(second=0, microsecond=0)
+
+
+def message_key(message: str) -> str:
+    """에러 메시지 키 (롤업 문서 _id 용 짧은 해시)"""
+    return hashlib.sha1(message.encode("utf-8")).hexdigest()[:16]
+
+
+class MinuteRollup:
+    """
+    (service, level, minute) 카운터와 에러 메시지 카운터를 메모리에 누적한다.
+
+    배치 저장 후 drain() 으로 꺼내 MongoDB에 $inc upsert 한다.
+    """
+
+    def __init__(self):
+        self.level_counts: Dict[LevelKey, int] = defaultdict(int)
+        self.error_counts: Dict[ErrorKey, list] = {}
+
+    def add(self, log: LogEntry):
+        """로그 1건 반영"""
+        minute = to_minute(log.timestamp)
+        self.level_counts[(log.service, log.level, minute)] += 1
+
+        if log.level in ERROR_LEVELS:
+            key = (log.service, log.level, minute, log.message)
+            occurred = to_naive_utc(log.timestamp)
+            entry = self.error_counts.get(key)
+            if entry is None:
+                self.error_counts[key] = [1, occurred]
+            else:
+                entry[0] += 1
+                entry[1] = max(entry[1], occurred)
+
+    def add_batch(self, logs: List[LogEntry]):
+        """로그 배치 반영"""
+        for log in logs:
+            self.add(log)
+
+    def merge(self, level_counts: Dict[LevelKey, int], error_counts: Dict[ErrorKey, list]):
+        """저장에 실패한 카운터를 다시 합친다"""
+        for key, count in level_counts.items():
+            self.level_counts[key] += count
+
+        for key, (count, last_occurred) in error_counts.items():
+            last_occurred = to_naive_utc(last_occurred)
+            entry = self.error_counts.get(key)
+            if entry is None:
+                self.error_counts[key] = [count, last_occurred]
+            else:
+                entry[0] += count
+                entry[1] = max(entry[1], last_occurred)
+
+    def drain(self) -> Tuple[Dict[LevelKey, int], Dict[ErrorKey, list]]:
+        """누적된 카운터를 꺼내고 초기화"""
+        level_counts, error_counts = self.level_counts, self.error_counts
+        self.level_counts = defaultdict(int)
+        self.error_counts = {}
+        return level_counts, error_counts
+
+    def __len__(self) -> int:
+        return len(self.level_counts) + len(self.error_counts)
@@ -0,0 +1,205 @@
+"""
+로컬 디스크 스필 버퍼
+
+MongoDB에 저장할 수 없는 동안 배치를 JSON Lines 세그먼트 파일에 기록한다.
+
+    {spill_dir}/segment-00000001.jsonl
+
+- 배치 단위로 append + fsync (프로세스 재시작 후에도 남은 세그먼트를 이어서 drain)
+- 전체 크기가 max_bytes 를 넘으면 더 받지 않는다 (호출 측에서 파티션 pause)
+- drain 은 가장 오래된 세그먼트부터, 저장이 끝난 세그먼트만 삭제
+- 세그먼트별로 (topic, partition) 의 가장 작은 Kafka offset 을 기억한다. Consumer 는 종료/리밸런스 때
+  그 offset 으로 되감아, 스필 디렉터리가 Pod 와 함께 사라져도 Kafka 에서 다시 받을 수 있게 한다
+"""
+
+import json
+import logging
+import os
+from typing import Dict, List, Tuple
+
+from prometheus_client import Gauge
+
+from app.models.log import LogEntry
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+
+SPILL_BYTES = Gauge("consumer_spill_bytes", "Bytes of logs buffered on local disk")
+SPILL_RECORDS = Gauge("consumer_spill_records", "Logs buffered on local disk")
+SPILL_SEGMENTS = Gauge("consumer_spill_segments", "Spill segment files on local disk")
+
+# (topic, partition) -> offset
+PartitionOffsets = Dict[Tuple[str, int], int]
+
+
+def _track_offset(offsets: PartitionOffsets, topic, partition, offset):
+    """Kafka 좌표가 있는 로그만 파티션별 최소 offset 에 반영"""
+    if topic is None or partition is None or offset is None:
+        return
+    key = (topic, partition)
+    offsets[key] = min(offsets.get(key, offset), offset)
+
+
+class SpillBuffer:
+    """크기 제한이 있는 세그먼트 파일 버퍼"""
+
+    def __init__(
+        self,
+        spill_dir: str,
+        max_bytes: int = 512 * 1024 * 1024,
+        segment_bytes: int = 16 * 1024 * 1024,
+    ):
+        """
+        Args:
+            spill_dir: 세그먼트 디렉터리
+            max_bytes: 전체 스필 크기 상한
+            segment_bytes: 세그먼트 파일 하나의 크기 (넘으면 새 세그먼트)
+        """
+        self.spill_dir = spill_dir
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+
+        os.makedirs(self.spill_dir, exist_ok=True)
+
+        # (세그먼트 번호, 레코드 수)
+        self.segments: List[Tuple[int, int]] = []
+        # 세그먼트 번호 -> 파티션별 최소 offset
+        self.segment_offsets: Dict[int, PartitionOffsets] = {}
+        self.size_bytes = 0
+        self.record_count = 0
+        self._load_segments()
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.spill_dir, f"{SEGMENT_PREFIX}{seq:08d}{SEGMENT_SUFFIX}")
+
+    def _segment_size(self, seq: int) -> int:
+        path = self._path(seq)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def _load_segments(self):
+        """이전 실행에서 남은 세그먼트 복구"""
+        for name in sorted(os.listdir(self.spill_dir)):
+            if not (name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)):
+                continue
+
+            seq = int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            path = self._path(seq)
+            records = 0
+            offsets: PartitionOffsets = {}
+            with open(path, "rb") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    records += 1
+                    data = json.loads(line)
+                    _track_offset(
+                        offsets,
+                        data.get("kafka_topic"),
+                        data.get("kafka_partition"),
+                        data.get("kafka_offset"),
+                    )
+
+            self.segments.append((seq, records))
+            self.segment_offsets[seq] = offsets
+            self.size_bytes += os.path.getsize(path)
+            self.record_count += records
+
+        if self.segments:
+            logger.warning(
+                f"Recovered {self.record_count} spilled logs "
+                f"in {len(self.segments)} segments"
+            )
+        self._update_metrics()
+
+    def _update_metrics(self):
+        SPILL_BYTES.set(self.size_bytes)
+        SPILL_RECORDS.set(self.record_count)
+        SPILL_SEGMENTS.set(len(self.segments))
+
+    def __len__(self) -> int:
+        return self.record_count
+
+    def first_offsets(self) -> PartitionOffsets:
+        """스필에 남은 로그의 파티션별 가장 작은 Kafka offset"""
+        offsets: PartitionOffsets = {}
+        for segment in self.segment_offsets.values():
+            for (topic, partition), offset in segment.items():
+                _track_offset(offsets, topic, partition, offset)
+        return offsets
+
+    def has_room(self, batch_bytes: int = 0) -> bool:
+        """batch_bytes 만큼 더 기록할 수 있는지"""
+        return self.size_bytes + batch_bytes <= self.max_bytes
+
+    def append(self, logs: List[LogEntry]) -> bool:
+        """
+        배치 기록
+
+        Returns:
+            기록 여부 (용량 초과 시 False)
+        """
+        if not logs:
+            return True
+
+        payload = b"".join(log.model_dump_json().encode("utf-8") + b"\n" for log in logs)
+        if not self.has_room(len(payload)):
+            return False
+
+        # 마지막 세그먼트가 가득 찼으면 새 세그먼트
+        if not self.segments or self._segment_size(self.segments[-1][0]) >= self.segment_bytes:
+            seq = self.segments[-1][0] + 1 if self.segments else 1
+            self.segments.append((seq, 0))
+
+        seq, records = self.segments[-1]
+        with open(self._path(seq), "ab") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.segments[-1] = (seq, records + len(logs))
+        offsets = self.segment_offsets.setdefault(seq, {})
+        for log in logs:
+            _track_offset(offsets, log.kafka_topic, log.kafka_partition, log.kafka_offset)
+        self.size_bytes += len(payload)
+        self.record_count += len(logs)
+        self._update_metrics()
+        return True
+
+    def peek_segment(self) -> Tuple[List[LogEntry], List[int]]:
+        """가장 오래된 세그먼트 읽기 (로그, 로그별 직렬화 크기)"""
+        if not self.segments:
+            return [], []
+
+        # 기록 중인 세그먼트도 drain 대상 (이후 append 는 새 세그먼트로)
+        seq = self.segments[0][0]
+        if len(self.segments) == 1:
+            self.segments.append((seq + 1, 0))
+
+        logs, sizes = [], []
+        with open(self._path(seq), "rb") as f:
+            for line in f:
+                if line.strip():
+                    logs.append(LogEntry.model_validate_json(line))
+                    sizes.append(len(line))
+        return logs, sizes
+
+    def pop_segment(self):
+        """가장 오래된 세그먼트 삭제 (저장 완료 후 호출)"""
+        if not self.segments:
+            return
+
+        seq, records = self.segments.pop(0)
+        self.segment_offsets.pop(seq, None)
+        self.size_bytes -= self._segment_size(seq)
+        if os.path.exists(self._path(seq)):
+            os.remove(self._path(seq))
+        self.record_count -= records
+
+        # 아직 기록되지 않은 빈 세그먼트만 남으면 정리
+        if len(self.segments) == 1 and self.segments[0][1] == 0:
+            self.segments.clear()
+            self.segment_offsets.clear()
+
+        self._update_metrics()
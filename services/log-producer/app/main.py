@@ -27,6 +27,13 @@ logger = logging.getLogger(__name__)
 # 환경변수
 KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:29092")
 KAFKA_TOPIC = os.getenv("KAFKA_TOPIC", "logs")
+# ERROR/CRITICAL 전용 우선순위 토픽 (비어 있으면 모두 KAFKA_TOPIC 으로)
+KAFKA_PRIORITY_TOPIC = os.getenv("KAFKA_PRIORITY_TOPIC", "logs-priority")
+PRIORITY_LEVELS = [
+    level.strip().upper()
+    for level in os.getenv("PRIORITY_LEVELS", "ERROR,CRITICAL").split(",")
+    if level.strip()
+]
 
 # 전역 producer 변수
 producer: LogProducer = None
@@ -39,7 +46,12 @@ async def lifespan(app: FastAPI):
 
     # 시작 시
     logger.info("Starting Log Producer Service...")
-    producer = LogProducer(bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS, topic=KAFKA_TOPIC)
+    producer = LogProducer(
+        bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+        topic=KAFKA_TOPIC,
+        priority_topic=KAFKA_PRIORITY_TOPIC,
+        priority_levels=PRIORITY_LEVELS,
+    )
     logger.info("Kafka Producer initialized successfully")
 
     yield
@@ -71,6 +83,7 @@ async def root():
         "status": "running",
         "kafka_servers": KAFKA_BOOTSTRAP_SERVERS,
         "topic": KAFKA_TOPIC,
+        "priority_topic": KAFKA_PRIORITY_TOPIC or None,
     }
 
 
@@ -248,6 +261,8 @@ async def get_stats():
     return {
         "kafka_servers": KAFKA_BOOTSTRAP_SERVERS,
         "topic": KAFKA_TOPIC,
+        "priority_topic": KAFKA_PRIORITY_TOPIC or None,
+        "priority_levels": PRIORITY_LEVELS,
         "producer_ready": True,
         "metrics_available": len(metrics) > 0,
     }
@@ -27,6 +27,13 @@ logger = logging.getLogger(__name__)
 # 환경변수
 KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:29092")
 KAFKA_TOPIC = os.getenv("KAFKA_TOPIC", "logs")
+# ERROR/CRITICAL 전용 우선순위 토픽 (비어 있으면 모두 KAFKA_TOPIC 으로)
+KAFKA_PRIORITY_TOPIC = os.getenv("KAFKA_PRIORITY_TOPIC", "logs-priority")
+PRIORITY_LEVELS = [
+    level.strip().upper()
+    for level in os.getenv("PRIORITY_LEVELS", "ERROR,CRITICAL").split(",")
+    if level.strip()
+]
 SERVICE_NAME = os.getenv("SERVICE_NAME", "api-service")
 LOGS_PER_SECOND = int(os.getenv("LOGS_PER_SECOND", "1"))
 
@@ -57,6 +64,7 @@ async def main():
     logger.info("=" * 50)
     logger.info(f"Kafka Servers: {KAFKA_BOOTSTRAP_SERVERS}")
     logger.info(f"Kafka Topic: {KAFKA_TOPIC}")
+    logger.info(f"Priority Topic: {KAFKA_PRIORITY_TOPIC or '(disabled)'} {PRIORITY_LEVELS}")
     logger.info(f"Service Name: {SERVICE_NAME}")
     logger.info(f"Logs Per Second: {LOGS_PER_SECOND}")
     logger.info("=" * 50)
@@ -78,7 +86,9 @@ async def main():
         logger.info("Creating Kafka Producer...")
         producer = LogProducer(
             bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
-            topic=KAFKA_TOPIC
+            topic=KAFKA_TOPIC,
+            priority_topic=KAFKA_PRIORITY_TOPIC,
+            priority_levels=PRIORITY_LEVELS,
         )
         logger.info("Kafka Producer created successfully")
         
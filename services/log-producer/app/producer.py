@@ -3,10 +3,10 @@ Kafka Producer 구현
 """
 import json
 import logging
-from typing import Optional
+from typing import Iterable, Optional
 from kafka import KafkaProducer
 from kafka.errors import KafkaError
-from app.models.log import LogEntry
+from app.models.log import LogEntry, LogLevel
 
 logger = logging.getLogger(__name__)
 
@@ -14,13 +14,23 @@ logger = logging.getLogger(__name__)
 class LogProducer:
     """Kafka 로그 프로듀서"""
     
-    def __init__(self, bootstrap_servers: str, topic: str):
+    def __init__(
+        self,
+        bootstrap_servers: str,
+        topic: str,
+        priority_topic: Optional[str] = None,
+        priority_levels: Iterable[str] = (LogLevel.ERROR.value, LogLevel.CRITICAL.value),
+    ):
         """
         Args:
             bootstrap_servers: Kafka 브로커 주소
             topic: 전송할 토픽 이름
+            priority_topic: priority_levels 로그를 보낼 우선순위 토픽 (None이면 모두 topic 으로)
+            priority_levels: 우선순위 토픽으로 보낼 로그 레벨
         """
         self.topic = topic
+        self.priority_topic = priority_topic or None
+        self.priority_levels = frozenset(priority_levels)
         self.producer: Optional[KafkaProducer] = None
         self.bootstrap_servers = bootstrap_servers
         
@@ -36,11 +46,24 @@ class LogProducer:
                 linger_ms=10,
                 batch_size=16384,
             )
-            logger.info(f"Kafka Producer initialized: {bootstrap_servers}, topic: {topic}")
+            logger.info(
+                f"Kafka Producer initialized: {bootstrap_servers}, topic: {topic}, "
+                f"priority topic: {self.priority_topic or '-'}"
+            )
         except Exception as e:
             logger.error(f"Failed to initialize Kafka Producer: {e}")
             raise
     
+    def topic_for(self, log_entry: LogEntry) -> str:
+        """
+        로그 레벨에 따른 전송 토픽
+
+        ERROR/CRITICAL 은 대량의 INFO 로그 뒤에 밀리지 않도록 우선순위 토픽으로 보낸다.
+        """
+        if self.priority_topic and log_entry.level.value in self.priority_levels:
+            return self.priority_topic
+        return self.topic
+    
     def send_log(self, log_entry: LogEntry) -> bool:
         """
         로그를 Kafka로 전송
@@ -57,7 +80,7 @@ class LogProducer:
         
         try:
             log_dict = log_entry.to_dict()
-            future = self.producer.send(self.topic, value=log_dict)
+            future = self.producer.send(self.topic_for(log_entry), value=log_dict)
             record_metadata = future.get(timeout=10)
             
             logger.debug(